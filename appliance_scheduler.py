@@ -0,0 +1,120 @@
+import numpy as np
+from dataclasses import dataclass
+
+# Cihaz planlama motoru.
+# Tahmin edilen 15 dakikalık üretim eğrisine karşı her cihaz için, izin verilen
+# zaman aralığında öz tüketimi (güneşten doğrudan karşılanan enerjiyi) en
+# yüksek yapan başlangıç zamanı seçilir. Pencere toplamları önek toplamlarından
+# (prefix sum) O(1) hesaplanır; tüm günler ve haneler tek vektörel çağrıda işlenir.
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+@dataclass
+class Appliance:
+    name: str
+    power_w: float           # Çalışırken çektiği ortalama güç
+    duration_min: int        # Çalışma süresi (dakika)
+    earliest: str = '00:00'  # En erken başlangıç
+    latest: str = '24:00'    # En geç bitiş
+
+    def energy_wh(self):
+        return self.power_w * self.duration_min / 60
+
+# Sihirbazda kullanılan örnek cihazlar
+DEFAULT_APPLIANCES = [
+    Appliance("Elektrikli Araç Şarjı", 3700, 180, '07:00', '19:00'),
+    Appliance("Fırın", 2400, 60, '10:00', '20:00'),
+    Appliance("Çamaşır Makinesi", 2000, 90, '07:00', '22:00'),
+    Appliance("Bulaşık Makinesi", 1800, 120, '07:00', '23:00'),
+    Appliance("Ütü", 1200, 45, '08:00', '22:00')
+]
+
+def _to_slot(hhmm, slot_minutes):
+    hours, minutes = (int(part) for part in hhmm.split(':'))
+    return (hours * 60 + minutes) // slot_minutes
+
+def schedule_appliances(production_w, appliances, slot_minutes=SLOT_MINUTES):
+    """
+    production_w: (..., slot) boyutlu üretim tahmini (W). Son eksen bir günün
+    aralıklarıdır; önceki eksenler gün/hane olabilir, ör. (hane, gün, 96).
+    Cihazlar enerjisi büyükten küçüğe yerleştirilir; her yerleştirme kalan
+    üretimden düşülür, böylece cihazlar aynı güneş enerjisini iki kez saymaz.
+
+    Dönüş (cihaz sırası giriş listesiyle aynı):
+      starts: (..., cihaz) başlangıç aralığı indeksi (-1: sığmadı)
+      solar_wh: (..., cihaz) güneşten karşılanan enerji (Wh)
+      grid_wh: (..., cihaz) şebekeden çekilecek enerji (Wh)
+    """
+    production_w = np.asarray(production_w, dtype=float)
+    batch_shape = production_w.shape[:-1]
+    n_slots = production_w.shape[-1]
+    residual = np.maximum(production_w.reshape(-1, n_slots), 0).copy()
+    n_batch = residual.shape[0]
+    slot_h = slot_minutes / 60
+    slots = np.arange(n_slots)
+
+    starts = np.full((n_batch, len(appliances)), -1, dtype=np.int64)
+    solar_wh = np.zeros((n_batch, len(appliances)))
+    grid_wh = np.zeros((n_batch, len(appliances)))
+
+    order = sorted(range(len(appliances)), key=lambda i: -appliances[i].energy_wh())
+    for i in order:
+        appliance = appliances[i]
+        duration = max(1, int(np.ceil(appliance.duration_min / slot_minutes)))
+        first = _to_slot(appliance.earliest, slot_minutes)
+        last_start = min(_to_slot(appliance.latest, slot_minutes), n_slots) - duration
+        if duration > n_slots or last_start < first:
+            grid_wh[:, i] = appliance.energy_wh()
+            continue
+
+        # Cihazın bir aralıkta güneşten alabileceği güç: min(kalan üretim, cihaz gücü)
+        covered = np.minimum(residual, appliance.power_w)
+        prefix = np.zeros((n_batch, n_slots + 1))
+        np.cumsum(covered, axis=1, out=prefix[:, 1:])
+        window = prefix[:, duration:] - prefix[:, :-duration]   # (batch, olası başlangıç)
+
+        allowed = window[:, first:last_start + 1]
+        best = first + np.argmax(allowed, axis=1)
+        best_sum = window[np.arange(n_batch), best]
+
+        starts[:, i] = best
+        solar_wh[:, i] = np.minimum(best_sum * slot_h, appliance.energy_wh())
+        grid_wh[:, i] = appliance.energy_wh() - solar_wh[:, i]
+
+        # Kullanılan üretimi kalan eğriden düş
+        running = (slots >= best[:, None]) & (slots < (best + duration)[:, None])
+        residual -= np.where(running, covered, 0)
+
+    shape = batch_shape + (len(appliances),)
+    return starts.reshape(shape), solar_wh.reshape(shape), grid_wh.reshape(shape)
+
+def daily_production_curves(times, power_w, slot_minutes=SLOT_MINUTES):
+    """
+    Zaman damgalı tahminleri (gün, aralık) matrisine yerleştirir.
+    Dönüş: (günler, matris); verisi olmayan aralıklar 0 kalır.
+    """
+    minutes = np.asarray(times).astype('datetime64[m]')
+    days = minutes.astype('datetime64[D]')
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    slot_index = (minutes - days).astype(np.int64) // slot_minutes
+
+    curves = np.zeros((len(unique_days), 24 * 60 // slot_minutes))
+    curves[day_index, slot_index] = np.asarray(power_w, dtype=float)
+    return unique_days, curves
+
+def format_schedule(appliances, starts, solar_wh, grid_wh, slot_minutes=SLOT_MINUTES):
+    """Tek gün için planı okunabilir satırlara çevirir."""
+    lines = []
+    for appliance, start, solar, grid in zip(appliances, starts, solar_wh, grid_wh):
+        if start < 0:
+            lines.append(f"   - {appliance.name:<22}: uygun zaman aralığı yok")
+            continue
+        begin = int(start) * slot_minutes
+        end = begin + appliance.duration_min
+        share = solar / appliance.energy_wh() * 100 if appliance.energy_wh() > 0 else 0
+        lines.append(
+            f"   - {appliance.name:<22}: {begin // 60:02d}:{begin % 60:02d} - {end // 60:02d}:{end % 60:02d}"
+            f"  | Güneşten: {solar:>6.0f} Wh (%{share:.0f}) | Şebekeden: {grid:>6.0f} Wh"
+        )
+    return lines
@@ -0,0 +1,305 @@
+import pandas as pd
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import warnings
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits
+
+from dataset_store import STORE_DIR
+from result_cache import result_key, load_results, store_results
+from calibration import Calibration
+from solar_geometry import GEOMETRY_VERSION, HORIZON_DEG, site_from_meta, daylight_mask
+from tracing import stage
+
+# Geçmiş veri üzerinde kayan tahmin başlangıçlarıyla (rolling origin) geriye dönük test.
+# Her başlangıç günü için model yalnızca o günden önceki veriyle eğitilir ve
+# sonraki ufuk (varsayılan 1 gün) tahmin edilir; tahminler invertör ölçümlerinden
+# hesaplanan günlük enerjiyle karşılaştırılır. Hava verisi gözlenen değerdir
+# (arşivlenmiş tahmin yok), yani hata yalnızca modelin ve kalibrasyonun payıdır.
+#
+# Pahalı birim (model, başlangıç) çiftidir: eğitim + kalibrasyonsuz tahmin.
+# Birimler çekirdeklere dağıtılır; özellik matrisi bir kez .npy olarak yazılıp
+# işçilerde bellek eşlemeli açılır. Her birimin sonucu, eğitim verisinin özeti
+# ve model tanımıyla anahtarlanıp .backtest_cache/ altında saklanır: yeni bir
+# model eklemek yalnızca o modelin birimlerini çalıştırır. Kalibrasyon
+# varyantları önbellekteki tahminlere ana süreçte uygulanır (eğitim gerekmez).
+#
+#   python backtest.py
+#   python backtest.py --models XGBoost LightGBM --horizon-days 2 --window-days 30
+
+BACKTEST_CACHE_DIR = '.backtest_cache'
+MAX_BACKTEST_BYTES = 512 * 1024 * 1024
+WEATHER_FILE = 'open-meteo-35.19N33.50E87m.csv'
+
+SUMMARY_CSV = 'backtest_summary.csv'
+DAILY_CSV = 'backtest_daily.csv'
+
+# Kalibrasyon varyantları: yok, eski sabit kural (önsel) ve geriye dönük
+# testte ölçümler geldikçe güncellenen çevrimiçi tablo (calibration.py)
+VARIANTS = ('yok', 'önsel', 'çevrimiçi')
+
+def read_site(weather_file=WEATHER_FILE):
+    """Open-Meteo CSV'sinin üst bilgisinden site (konum yoksa None)."""
+    if not os.path.exists(weather_file):
+        return None
+    meta = pd.read_csv(weather_file, nrows=1).iloc[0].to_dict()
+    return site_from_meta(meta)
+
+def make_origins(times, initial_days=3, horizon_days=1, step_days=1):
+    """
+    Tahmin başlangıçları (gün başları): ilk initial_days gün yalnızca eğitimde
+    kullanılır, son başlangıç ufku veri içinde kalacak şekilde seçilir.
+    """
+    days = np.unique(times.astype('datetime64[D]'))
+    if len(days) == 0:
+        return []
+    first = days[0] + np.timedelta64(initial_days, 'D')
+    last = days[-1] + np.timedelta64(1, 'D') - np.timedelta64(horizon_days, 'D')
+    return list(np.arange(first, last + np.timedelta64(1, 'D'), np.timedelta64(step_days, 'D')))
+
+def chain_digests(X, y, boundaries):
+    """
+    Sınır konumlarına kadar olan verinin zincirleme özetleri: digests[i],
+    [0, boundaries[i]) satırlarını kapsar. Tüm veri yalnızca bir kez okunur.
+    """
+    h = hashlib.sha256()
+    digests = []
+    previous = 0
+    for boundary in boundaries:
+        h.update(np.ascontiguousarray(X[previous:boundary]).tobytes())
+        h.update(np.ascontiguousarray(y[previous:boundary]).tobytes())
+        digests.append(h.copy().hexdigest())
+        previous = boundary
+    return digests
+
+def model_spec(model):
+    """Modelin iş parçacığı ayarları hariç parametrelerinin özeti."""
+    from solar_prediction import THREAD_PARAMS
+    params = {k: v for k, v in model.get_params().items() if k not in set(THREAD_PARAMS.values())}
+    encoded = json.dumps({'class': type(model).__name__, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def fit_unit(data_dir, name, model, train, test):
+    """Tek birim: [train) satırlarıyla eğitir, [test) satırlarını tahmin eder (kalibrasyonsuz)."""
+    from sklearn.base import clone
+    from solar_prediction import THREAD_PARAMS
+    from solar_wizard import predict_raw_power
+
+    warnings.filterwarnings('ignore')
+    X = np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r')
+    sun_up = np.load(os.path.join(data_dir, 'sun_up.npy'), mmap_mode='r')
+
+    # Paralellik birimler arasında; her model tek iş parçacığı kullanır.
+    # Sıralı çalışmada aynı nesne birimler arasında paylaşılmasın diye kopyalanır.
+    model = clone(model)
+    param = THREAD_PARAMS.get(name)
+    if param is not None:
+        model.set_params(**{param: 1})
+
+    X_train, y_train = X[slice(*train)], y[slice(*train)]
+    measured = np.isfinite(y_train)
+    with threadpool_limits(limits=1):
+        start = time.perf_counter()
+        model.fit(X_train[measured], y_train[measured])
+        fit_time = time.perf_counter() - start
+        raw_w = predict_raw_power(model, np.ascontiguousarray(X[slice(*test)]), sun_up[slice(*test)])
+    return np.asarray(raw_w, dtype=np.float64), fit_time
+
+def apply_variant(variant, units, X, y, pipeline):
+    """
+    Bir modelin birimlerine (başlangıç sırasıyla) kalibrasyon varyantını uygular.
+    Çevrimiçi varyantta tablo, her başlangıçtan önce yalnızca o ana kadar
+    ölçülmüş aralıklarla (önceki birimin tahmin + ölçüm çiftleri) güncellenir.
+    """
+    outputs = []
+    calibration = Calibration()
+    previous = None
+    for unit in units:
+        test = slice(*unit['test'])
+        if variant == 'yok':
+            outputs.append(unit['raw_w'])
+            continue
+        if variant == 'çevrimiçi' and previous is not None:
+            prev_test = slice(*previous['test'])
+            seen = slice(0, min(unit['test'][0], previous['test'][1]) - previous['test'][0])
+            calibration.update_from_matrix(X[prev_test][seen], pipeline, previous['raw_w'][seen], y[prev_test][seen])
+        outputs.append(calibration.apply(unit['raw_w'], X[test], pipeline))
+        previous = unit
+    return outputs
+
+def daily_records(name, variant, units, outputs, times, y, slot_hours, slots_per_day):
+    """Birim tahminlerini günlük enerjiye çevirir; ölçümü eksik günler işaretlenir."""
+    records = []
+    for unit, power_w in zip(units, outputs):
+        test = slice(*unit['test'])
+        days = times[test].astype('datetime64[D]')
+        labels, index = np.unique(days, return_inverse=True)
+        actual_w = y[test]
+        measured = np.isfinite(actual_w)
+        predicted_wh = np.bincount(index, weights=power_w * slot_hours, minlength=len(labels))
+        actual_wh = np.bincount(index, weights=np.where(measured, actual_w, 0) * slot_hours, minlength=len(labels))
+        slots = np.bincount(index, weights=measured, minlength=len(labels))
+        abs_error_w = np.bincount(index, weights=np.where(measured, np.abs(power_w - actual_w), 0), minlength=len(labels))
+        for i, day in enumerate(labels):
+            records.append({
+                'Model': name,
+                'Kalibrasyon': variant,
+                'Başlangıç': str(unit['origin']),
+                'Tarih': str(day),
+                'Ufuk_Gün': int((day - unit['origin']) / np.timedelta64(1, 'D')),
+                'Tahmin_Wh': predicted_wh[i],
+                'Gerçek_Wh': actual_wh[i],
+                'Aralık_MAE_W': abs_error_w[i] / slots[i] if slots[i] else np.nan,
+                'Tam_Gün': bool(slots[i] == slots_per_day)
+            })
+    return records
+
+def summarize(daily):
+    """Model x kalibrasyon başına günlük enerji hata ölçütleri (yalnızca tam günler)."""
+    complete = daily[daily['Tam_Gün']].copy()
+    complete['Hata_Wh'] = complete['Tahmin_Wh'] - complete['Gerçek_Wh']
+    grouped = complete.groupby(['Model', 'Kalibrasyon'], sort=False)
+    summary = pd.DataFrame({
+        'Gün': grouped.size(),
+        'Günlük_MAE_kWh': grouped['Hata_Wh'].apply(lambda e: e.abs().mean() / 1000),
+        'Günlük_RMSE_kWh': grouped['Hata_Wh'].apply(lambda e: np.sqrt((e ** 2).mean()) / 1000),
+        'Sapma_kWh': grouped['Hata_Wh'].mean() / 1000,
+        'WAPE_Yüzde': grouped.apply(lambda g: g['Hata_Wh'].abs().sum() / max(g['Gerçek_Wh'].sum(), 1e-9) * 100),
+        'Aralık_MAE_W': grouped['Aralık_MAE_W'].mean()
+    })
+    return summary.reset_index().sort_values('Günlük_MAE_kWh')
+
+def run_backtest(families=None, initial_days=3, horizon_days=1, step_days=1, window_days=None,
+                 n_jobs=-1, store_dir=STORE_DIR, weather_file=WEATHER_FILE, use_cache=True,
+                 cache_dir=BACKTEST_CACHE_DIR, summary_csv=SUMMARY_CSV, daily_csv=DAILY_CSV):
+    from solar_prediction import PIPELINE, load_and_process_data, define_models, load_best_params
+
+    X, y, df = load_and_process_data(store_dir=store_dir if os.path.isdir(store_dir) else None)
+    X = np.ascontiguousarray(X)
+    y = y.to_numpy(dtype=np.float64)
+    times = df['time'].to_numpy().astype('datetime64[m]')
+    if len(times) > 1 and (np.diff(times) < np.timedelta64(0, 'm')).any():
+        order = np.argsort(times, kind='stable')
+        X, y, times = X[order], y[order], times[order]
+
+    origins = make_origins(times, initial_days, horizon_days, step_days)
+    if not origins:
+        print("Hata: Geriye dönük test için yeterli gün yok.")
+        return None
+
+    slot_hours = float(np.median(np.diff(times)) / np.timedelta64(1, 'h')) if len(times) > 1 else 0.25
+    slots_per_day = int(round(24 / slot_hours))
+    site = read_site(weather_file)
+    sun_up = daylight_mask(times, site)
+    if sun_up is None:
+        sun_up = np.ones(len(times), dtype=bool)
+
+    models = define_models(load_best_params())
+    if families is not None:
+        unknown = [name for name in families if name not in models]
+        if unknown:
+            print(f"Hata: Bilinmeyen model(ler): {', '.join(unknown)}")
+            return None
+        models = {name: models[name] for name in families}
+
+    # Birimler: (model, başlangıç) -> eğitim ve test satır aralıkları
+    horizon = np.timedelta64(horizon_days, 'D')
+    starts = np.searchsorted(times, origins)
+    ends = np.searchsorted(times, [o + horizon for o in origins])
+    digests = chain_digests(X, y, starts)
+    units = {name: [] for name in models}
+    pending = []
+    for name, model in models.items():
+        spec = model_spec(model)
+        for origin, start, end, digest in zip(origins, starts, ends, digests):
+            train_start = 0 if window_days is None else int(np.searchsorted(times, origin - np.timedelta64(window_days, 'D')))
+            test_digest = hashlib.sha256(np.ascontiguousarray(X[start:end]).tobytes()).hexdigest()
+            key = result_key(digest, spec, None, origin=str(origin), train_start=train_start,
+                             test=test_digest, features=PIPELINE.features, night_gate=HORIZON_DEG,
+                             geometry=GEOMETRY_VERSION)
+            unit = {'origin': origin, 'train': (train_start, int(start)), 'test': (int(start), int(end)), 'key': key}
+            cached = load_results(key, cache_dir) if use_cache else None
+            if cached is not None:
+                unit['raw_w'] = np.asarray(cached['raw_w'])
+            else:
+                pending.append((name, model, unit))
+            units[name].append(unit)
+
+    total = sum(len(u) for u in units.values())
+    print(f"{len(times)} satır, {len(origins)} başlangıç, {len(models)} model: "
+          f"{total - len(pending)}/{total} birim önbellekten, {len(pending)} birim eğitilecek.")
+
+    if pending:
+        data_dir = tempfile.mkdtemp(prefix='solar_backtest_')
+        try:
+            np.save(os.path.join(data_dir, 'X.npy'), X)
+            np.save(os.path.join(data_dir, 'y.npy'), y)
+            np.save(os.path.join(data_dir, 'sun_up.npy'), np.asarray(sun_up, dtype=bool))
+            start_time = time.perf_counter()
+            with stage('backtest_fit', rows=len(pending)):
+                outputs = Parallel(n_jobs=n_jobs)(
+                    delayed(fit_unit)(data_dir, name, model, unit['train'], unit['test'])
+                    for name, model, unit in pending
+                )
+            print(f"{len(pending)} birim {time.perf_counter() - start_time:.1f} s içinde eğitildi.")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+        for (name, _, unit), (raw_w, fit_time) in zip(pending, outputs):
+            unit['raw_w'] = raw_w
+            store_results(unit['key'], {'raw_w': raw_w}, cache_dir,
+                          meta={'model': name, 'origin': str(unit['origin']), 'fit_s': fit_time},
+                          max_bytes=MAX_BACKTEST_BYTES)
+
+    # Kalibrasyon varyantları ve günlük enerji karşılaştırması
+    records = []
+    with stage('backtest_score'):
+        for name, model_units in units.items():
+            for variant in VARIANTS:
+                outputs = apply_variant(variant, model_units, X, y, PIPELINE)
+                records.extend(daily_records(name, variant, model_units, outputs, times, y, slot_hours, slots_per_day))
+
+    daily = pd.DataFrame(records)
+    summary = summarize(daily)
+    daily.to_csv(daily_csv, index=False)
+    summary.to_csv(summary_csv, index=False)
+    return summary
+
+def print_summary(summary):
+    header = (f"{'MODEL':<25} | {'KALİBRASYON':<11} | {'GÜN':>4} | {'MAE (kWh)':>10} | "
+              f"{'RMSE (kWh)':>10} | {'SAPMA (kWh)':>11} | {'WAPE %':>7} | {'15dk MAE (W)':>12}")
+    print(f"\n{header}")
+    print("-" * len(header))
+    for row in summary.itertuples(index=False):
+        print(f"{row.Model:<25} | {row.Kalibrasyon:<11} | {row.Gün:>4} | {row.Günlük_MAE_kWh:>10.2f} | "
+              f"{row.Günlük_RMSE_kWh:>10.2f} | {row.Sapma_kWh:>+11.2f} | {row.WAPE_Yüzde:>7.1f} | {row.Aralık_MAE_W:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Kayan başlangıçlı geriye dönük test (günlük enerji hatası)")
+    parser.add_argument('--models', nargs='*', default=None, help="Test edilecek modeller (varsayılan: hepsi)")
+    parser.add_argument('--initial-days', type=int, default=3, help="İlk başlangıçtan önceki en az eğitim günü")
+    parser.add_argument('--horizon-days', type=int, default=1, help="Her başlangıçtan tahmin edilen gün sayısı")
+    parser.add_argument('--step-days', type=int, default=1, help="Başlangıçlar arası gün sayısı")
+    parser.add_argument('--window-days', type=int, default=None, help="Kayan eğitim penceresi (varsayılan: genişleyen)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Paralel birim sayısı")
+    parser.add_argument('--store', default=STORE_DIR, help="prepare_data.py veri deposu (yoksa CSV'lerden okunur)")
+    parser.add_argument('--weather', default=WEATHER_FILE, help="Site konumu için Open-Meteo CSV'si")
+    parser.add_argument('--no-cache', action='store_true', help="Önbelleği yok say (sonuçlar yine yazılır)")
+    args = parser.parse_args()
+
+    summary = run_backtest(args.models, args.initial_days, args.horizon_days, args.step_days, args.window_days,
+                           args.n_jobs, args.store, args.weather, use_cache=not args.no_cache)
+    if summary is None:
+        return
+    print_summary(summary)
+    print(f"\n[OK] Özet '{SUMMARY_CSV}', günlük karşılaştırma '{DAILY_CSV}' dosyasına kaydedildi.")
+
+if __name__ == "__main__":
+    main()
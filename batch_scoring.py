@@ -0,0 +1,148 @@
+import pandas as pd
+import numpy as np
+import joblib
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from forecast_stream import read_minutely_15
+from solar_wizard import build_feature_frame, feature_matrix, predict_power
+from solar_geometry import SUN_UP_COLUMN
+from compiled_model import load_compiled_for
+from calibration import load_calibration_for
+
+# Çok sayıda çatı (site) için toplu tahmin motoru.
+# Her site kendi Open-Meteo 'minutely_15' JSON dosyasına sahiptir. Dosyalar
+# parçalara (chunk) bölünür, her parça bir işçi sürecinde tek bir özellik
+# matrisine yığılır ve tek bir vektörel model.predict çağrısıyla tahmin edilir.
+
+_MODEL = None  # Her işçi süreçte bir kez yüklenen model
+_CALIBRATION = None  # ve kalibrasyon tablosu
+
+def collect_forecast_files(source):
+    """
+    Dizin veya manifest dosyasından (site, json_yolu) listesini oluşturur.
+    Manifest: her satırda 'site,yol' ya da sadece 'yol' (site = dosya adı).
+    """
+    entries = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith('.json'):
+                entries.append((os.path.splitext(name)[0], os.path.join(source, name)))
+        return entries
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if ',' in line:
+                site, path = [part.strip() for part in line.split(',', 1)]
+            else:
+                path = line
+                site = os.path.splitext(os.path.basename(path))[0]
+            if not os.path.isabs(path):
+                path = os.path.join(base_dir, path)
+            entries.append((site, path))
+    return entries
+
+def _init_worker(model_path):
+    global _MODEL, _CALIBRATION
+    # Derlenmiş (yalnızca NumPy) karşılığı varsa onu kullan
+    _MODEL = load_compiled_for(model_path) or joblib.load(model_path)
+    _CALIBRATION = load_calibration_for(model_path)
+    # Paralellik süreç havuzundan gelir; modelin kendi iş parçacıkları
+    # çekirdekleri aşırı doldurmasın.
+    if hasattr(_MODEL, 'get_params') and 'n_jobs' in _MODEL.get_params():
+        _MODEL.set_params(n_jobs=1)
+
+def _score_chunk(chunk):
+    """Bir grup siteyi tek matriste birleştirip tek seferde tahmin eder."""
+    sites = []
+    matrices = []
+    masks = []
+    dates = []
+    failed = []
+    for site, path in chunk:
+        try:
+            meta, columns = read_minutely_15(path)
+        except (OSError, ValueError) as e:
+            failed.append((site, str(e)))
+            continue
+
+        # Konum bilgisi (meta) gece satırlarının elenmesi için gerekir
+        df = build_feature_frame(dict(meta, minutely_15=columns)) if columns else None
+        if df is None or df.empty:
+            failed.append((site, "Geçersiz veya boş tahmin verisi"))
+            continue
+
+        sites.append(site)
+        matrices.append(feature_matrix(df))
+        masks.append(df[SUN_UP_COLUMN].to_numpy())
+        dates.append(df['time'].dt.date.values)
+
+    if not matrices:
+        return pd.DataFrame(columns=['site', 'Date', 'Predicted_Energy_Wh']), failed
+
+    # Tüm sitelerin özellikleri tek matriste, site anahtarı ayrı dizide
+    X = np.concatenate(matrices)
+    power_w = predict_power(_MODEL, X, sun_up=np.concatenate(masks), calibration=_CALIBRATION)
+    stacked = pd.DataFrame({
+        'site': np.repeat(sites, [len(m) for m in matrices]),
+        'Date': np.concatenate(dates),
+        'Predicted_Energy_Wh': power_w * 0.25
+    })
+
+    daily = stacked.groupby(['site', 'Date'], sort=False)['Predicted_Energy_Wh'].sum().reset_index()
+    return daily, failed
+
+def score_fleet(source, model_path='best_solar_model.joblib', output_csv='fleet_daily_production.csv',
+                workers=None, chunk_size=32):
+    """Tüm siteleri süreç havuzunda puanlar ve site bazlı günlük toplamları yazar."""
+    entries = collect_forecast_files(source)
+    if not entries:
+        print(f"Hata: '{source}' içinde tahmin dosyası bulunamadı.")
+        return None
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    workers = max(1, min(workers, len(chunks)))
+
+    print(f"{len(entries)} site, {len(chunks)} parça, {workers} işçi süreç ile işleniyor...")
+
+    results = []
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        for daily, failed in pool.map(_score_chunk, chunks):
+            results.append(daily)
+            failures.extend(failed)
+
+    fleet_daily = pd.concat(results, ignore_index=True)
+    fleet_daily['Predicted_Energy_kWh'] = fleet_daily['Predicted_Energy_Wh'] / 1000
+    fleet_daily.to_csv(output_csv, index=False)
+
+    for site, reason in failures:
+        print(f"Uyarı: '{site}' atlandı ({reason})")
+    print(f"[OK] {fleet_daily['site'].nunique()} site için günlük toplamlar '{output_csv}' dosyasına yazıldı.")
+    return fleet_daily
+
+def main():
+    parser = argparse.ArgumentParser(description="Çoklu site için toplu güneş üretim tahmini")
+    parser.add_argument('source', help="JSON dosyalarını içeren dizin veya manifest dosyası")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Model dosyası")
+    parser.add_argument('--output', default='fleet_daily_production.csv', help="Çıktı CSV dosyası")
+    parser.add_argument('--workers', type=int, default=None, help="İşçi süreç sayısı (varsayılan: çekirdek sayısı)")
+    parser.add_argument('--chunk-size', type=int, default=32, help="Tek predict çağrısında birleştirilen site sayısı")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Hata: Model dosyası ({args.model}) bulunamadı.")
+        sys.exit(1)
+
+    score_fleet(args.source, args.model, args.output, args.workers, args.chunk_size)
+
+if __name__ == "__main__":
+    main()
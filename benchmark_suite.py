@@ -0,0 +1,270 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from scipy.signal import lfilter
+
+from forecast_cache import file_digest
+from result_cache import summarize_predictions
+from solar_wizard import find_model_path, load_model, process_forecast, feature_matrix, get_suggestions
+
+# Tahminden öneriye kadar olan hattın sentetik yük altındaki ölçümü.
+# Open-Meteo 'minutely_15' JSON düzeninde gerçekçi sentetik tahminler üretilir
+# (açık gökyüzü ışınımı + kendiliğinden ilişkili bulutluluk), ardından her aşama
+# paketlenmiş modelle ayrı ayrı zamanlanır. Sonuçlar JSON olarak kaydedilir;
+# --compare ile iki sürümün sonuçları aşama aşama karşılaştırılabilir.
+
+PRESETS = {
+    # (ufuk gün sayıları, site sayıları)
+    'quick': ([1, 7, 30], [1, 10]),
+    'full': ([1, 7, 30, 365, 5 * 365], [1, 10, 100, 1000, 10000])
+}
+
+STAGES = ('process_forecast', 'model_predict', 'daily_groupby', 'rollups', 'get_suggestions')
+
+UNITS = {
+    'time': 'iso8601',
+    'temperature_2m': '°C',
+    'shortwave_radiation': 'W/m²',
+    'diffuse_radiation': 'W/m²',
+    'direct_normal_irradiance': 'W/m²',
+    'cloud_cover': '%',
+    'is_day': ''
+}
+
+def synthetic_forecast(days, start='2025-01-01', latitude=35.1875, longitude=33.5, seed=0):
+    """
+    Open-Meteo düzeninde sentetik 15 dakikalık tahmin üretir.
+    Işınım güneş yüksekliğinden, bulutluluk AR(1) sürecinden, sıcaklık yıllık
+    ve günlük döngüden türetilir; değerler Open-Meteo gibi yuvarlanır.
+    """
+    rng = np.random.default_rng(seed)
+    utc_offset_h = 2
+    times = np.datetime64(start, 'm') + np.arange(days * 96) * np.timedelta64(15, 'm')
+
+    day_index = (times.astype('datetime64[D]') - times.astype('datetime64[Y]')).astype(np.int64)
+    local_hour = (times - times.astype('datetime64[D]')).astype(np.int64) / 60 + 7.5 / 60
+
+    # Güneş yüksekliği (basit deklinasyon + saat açısı modeli)
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (284 + day_index + 1) / 365)
+    solar_time = local_hour - utc_offset_h + longitude / 15
+    hour_angle = np.radians(15 * (solar_time - 12))
+    lat = np.radians(latitude)
+    sin_elevation = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    sin_elevation = np.clip(sin_elevation, 0, None)
+    clear_sky_ghi = 1098 * sin_elevation * np.exp(-0.057 / np.maximum(sin_elevation, 0.05))
+
+    # Bulutluluk: saatler boyunca yavaş değişen, 0-100 arasına sıkıştırılmış AR(1) süreci
+    noise = rng.normal(0, 1, len(times))
+    cloud = lfilter([0.243], [1, -0.97], noise)
+    cloud_cover = np.clip(50 + 45 * cloud, 0, 100).round()
+
+    # Kasten-Czeplak bulut azaltımı ve dağınık/doğrudan ayrımı
+    ghi = clear_sky_ghi * (1 - 0.75 * (cloud_cover / 100) ** 3.4)
+    diffuse_fraction = np.clip(0.15 + 0.8 * cloud_cover / 100, 0, 1)
+    diffuse = ghi * diffuse_fraction
+    dni = np.where(sin_elevation > 0.05, (ghi - diffuse) / np.maximum(sin_elevation, 0.05), 0)
+
+    seasonal = 18 - 8 * np.cos(2 * np.pi * (day_index - 15) / 365)
+    diurnal = 4 * np.sin(2 * np.pi * (local_hour - 9) / 24)
+    temperature = seasonal + diurnal - 3 * cloud_cover / 100 + rng.normal(0, 0.3, len(times))
+
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'generationtime_ms': 0.0,
+        'utc_offset_seconds': utc_offset_h * 3600,
+        'timezone': 'Europe/Bucharest',
+        'timezone_abbreviation': f'GMT+{utc_offset_h}',
+        'elevation': 87,
+        'minutely_15_units': dict(UNITS),
+        'minutely_15': {
+            'time': np.datetime_as_string(times, unit='m').tolist(),
+            'temperature_2m': temperature.round(1).tolist(),
+            'shortwave_radiation': ghi.round().astype(int).tolist(),
+            'diffuse_radiation': diffuse.round().astype(int).tolist(),
+            'direct_normal_irradiance': dni.round(1).tolist(),
+            'cloud_cover': cloud_cover.astype(int).tolist(),
+            'is_day': (sin_elevation > 0).astype(int).tolist()
+        }
+    }
+
+def write_forecast(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+def run_stages(json_path, model):
+    """Tek tahmin dosyası için her aşamanın süresini (saniye) ölçer."""
+    timings = {}
+
+    start = time.perf_counter()
+    df = process_forecast(json_path, model, use_cache=False)
+    timings['process_forecast'] = time.perf_counter() - start
+
+    X = feature_matrix(df)
+    start = time.perf_counter()
+    model.predict(X)
+    timings['model_predict'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df.groupby('Date')['Predicted_Energy_Wh'].sum()
+    timings['daily_groupby'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = summarize_predictions(df['time'].values, df['Predicted_Power_W'].values)
+    timings['rollups'] = time.perf_counter() - start
+
+    df_for_suggestion = pd.DataFrame({'hour': range(24)})
+    start = time.perf_counter()
+    for hourly_predictions in results['hourly_power_w']:
+        get_suggestions(hourly_predictions, df_for_suggestion)
+    timings['get_suggestions'] = time.perf_counter() - start
+
+    return timings, len(df)
+
+def run_scenario(name, days, sites, model, work_dir, repeat):
+    """Bir senaryo (ufuk × site sayısı) için dosyaları üretir ve aşamaları ölçer."""
+    paths = []
+    for site in range(sites):
+        path = os.path.join(work_dir, f'{name}_site{site}.json')
+        data = synthetic_forecast(days, latitude=35.1875 + site * 0.01, longitude=33.5 + site * 0.01, seed=site)
+        write_forecast(data, path)
+        paths.append(path)
+
+    runs = []
+    rows = 0
+    for _ in range(repeat):
+        totals = dict.fromkeys(STAGES, 0.0)
+        rows = 0
+        for path in paths:
+            timings, n_rows = run_stages(path, model)
+            rows += n_rows
+            for stage, seconds in timings.items():
+                totals[stage] += seconds
+        runs.append(totals)
+
+    for path in paths:
+        os.remove(path)
+
+    records = []
+    for stage in STAGES:
+        seconds = [run[stage] for run in runs]
+        records.append({
+            'scenario': name,
+            'days': days,
+            'sites': sites,
+            'rows': rows,
+            'stage': stage,
+            'seconds_min': min(seconds),
+            'seconds_median': float(np.median(seconds)),
+            'rows_per_s': rows / min(seconds) if min(seconds) > 0 else None
+        })
+    return records
+
+def environment_info(model_path):
+    import sklearn
+    info = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit-learn': sklearn.__version__,
+        'model': model_path,
+        'model_sha256': file_digest(model_path)
+    }
+    try:
+        import xgboost
+        info['xgboost'] = xgboost.__version__
+    except ImportError:
+        pass
+    return info
+
+def run_benchmark(preset='quick', days_list=None, sites_list=None, site_days=1, repeat=3,
+                  model_path='best_solar_model.joblib', output='benchmark_results.json'):
+    """
+    Ufuk taraması (tek site, artan gün sayısı) ve site taraması (site_days
+    günlük, artan site sayısı) çalıştırır; sonuçları JSON dosyasına yazar.
+    """
+    warnings.filterwarnings('ignore')
+    default_days, default_sites = PRESETS[preset]
+    days_list = days_list or default_days
+    sites_list = sites_list or default_sites
+
+    path = find_model_path(model_path)
+    model = load_model(model_path)
+
+    scenarios = [(f'horizon_{d}d', d, 1) for d in days_list]
+    scenarios += [(f'sites_{n}x{site_days}d', site_days, n) for n in sites_list if n > 1]
+
+    records = []
+    work_dir = tempfile.mkdtemp(prefix='solar_bench_')
+    try:
+        for name, days, sites in scenarios:
+            start = time.perf_counter()
+            scenario_records = run_scenario(name, days, sites, model, work_dir, repeat)
+            records.extend(scenario_records)
+            total = sum(r['seconds_min'] for r in scenario_records)
+            print(f"{name:<22} | {scenario_records[0]['rows']:>10} satır | aşamalar: {total:>8.3f} s | "
+                  f"toplam: {time.perf_counter() - start:>7.1f} s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': repeat,
+        'environment': environment_info(path),
+        'results': records
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] Sonuçlar '{output}' dosyasına kaydedildi.")
+    return report
+
+def compare_reports(baseline_path, current_path, threshold=1.10):
+    """İki sonuç dosyasını aşama aşama karşılaştırır; eşiği aşan yavaşlamaları işaretler."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['scenario'], r['stage']): r for r in json.load(f)['results']}
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)['results']
+
+    print(f"{'Senaryo':<22} | {'Aşama':<18} | {'Önce (s)':>10} | {'Sonra (s)':>10} | {'Oran':>6}")
+    print("-" * 78)
+    regressions = 0
+    for row in current:
+        old = baseline.get((row['scenario'], row['stage']))
+        if old is None or old['seconds_min'] <= 0:
+            continue
+        ratio = row['seconds_min'] / old['seconds_min']
+        flag = '  <-- YAVAŞLAMA' if ratio > threshold else ''
+        regressions += ratio > threshold
+        print(f"{row['scenario']:<22} | {row['stage']:<18} | {old['seconds_min']:>10.4f} | "
+              f"{row['seconds_min']:>10.4f} | {ratio:>6.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentetik yük altında tahmin -> öneri hattının ölçümü")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick', help="Hazır senaryo kümesi")
+    parser.add_argument('--days', type=int, nargs='*', default=None, help="Ufuk taraması gün sayıları")
+    parser.add_argument('--sites', type=int, nargs='*', default=None, help="Site taraması site sayıları")
+    parser.add_argument('--site-days', type=int, default=1, help="Site taramasında her sitenin gün sayısı")
+    parser.add_argument('--repeat', type=int, default=3, help="Tekrar sayısı (en iyi ve medyan raporlanır)")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Model dosyası")
+    parser.add_argument('--output', default='benchmark_results.json', help="Sonuç dosyası (JSON)")
+    parser.add_argument('--compare', default=None, help="Karşılaştırılacak önceki sonuç dosyası")
+    args = parser.parse_args()
+
+    run_benchmark(args.preset, args.days, args.sites, args.site_days, args.repeat, args.model, args.output)
+    if args.compare:
+        print()
+        compare_reports(args.compare, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from forecast_cache import publish_mode
+from result_cache import artifact_digest
+
+# Çevrimiçi öğrenilen kalibrasyon katmanı.
+# Model tahmini; bulutluluk, doğrudan ışınım (DNI) ve saat bölmelerine göre
+# tutulan düzeltme çarpanlarıyla ölçeklenir. Her bölmede tahmin edilen ve
+# gerçekleşen (invertör) gücün toplamları tutulur; ölçülen her yeni aralık
+# yalnızca kendi bölmesinin toplamlarını günceller (O(1)), model yeniden
+# eğitilmez. Çarpan = (gerçekleşen + önsel * ağırlık) / (tahmin + ağırlık):
+# az veri görmüş bölmeler önsel değere (eski sabit kural) yakın kalır.
+# Tablo model dosyasının yanında saklanır (best_solar_model.calibration.npz)
+# ve tahminde tek bir vektörel indeksleme ile uygulanır.
+#
+# Hangi ölçümlerin işlendiği kaynak başına ('forecast', 'store') zaman
+# aralıkları olarak tutulur; aynı veriyi tekrar eklemek çarpanları değiştirmez,
+# geriye dönük (daha eski) veya sırasız gelen veriler ise eklenir.
+#
+# Güncelleme:  python calibration.py update --forecast forecast_data.json
+#              python calibration.py update --store dataset_store
+# İnceleme:    python calibration.py show
+
+CALIBRATION_SUFFIX = '.calibration.npz'
+
+CLOUD_EDGES = (20, 40, 60, 80, 90)   # Bulutluluk bölmeleri: değer > sınır (%)
+DNI_EDGES = (50, 200, 400, 600)      # Doğrudan ışınım bölmeleri: değer >= sınır (W/m²)
+HOURS = 24
+
+# Önsel: 10 Aralık gözlemine dayanan eski sabit kural
+# (bulut > %90 ve doğrudan ışınım < 50 W/m² ise tahmin 0.32 ile çarpılır)
+LEGACY_RULE = {'cloud_cover_above': 90, 'direct_rad_below': 50, 'factor': 0.32}
+PRIOR_WEIGHT_W = 2000.0      # Önselin ağırlığı: bu kadar watt'lık tahmine eşdeğer
+MAX_WEIGHT_W = 200000.0      # Bölme hafızası: aşılınca toplamlar orantılı küçültülür (eski veri unutulur)
+FACTOR_RANGE = (0.0, 2.0)
+
+CLOUD_FEATURE = 'cloud_cover (%)'
+DNI_FEATURE = 'direct_normal_irradiance (W/m²)'
+HOUR_FEATURE = 'hour'
+
+SLOT = np.timedelta64(15, 'm')   # Ölçüm aralığı: işlenen zaman aralıkları bu adımla birleştirilir
+
+def legacy_prior(cloud_edges=CLOUD_EDGES, dni_edges=DNI_EDGES, rule=LEGACY_RULE):
+    """Eski kuralı bölme tablosuna çevirir: kuralın kapsadığı bölmeler 0.32, diğerleri 1."""
+    prior = np.ones((len(cloud_edges) + 1, len(dni_edges) + 1, HOURS))
+    for ci in range(1, len(cloud_edges) + 1):
+        if cloud_edges[ci - 1] < rule['cloud_cover_above']:
+            continue
+        for di in range(len(dni_edges)):
+            if dni_edges[di] <= rule['direct_rad_below']:
+                prior[ci, di, :] = rule['factor']
+    return prior
+
+class Calibration:
+    """Bölme bazında tahmin/gerçekleşen toplamları ve bunlardan türetilen çarpan tablosu."""
+
+    def __init__(self, predicted_sum=None, actual_sum=None, count=None, prior=None,
+                 cloud_edges=CLOUD_EDGES, dni_edges=DNI_EDGES, meta=None):
+        self.cloud_edges = np.asarray(cloud_edges, dtype=np.float64)
+        self.dni_edges = np.asarray(dni_edges, dtype=np.float64)
+        shape = (len(self.cloud_edges) + 1, len(self.dni_edges) + 1, HOURS)
+        self.prior = legacy_prior(cloud_edges, dni_edges) if prior is None else np.array(prior, dtype=np.float64)
+        self.predicted_sum = np.zeros(shape) if predicted_sum is None else np.array(predicted_sum, dtype=np.float64)
+        self.actual_sum = np.zeros(shape) if actual_sum is None else np.array(actual_sum, dtype=np.float64)
+        self.count = np.zeros(shape, dtype=np.int64) if count is None else np.array(count, dtype=np.int64)
+        self.meta = dict(meta or {})
+        self._factors = {}
+
+    def bin_index(self, cloud_cover, direct_rad, hour):
+        """Her satırın düzleştirilmiş tablo indeksi."""
+        ci = np.searchsorted(self.cloud_edges, cloud_cover, side='left')
+        di = np.searchsorted(self.dni_edges, direct_rad, side='right')
+        h = np.clip(np.asarray(hour).astype(np.intp), 0, HOURS - 1)
+        return (ci * (len(self.dni_edges) + 1) + di) * HOURS + h
+
+    def _matrix_index(self, X, pipeline):
+        hours = X[:, pipeline.index(HOUR_FEATURE)] if HOUR_FEATURE in pipeline.features else np.zeros(len(X))
+        return self.bin_index(X[:, pipeline.index(CLOUD_FEATURE)], X[:, pipeline.index(DNI_FEATURE)], hours)
+
+    def factors(self, dtype=np.float64):
+        """Düzleştirilmiş çarpan tablosu (güncellemeye kadar önbellekte)."""
+        dtype = np.dtype(dtype)
+        if dtype not in self._factors:
+            table = (self.actual_sum + self.prior * PRIOR_WEIGHT_W) / (self.predicted_sum + PRIOR_WEIGHT_W)
+            self._factors[dtype] = np.clip(table, *FACTOR_RANGE).reshape(-1).astype(dtype)
+        return self._factors[dtype]
+
+    def apply(self, power_w, X, pipeline):
+        """Tahminleri satırın bölmesindeki çarpanla ölçekler (tek vektörel indeksleme)."""
+        power_w = np.asarray(power_w)
+        return power_w * self.factors(power_w.dtype)[self._matrix_index(X, pipeline)]
+
+    def update(self, cloud_cover, direct_rad, hour, predicted_w, actual_w):
+        """
+        Ölçülen aralıkları toplamlara ekler; her aralık yalnızca kendi bölmesini
+        değiştirir. predicted_w kalibrasyonsuz model tahmini olmalıdır.
+        Dönüş: kullanılan aralık sayısı.
+        """
+        predicted_w = np.atleast_1d(np.asarray(predicted_w, dtype=np.float64))
+        actual_w = np.atleast_1d(np.asarray(actual_w, dtype=np.float64))
+        idx = np.atleast_1d(self.bin_index(cloud_cover, direct_rad, hour))
+
+        # Gece (tahmin 0) ve eksik ölçümler bilgi taşımaz
+        valid = np.isfinite(predicted_w) & np.isfinite(actual_w) & (predicted_w > 0)
+        idx = idx[valid]
+        if not len(idx):
+            return 0
+
+        predicted_flat = self.predicted_sum.reshape(-1)
+        actual_flat = self.actual_sum.reshape(-1)
+        np.add.at(predicted_flat, idx, predicted_w[valid])
+        np.add.at(actual_flat, idx, np.maximum(actual_w[valid], 0))
+        np.add.at(self.count.reshape(-1), idx, 1)
+
+        # Hafıza sınırı: oran korunarak toplamlar küçültülür, yeni veriler daha ağır basar
+        touched = np.unique(idx)
+        over = touched[predicted_flat[touched] > MAX_WEIGHT_W]
+        if len(over):
+            scale = MAX_WEIGHT_W / predicted_flat[over]
+            predicted_flat[over] *= scale
+            actual_flat[over] *= scale
+
+        self._factors = {}
+        return len(idx)
+
+    def update_from_matrix(self, X, pipeline, predicted_w, actual_w):
+        """Özellik matrisinden bölmeleri bularak update() çağırır."""
+        hours = X[:, pipeline.index(HOUR_FEATURE)] if HOUR_FEATURE in pipeline.features else np.zeros(len(X))
+        return self.update(X[:, pipeline.index(CLOUD_FEATURE)], X[:, pipeline.index(DNI_FEATURE)],
+                           hours, predicted_w, actual_w)
+
+    def digest(self):
+        """Çarpan tablosunun özeti (sonuç önbelleği anahtarının parçası)."""
+        h = hashlib.sha256()
+        for array in (self.cloud_edges, self.dni_edges, self.factors()):
+            h.update(np.ascontiguousarray(array).tobytes())
+        return h.hexdigest()
+
+    def save(self, path):
+        """Tabloyu geçici dosyaya yazıp atomik olarak yerine taşır."""
+        parent = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=parent, prefix='.tmp-', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    predicted_sum=self.predicted_sum,
+                    actual_sum=self.actual_sum,
+                    count=self.count,
+                    prior=self.prior,
+                    cloud_edges=self.cloud_edges,
+                    dni_edges=self.dni_edges,
+                    meta=np.array(json.dumps(self.meta, ensure_ascii=False))
+                )
+            publish_mode(tmp_path, path)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+def calibration_path(model_path):
+    """Model dosyasının yanındaki tablo: best_solar_model.joblib -> best_solar_model.calibration.npz"""
+    return os.path.splitext(model_path)[0] + CALIBRATION_SUFFIX
+
+def load_calibration(path):
+    """Kaydedilmiş tabloyu yükler; dosya yoksa veya okunamıyorsa None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return Calibration(
+                data['predicted_sum'], data['actual_sum'], data['count'], data['prior'],
+                data['cloud_edges'], data['dni_edges'], json.loads(str(data['meta']))
+            )
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Uyarı: Kalibrasyon dosyası okunamadı ({path}): {e}")
+        return None
+
+def load_calibration_for(model_path):
+    """
+    Modelin kalibrasyon tablosu. Dosya yoksa, ya da model yeniden eğitildiği
+    için tablo başka bir modele aitse yalnızca önsel (eski kural) kullanılır.
+    """
+    if model_path is None:
+        return Calibration()
+    calibration = load_calibration(calibration_path(model_path))
+    if calibration is None:
+        return Calibration()
+    if calibration.meta.get('model_sha256') != artifact_digest(model_path):
+        print(f"[i] '{calibration_path(model_path)}' başka bir modele ait; önsel kalibrasyon kullanılıyor.")
+        return Calibration()
+    return calibration
+
+def _observations_from_forecast(forecast_path, actuals_pattern, pipeline):
+    """Tahmin dosyasının özellikleri + aynı zaman damgalı invertör ölçümleri."""
+    from ingest import load_exports
+    from solar_wizard import load_feature_frame, feature_matrix
+    from solar_geometry import SUN_UP_COLUMN
+
+    df = load_feature_frame(forecast_path)
+    if df is None:
+        return None
+    actuals = load_exports(actuals_pattern)['power_w']
+    actual_w = actuals.reindex(df['time']).to_numpy(dtype=np.float64)
+    return feature_matrix(df, pipeline), df['time'].to_numpy(), actual_w, df[SUN_UP_COLUMN].to_numpy()
+
+def _observations_from_store(store_dir, start, end, pipeline):
+    """prepare_data.py veri deposundaki gözlenen hava + üretim satırları."""
+    from solar_prediction import load_from_store
+
+    df = load_from_store(store_dir, start, end)
+    if df.empty:
+        return None
+    X = np.ascontiguousarray(pipeline.transform(df), dtype=np.float32)
+    return X, df['time'].to_numpy(), df['Power [W]'].to_numpy(dtype=np.float64), None
+
+def _runs_to_arrays(runs):
+    """[[başlangıç, bitiş], ...] (ISO metin) -> başlangıç ve bitiş dizileri (datetime64[m])."""
+    starts = np.array([start for start, _ in runs], dtype='datetime64[m]')
+    ends = np.array([end for _, end in runs], dtype='datetime64[m]')
+    return starts, ends
+
+def processed_mask(runs, times):
+    """Zamanlardan işlenmiş aralıkların ([başlangıç, bitiş], uçlar dahil) içinde kalanlar."""
+    times = np.asarray(times).astype('datetime64[m]')
+    if not runs:
+        return np.zeros(len(times), dtype=bool)
+    starts, ends = _runs_to_arrays(runs)
+    pos = np.searchsorted(starts, times, side='right') - 1
+    inside = pos >= 0
+    inside[inside] = times[inside] <= ends[pos[inside]]
+    return inside
+
+def merge_runs(runs, times, slot=SLOT):
+    """İşlenmiş aralıklara yeni zamanları ekler; bitişik (slot adımlı) aralıklar birleşir."""
+    times = np.unique(np.asarray(times).astype('datetime64[m]'))
+    breaks = np.flatnonzero(np.diff(times) > slot)
+    new_starts = times[np.concatenate(([0], breaks + 1))] if len(times) else times
+    new_ends = times[np.concatenate((breaks, [len(times) - 1]))] if len(times) else times
+    old_starts, old_ends = _runs_to_arrays(runs) if runs else (new_starts[:0], new_ends[:0])
+
+    starts = np.concatenate((old_starts, new_starts))
+    ends = np.concatenate((old_ends, new_ends))
+    order = np.argsort(starts, kind='stable')
+    merged = []
+    for start, end in zip(starts[order], ends[order]):
+        if merged and start <= merged[-1][1] + slot:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [[str(start), str(end)] for start, end in merged]
+
+def update_calibration(model_path, observations, pipeline, source='forecast'):
+    """
+    Yeni ölçümleri modelin tablosuna ekler ve kaydeder. Bu kaynaktan daha önce
+    işlenmiş zaman damgaları (meta['processed'][source]) atlanır; aynı dosyayla
+    tekrar çalıştırmak çarpanları değiştirmez. Daha eski veya sırasız gelen
+    veriler (ör. veri deposuna geriye dönük eklenen günler) yine işlenir.
+    """
+    from solar_wizard import load_model, predict_raw_power
+
+    X, times, actual_w, sun_up = observations
+    times = np.asarray(times).astype('datetime64[m]')
+    calibration = load_calibration_for(model_path)
+    processed = dict(calibration.meta.get('processed', {}))
+
+    measured = np.isfinite(actual_w)
+    seen = measured & processed_mask(processed.get(source, []), times)
+    fresh = measured & ~seen
+    if seen.any():
+        print(f"[i] {int(seen.sum())} ölçüm bu kaynaktan ('{source}') daha önce işlenmiş; atlandı.")
+    if not fresh.any():
+        print("Yeni ölçüm yok; kalibrasyon değişmedi.")
+        return calibration
+
+    X = X[fresh]
+    actual_w = actual_w[fresh]
+    model = load_model(model_path)
+    predicted_w = predict_raw_power(model, X, None if sun_up is None else sun_up[fresh])
+
+    before = calibration.apply(predicted_w, X, pipeline)
+    used = calibration.update_from_matrix(X, pipeline, predicted_w, actual_w)
+    after = calibration.apply(predicted_w, X, pipeline)
+
+    processed[source] = merge_runs(processed.get(source, []), times[fresh])
+    last_time = np.datetime64(times[fresh].max(), 's')
+    if 'last_time' in calibration.meta:
+        last_time = max(last_time, np.datetime64(calibration.meta['last_time'], 's'))
+    calibration.meta.update({
+        'model_sha256': artifact_digest(model_path),
+        'processed': processed,
+        'last_time': str(last_time),
+        'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'observations': int(calibration.meta.get('observations', 0)) + used
+    })
+    path = calibration.save(calibration_path(model_path))
+
+    mae_before = float(np.mean(np.abs(before - actual_w)))
+    mae_after = float(np.mean(np.abs(after - actual_w)))
+    print(f"[OK] {used} aralık eklendi ({len(actual_w)} ölçüm), tablo '{path}' dosyasına yazıldı.")
+    print(f"     Bu ölçümlerde MAE: {mae_before:.2f} W -> {mae_after:.2f} W")
+    return calibration
+
+def print_table(calibration):
+    """Veri görmüş bölmelerin çarpanlarını (saat ortalaması) yazdırır."""
+    factors = calibration.factors().reshape(calibration.count.shape)
+    counts = calibration.count.sum(axis=2)
+    cloud_labels = ['<=' + f"{calibration.cloud_edges[0]:g}"] + [f">{e:g}" for e in calibration.cloud_edges]
+    dni_labels = ['<' + f"{calibration.dni_edges[0]:g}"] + [f">={e:g}" for e in calibration.dni_edges]
+
+    print(f"Gözlem: {calibration.meta.get('observations', 0)}, son ölçüm: {calibration.meta.get('last_time', '-')}")
+    print(f"{'Bulut (%)':<10} | " + " | ".join(f"{label:>14}" for label in dni_labels))
+    print("-" * (13 + 17 * len(dni_labels)))
+    for ci, cloud_label in enumerate(cloud_labels):
+        cells = []
+        for di in range(len(dni_labels)):
+            seen = calibration.count[ci, di] > 0
+            factor = factors[ci, di][seen].mean() if seen.any() else factors[ci, di].mean()
+            cells.append(f"{factor:>6.2f} ({counts[ci, di]:>5})")
+        print(f"{cloud_label:<10} | " + " | ".join(f"{cell:>14}" for cell in cells))
+
+def main():
+    from feature_pipeline import load_pipeline
+    from ingest import DEFAULT_PATTERN
+    from solar_wizard import find_model_path
+
+    parser = argparse.ArgumentParser(description="Bölmelenmiş kalibrasyon çarpanlarının güncellenmesi")
+    parser.add_argument('command', choices=['update', 'show', 'reset'], help="Yapılacak işlem")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Model dosyası")
+    parser.add_argument('--forecast', default=None, help="Tahmin JSON dosyası (invertör ölçümleriyle eşleştirilir)")
+    parser.add_argument('--actuals', default=DEFAULT_PATTERN, help="İnvertör dışa aktarım dosyaları (glob)")
+    parser.add_argument('--store', default=None, help="Veri deposu dizini (prepare_data.py çıktısı)")
+    parser.add_argument('--start', default=None, help="Veri deposu için başlangıç tarihi")
+    parser.add_argument('--end', default=None, help="Veri deposu için bitiş tarihi (hariç)")
+    args = parser.parse_args()
+
+    model_path = find_model_path(args.model)
+    if model_path is None:
+        print(f"Hata: Model dosyası ({args.model}) bulunamadı.")
+        return
+
+    if args.command == 'show':
+        print_table(load_calibration_for(model_path))
+        return
+    if args.command == 'reset':
+        path = calibration_path(model_path)
+        if os.path.exists(path):
+            os.remove(path)
+        print(f"[OK] '{path}' silindi; önsel kalibrasyon kullanılacak.")
+        return
+
+    pipeline = load_pipeline()
+    source = 'forecast' if args.forecast is not None else 'store'
+    if args.forecast is not None:
+        try:
+            observations = _observations_from_forecast(args.forecast, args.actuals, pipeline)
+        except (OSError, ValueError) as e:
+            print(f"Hata: Ölçümler okunamadı: {e}")
+            return
+    elif args.store is not None:
+        observations = _observations_from_store(args.store, args.start, args.end, pipeline)
+    else:
+        print("Hata: --forecast veya --store belirtilmeli.")
+        return
+
+    if observations is None:
+        print("Hata: Kalibrasyon için veri bulunamadı.")
+        return
+    update_calibration(model_path, observations, pipeline, source)
+
+if __name__ == "__main__":
+    main()
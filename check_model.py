@@ -1,44 +1,54 @@
-import joblib
 import pandas as pd
 import numpy as np
 
-# 1. Modeli yükle
+from dataset_store import STORE_DIR, list_partitions, read_range
+from model_registry import REGISTRY_DIR, MANIFEST_FILE, open_registry
+
+# 1. Modelleri kontrol et (yalnızca manifest okunur, hiçbir model yüklenmez)
 try:
-    print("Model yükleniyor...")
-    models = joblib.load('solar_model_xgboost.joblib')
-    print(f"Model türü: {type(models)}")
-    
-    # Eğer 7 ayrı model varsa (örneğin sözlük veya liste içinde)
-    if isinstance(models, dict):
-        print(f"Model sayısı: {len(models)}")
-        first_model_key = list(models.keys())[0]
-        print(f"İlk model anahtarı: {first_model_key}")
-        
-        # İlk modelin ağaç sayısına bakarak eğitilip eğitilmediğini kontrol et
-        if hasattr(models[first_model_key], 'n_estimators'):
-            print(f"Ağaç sayısı (n_estimators): {models[first_model_key].n_estimators}")
-        
-        # Feature importance kontrolü (Eğer hepsi 0 ise model öğrenmemiştir)
-        if hasattr(models[first_model_key], 'feature_importances_'):
-            print(f"Öznitelik Önem Düzeyleri (İlk 5): {models[first_model_key].feature_importances_[:5]}")
-            if np.sum(models[first_model_key].feature_importances_) == 0:
-                print("!!! UYARI: Modelin öznitelik önem değerleri 0. Model hiçbir şey öğrenmemiş!")
-            else:
-                print("Model öznitelikleri kullanmış görünüyor.")
-                
+    print("Model kaydı okunuyor...")
+    registry = open_registry()
+    if registry is None:
+        print(f"Model kaydı ({REGISTRY_DIR}/{MANIFEST_FILE}) bulunamadı. Önce 'solar_prediction.py' çalıştırılmalı.")
     else:
-        print("Model yapısı beklenen sözlük formatında değil.")
+        print(f"Model sayısı: {len(registry.names())}")
+        for name in registry.names():
+            info = registry.info(name)
+            print(f"\n{name} ({info['class']}, {info['size_bytes'] / 1024:.0f} KB)")
+            
+            # Ağaç sayısına bakarak eğitilip eğitilmediğini kontrol et
+            if 'n_estimators' in info:
+                print(f"Ağaç sayısı (n_estimators): {info['n_estimators']}")
+            
+            # Feature importance kontrolü (Eğer hepsi 0 ise model öğrenmemiştir)
+            importances = info.get('feature_importances')
+            if importances is not None:
+                print(f"Öznitelik Önem Düzeyleri (İlk 5): {np.round(importances[:5], 4)}")
+                if np.sum(importances) == 0:
+                    print("!!! UYARI: Modelin öznitelik önem değerleri 0. Model hiçbir şey öğrenmemiş!")
+                else:
+                    print("Model öznitelikleri kullanmış görünüyor.")
 
 except Exception as e:
     print(f"Hata oluştu: {e}")
 
-# 2. Veri setini kontrol et
+# 2. Modellerin eğitildiği veri deposunu kontrol et (prepare_data.py çıktısı)
 try:
-    df = pd.read_csv('dataset_final.csv')
-    print(f"\nVeri seti boyutu: {df.shape}")
-    if df.empty:
-        print("!!! KRİTİK HATA: dataset_final.csv BOŞ!")
+    days = list_partitions(STORE_DIR)
+    if not days:
+        print(f"\n!!! KRİTİK HATA: Veri deposu ({STORE_DIR}/) boş veya yok. Önce 'prepare_data.py' çalıştırılmalı.")
     else:
-        print("Veri seti dolu görünüyor.")
+        df = read_range(STORE_DIR)
+        print(f"\nVeri deposu boyutu: {df.shape} ({len(days)} gün bölümü)")
+        if df.empty:
+            print(f"!!! KRİTİK HATA: {STORE_DIR}/ bölümleri BOŞ!")
+        else:
+            print(f"Kapsanan aralık: {df.index.min()} -> {df.index.max()}")
+            expected = pd.date_range(df.index.min().normalize(), df.index.max().normalize(), freq='D').date
+            missing_days = sorted(set(expected) - {pd.Timestamp(d).date() for d in days})
+            if missing_days:
+                print(f"Uyarı: Aralıkta bölümü olmayan {len(missing_days)} gün var: "
+                      f"{', '.join(str(d) for d in missing_days[:10])}")
+            print("Veri deposu dolu görünüyor.")
 except Exception as e:
-    print(f"Veri seti okunamadı: {e}")
\ No newline at end of file
+    print(f"Veri deposu okunamadı: {e}")
\ No newline at end of file
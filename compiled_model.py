@@ -0,0 +1,427 @@
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# Bağımlılıksız (yalnızca NumPy) ağaç topluluğu tahmincisi.
+# XGBoost / LightGBM / Random Forest / Extra Trees modelleri düz düğüm
+# dizilerine (özellik, eşik, sol/sağ çocuk, eksik değer yönü, yaprak değeri)
+# çevrilir ve '<model>.compiled/' dizinine .npy olarak yazılır. Tahmin, tüm
+# ağaçlar ve satırlar üzerinde aynı anda derinlik adımı kadar vektörel
+# indeksleme ile yapılır; dizinler bellek eşlemeli açılır. Böylece modeli
+# kullanmak için xgboost/lightgbm/sklearn yüklemek gerekmez.
+
+COMPILED_SUFFIX = '.compiled'
+ROW_BLOCK = 8192   # Ara (satır, ağaç) dizilerini sınırlamak için satır bloğu
+
+_ARRAYS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots')
+_META = 'meta.json'
+
+# Çıkışı doğrudan toplam olan (kimlik bağlantılı) hedefler
+_XGB_IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror')
+_LGB_IDENTITY_OBJECTIVES = ('regression', 'regression_l1', 'huber', 'fair', 'quantile')
+
+class CompiledTreeEnsemble:
+    """
+    Düz dizilerle temsil edilen ağaç topluluğu. Yaprak düğümlerde feature = -1.
+    op: 'lt' (x < eşik, XGBoost) veya 'le' (x <= eşik, LightGBM/sklearn)
+    aggregation: 'sum' (boosting) veya 'mean' (orman)
+    """
+
+    def __init__(self, arrays, meta):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.op = meta['op']
+        self.aggregation = meta['aggregation']
+        self.base_score = meta['base_score']
+        self.max_depth = meta['max_depth']
+        self.accumulate_dtype = np.dtype(meta['accumulate_dtype'])
+        self.n_features = meta['n_features']
+        self.feature_names_in_ = np.array(meta['feature_names'], dtype=object) if meta.get('feature_names') else None
+
+    def _leaf_values(self, X):
+        """(satır, ağaç) boyutlu yaprak değerleri."""
+        n_rows = len(X)
+        n_trees = len(self.roots)
+        rows = np.arange(n_rows)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            active = feature >= 0
+            if not active.any():
+                break
+            x = X[rows, np.maximum(feature, 0)]
+            threshold = self.threshold[node]
+            go_left = (x < threshold) if self.op == 'lt' else (x <= threshold)
+            go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            node = np.where(active, np.where(go_left, self.left[node], self.right[node]), node)
+
+        return self.value[node]
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Beklenen özellik sayısı {self.n_features}, gelen: {X.shape}")
+        # Eşikler float64 tutulur; float32 girdinin float64'e çevrilmesi sırayı korur
+        X = X.astype(np.float64)
+
+        out = np.empty(len(X), dtype=self.accumulate_dtype)
+        for start in range(0, len(X), ROW_BLOCK):
+            leaves = self._leaf_values(X[start:start + ROW_BLOCK]).astype(self.accumulate_dtype)
+            # Kütüphanelerle aynı sırada, ağaç ağaç topla
+            total = np.full(len(leaves), self.base_score, dtype=self.accumulate_dtype)
+            for t in range(leaves.shape[1]):
+                total += leaves[:, t]
+            if self.aggregation == 'mean':
+                total /= leaves.shape[1]
+            out[start:start + ROW_BLOCK] = total
+        return out
+
+def _pack(trees, meta):
+    """
+    trees: her ağaç için (feature, threshold, left, right, default_left, value)
+    yerel düğüm dizileri. Çocuk indeksleri genel indekslere kaydırılır.
+    """
+    parts = {name: [] for name in _ARRAYS if name != 'roots'}
+    roots = []
+    offset = 0
+    max_depth = 0
+    for feature, threshold, left, right, default_left, value in trees:
+        feature = np.asarray(feature, dtype=np.int32)
+        left = np.asarray(left, dtype=np.int32)
+        right = np.asarray(right, dtype=np.int32)
+        is_leaf = feature < 0
+        roots.append(offset)
+        parts['feature'].append(np.where(is_leaf, -1, feature).astype(np.int32))
+        parts['threshold'].append(np.asarray(threshold, dtype=np.float64))
+        parts['left'].append(np.where(is_leaf, 0, left + offset).astype(np.int32))
+        parts['right'].append(np.where(is_leaf, 0, right + offset).astype(np.int32))
+        parts['default_left'].append(np.asarray(default_left, dtype=bool))
+        parts['value'].append(np.asarray(value, dtype=np.float64))
+        max_depth = max(max_depth, _tree_depth(left, right, is_leaf))
+        offset += len(feature)
+
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    arrays['roots'] = np.asarray(roots, dtype=np.int32)
+    meta = dict(meta, max_depth=int(max_depth), n_nodes=int(offset), n_trees=len(roots))
+    return CompiledTreeEnsemble(arrays, meta)
+
+def _tree_depth(left, right, is_leaf):
+    # Çocuklar her zaman ebeveynden sonra numaralanmayabilir; ağaç kökten dolaşılır
+    stack = [(0, 0)]
+    max_depth = 0
+    while stack:
+        node, d = stack.pop()
+        max_depth = max(max_depth, d)
+        if not is_leaf[node]:
+            stack.append((int(left[node]), d + 1))
+            stack.append((int(right[node]), d + 1))
+    return max_depth
+
+def _compile_xgboost(model):
+    booster = model.get_booster()
+    raw = json.loads(booster.save_raw('json'))
+    learner = raw['learner']
+    objective = learner['objective']['name']
+    params = learner['learner_model_param']
+    if objective not in _XGB_IDENTITY_OBJECTIVES or int(params.get('num_target', 1)) > 1 or int(params.get('num_class', 0)) > 0:
+        raise ValueError(f"Desteklenmeyen XGBoost hedefi: {objective}")
+
+    gbtree = learner['gradient_booster']
+    if gbtree.get('name') != 'gbtree':
+        raise ValueError(f"Desteklenmeyen XGBoost booster türü: {gbtree.get('name')}")
+    trees = gbtree['model']['trees']
+
+    # Erken durdurma kullanıldıysa predict() yalnızca en iyi iterasyona kadar olan ağaçları kullanır
+    try:
+        n_parallel = int(gbtree['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+        trees = trees[:(model.best_iteration + 1) * n_parallel]
+    except AttributeError:
+        pass
+
+    packed = []
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Kategorik bölmeli XGBoost ağaçları desteklenmiyor.")
+        left = np.asarray(tree['left_children'])
+        is_leaf = left == -1
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        packed.append((
+            np.where(is_leaf, -1, tree['split_indices']),
+            conditions.astype(np.float64),
+            left,
+            np.asarray(tree['right_children']),
+            np.asarray(tree['default_left'], dtype=bool),
+            # Yaprak değeri yaprak düğümün split_conditions alanında tutulur
+            np.where(is_leaf, conditions, 0).astype(np.float64)
+        ))
+
+    # base_score '[8.176045E2]' veya '8.176045E2' biçiminde gelebilir
+    base_score = float(np.float32(params['base_score'].strip('[]')))
+    return _pack(packed, {
+        'source': 'xgboost',
+        'op': 'lt',
+        'aggregation': 'sum',
+        'base_score': base_score,
+        'accumulate_dtype': 'float32',
+        'n_features': int(params['num_feature']),
+        'feature_names': learner.get('feature_names') or None
+    })
+
+def _compile_lightgbm(model):
+    booster = model.booster_
+    dump = booster.dump_model()
+    objective = dump.get('objective', '').split()[0]
+    if objective not in _LGB_IDENTITY_OBJECTIVES or dump.get('num_class', 1) > 1:
+        raise ValueError(f"Desteklenmeyen LightGBM hedefi: {objective}")
+
+    tree_info = dump['tree_info']
+    best_iteration = getattr(model, 'best_iteration_', None)
+    if best_iteration:
+        tree_info = tree_info[:best_iteration]
+
+    packed = []
+    for info in tree_info:
+        nodes = []
+
+        def visit(node):
+            index = len(nodes)
+            nodes.append(None)
+            if 'leaf_value' in node:
+                nodes[index] = (-1, 0.0, 0, 0, False, node['leaf_value'])
+                return index
+            if node.get('decision_type', '<=') != '<=':
+                raise ValueError("Kategorik bölmeli LightGBM ağaçları desteklenmiyor.")
+            left = visit(node['left_child'])
+            right = visit(node['right_child'])
+            nodes[index] = (node['split_feature'], node['threshold'], left, right, node.get('default_left', True), 0.0)
+            return index
+
+        visit(info['tree_structure'])
+        packed.append(tuple(np.array(column) for column in zip(*nodes)))
+
+    return _pack(packed, {
+        'source': 'lightgbm',
+        'op': 'le',
+        'aggregation': 'mean' if dump.get('average_output') else 'sum',
+        'base_score': 0.0,
+        'accumulate_dtype': 'float64',
+        'n_features': int(dump['max_feature_idx']) + 1,
+        'feature_names': dump.get('feature_names') or None
+    })
+
+def _compile_sklearn_forest(model):
+    packed = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Çok çıkışlı ormanlar desteklenmiyor.")
+        is_leaf = tree.children_left == -1
+        # Eksik değer yönü eğitimde öğrenilir (NaN görülmeyen bölmelerde çok örnekli çocuk)
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        if missing_left is None:
+            missing_left = np.zeros(tree.node_count, dtype=bool)
+        packed.append((
+            np.where(is_leaf, -1, tree.feature),
+            tree.threshold,
+            tree.children_left,
+            tree.children_right,
+            np.asarray(missing_left, dtype=bool),
+            tree.value[:, 0, 0]
+        ))
+
+    feature_names = getattr(model, 'feature_names_in_', None)
+    return _pack(packed, {
+        'source': type(model).__name__,
+        'op': 'le',
+        'aggregation': 'mean',
+        'base_score': 0.0,
+        'accumulate_dtype': 'float64',
+        'n_features': int(model.n_features_in_),
+        'feature_names': list(feature_names) if feature_names is not None else None
+    })
+
+def compile_model(model):
+    """
+    Eğitilmiş ağaç modelini CompiledTreeEnsemble'a çevirir.
+    Desteklenmeyen modellerde (ör. CatBoost, MLP, doğrusal) ValueError verir.
+    """
+    name = type(model).__name__
+    if name == 'XGBRegressor':
+        return _compile_xgboost(model)
+    if name == 'LGBMRegressor':
+        return _compile_lightgbm(model)
+    if name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        return _compile_sklearn_forest(model)
+    raise ValueError(f"Derlenemeyen model türü: {name}")
+
+def compiled_path(model_path):
+    """Model dosyasının yanındaki derlenmiş dizin: best_solar_model.joblib -> best_solar_model.compiled"""
+    return os.path.splitext(model_path)[0] + COMPILED_SUFFIX
+
+def _sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def save_compiled(compiled, path, source_path=None):
+    """Dizileri .npy olarak geçici dizine yazıp atomik olarak yerine taşır."""
+    from forecast_cache import publish_mode   # Yalnızca yazarken: yükleme NumPy dışında bağımlılık istemez
+
+    meta = dict(compiled.meta)
+    if source_path is not None:
+        meta['source_sha256'] = _sha256(source_path)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(getattr(compiled, name)))
+        with open(os.path.join(tmp_dir, _META), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        publish_mode(tmp_dir, path)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_dir, path)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return path
+
+def load_compiled(path, mmap_mode='r'):
+    """Derlenmiş modeli bellek eşlemeli açar."""
+    with open(os.path.join(path, _META), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in _ARRAYS}
+    return CompiledTreeEnsemble(arrays, meta)
+
+def load_compiled_for(model_path):
+    """
+    Model dosyasının derlenmiş karşılığı varsa ve hâlâ aynı modelden
+    üretilmişse (sha256 eşleşmesi) onu döndürür; aksi halde None.
+    """
+    path = compiled_path(model_path)
+    if not os.path.isdir(path):
+        return None
+    try:
+        compiled = load_compiled(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if compiled.meta.get('source_sha256') != _sha256(model_path):
+        # Model yeniden eğitilmiş: eski derleme kullanılmaz
+        return None
+    return compiled
+
+def export_model(model, model_path, output=None):
+    """Modeli derleyip model dosyasının yanına yazar; derlenemiyorsa None döner."""
+    try:
+        compiled = compile_model(model)
+    except ValueError as e:
+        print(f"[i] Derlenmiş model üretilmedi: {e}")
+        return None
+    return save_compiled(compiled, output or compiled_path(model_path), source_path=model_path)
+
+def verification_matrix(compiled, n_rows=10000, seed=0, nan_fraction=0.05):
+    """
+    Eşik aralıklarını kapsayan rastgele bir doğrulama matrisi üretir. Hücrelerin
+    nan_fraction kadarı NaN yapılır; eksik değer yönleri de karşılaştırılır.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_rows, compiled.n_features), dtype=np.float32)
+    for j in range(compiled.n_features):
+        thresholds = compiled.threshold[compiled.feature == j]
+        # NaN'la eğitilmiş modellerde eşik inf (sklearn) veya 1e300 (LightGBM) olabilir;
+        # bunlar aralığa katılırsa örnekler float32'de inf olur
+        thresholds = thresholds[np.abs(thresholds) < np.finfo(np.float32).max]
+        if len(thresholds):
+            low, high = thresholds.min(), thresholds.max()
+            margin = (high - low) * 0.1 + 1
+            X[:, j] = rng.uniform(low - margin, high + margin, n_rows)
+    X[rng.random(X.shape) < nan_fraction] = np.nan
+    return X
+
+def max_difference(compiled, model, n_rows=10000, seed=0):
+    """Doğrulama matrisinde derlenmiş model ile kaynak model arasındaki en büyük mutlak fark."""
+    X = verification_matrix(compiled, n_rows, seed)
+    expected = np.asarray(model.predict(X), dtype=np.float64)
+    return float(np.max(np.abs(compiled.predict(X) - expected)))
+
+def _parity_models():
+    """Öz denetim için desteklenen model aileleri (kurulu olanlar)."""
+    from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+    models = {
+        'Random Forest': RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0),
+        'Extra Trees': ExtraTreesRegressor(n_estimators=20, max_depth=8, random_state=0)
+    }
+    try:
+        from xgboost import XGBRegressor
+        models['XGBoost'] = XGBRegressor(n_estimators=30, max_depth=5, random_state=0)
+    except ImportError:
+        pass
+    try:
+        from lightgbm import LGBMRegressor
+        models['LightGBM'] = LGBMRegressor(n_estimators=30, num_leaves=15, random_state=0, verbose=-1)
+    except ImportError:
+        pass
+    return models
+
+def parity_check(tolerance=1e-3, n_rows=5000, n_features=8, nan_fraction=0.1, seed=0):
+    """
+    Her model ailesini eksik değer (NaN) içeren yapay veriyle eğitir, derler ve
+    doğrulama matrisinde kaynak modelle karşılaştırır. Dönüş: başarısız aileler.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32) * 100
+    y = X[:, 0] * 3 + np.sin(X[:, 1] / 20) * 50 + X[:, 2] * X[:, 3] / 100
+    X[rng.random(X.shape) < nan_fraction] = np.nan
+
+    failures = []
+    for name, model in _parity_models().items():
+        model.fit(X, y)
+        compiled = compile_model(model)
+        max_diff = max(max_difference(compiled, model), float(np.max(np.abs(
+            compiled.predict(X) - np.asarray(model.predict(X), dtype=np.float64)))))
+        status = "OK" if max_diff <= tolerance else "UYARI"
+        print(f"[{status}] {name:<14} (NaN ile eğitildi): en büyük fark {max_diff:.6f}")
+        if max_diff > tolerance:
+            failures.append(name)
+    return failures
+
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Ağaç modelini yalnızca NumPy ile çalışan düz dizilere derler")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Kaynak model dosyası (.joblib)")
+    parser.add_argument('--output', default=None, help="Çıktı dizini (varsayılan: <model>.compiled)")
+    parser.add_argument('--tolerance', type=float, default=1e-3, help="Doğrulamada izin verilen en büyük mutlak fark (W)")
+    parser.add_argument('--self-test', action='store_true',
+                        help="Desteklenen model ailelerini NaN içeren yapay veriyle eğitip derlenmiş karşılıklarıyla karşılaştır")
+    args = parser.parse_args()
+
+    if args.self_test:
+        failures = parity_check(args.tolerance)
+        if failures:
+            print(f"Hata: Derlenmiş model farklı sonuç veriyor: {', '.join(failures)}")
+            raise SystemExit(1)
+        return
+
+    model = joblib.load(args.model)
+    path = export_model(model, args.model, args.output)
+    if path is None:
+        return
+
+    compiled = load_compiled(path)
+    max_diff = max_difference(compiled, model)
+    status = "OK" if max_diff <= args.tolerance else "UYARI"
+    print(f"[{status}] '{path}' yazıldı: {compiled.meta['n_trees']} ağaç, {compiled.meta['n_nodes']} düğüm, "
+          f"en büyük fark {max_diff:.6f} W")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import pandas as pd
+import os
+import tempfile
+
+from forecast_cache import publish_mode
+
+# Tarihe göre bölümlenmiş (partitioned), sadece eklemeli sütunsal veri deposu.
+# Her gün ayrı bir Parquet dosyasıdır: dataset_store/date=YYYY-MM-DD/part.parquet
+# Yeni haftalık dışa aktarım yalnızca kendi günlerini yazar; geçmiş yeniden
+# yazılmaz. Okumada tarih aralığı dışındaki bölümler hiç açılmaz.
+# Parquet için 'pyarrow' paketi gereklidir.
+
+STORE_DIR = 'dataset_store'
+INDEX_NAME = 'timestamp'
+
+_PREFIX = 'date='
+_PART_FILE = 'part.parquet'
+
+def _partition_dir(store_dir, day):
+    return os.path.join(store_dir, f"{_PREFIX}{day}")
+
+def list_partitions(store_dir=STORE_DIR):
+    """Depodaki bölüm tarihlerini (YYYY-MM-DD metni) sıralı döndürür."""
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(
+        name[len(_PREFIX):]
+        for name in os.listdir(store_dir)
+        if name.startswith(_PREFIX) and os.path.exists(os.path.join(store_dir, name, _PART_FILE))
+    )
+
+def _write_partition(store_dir, day, df_day):
+    """Bölümü geçici dosyaya yazıp atomik olarak yerine taşır."""
+    part_dir = _partition_dir(store_dir, day)
+    os.makedirs(part_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=part_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        df_day.to_parquet(tmp_path)
+        publish_mode(tmp_path, os.path.join(part_dir, _PART_FILE))
+        os.replace(tmp_path, os.path.join(part_dir, _PART_FILE))
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def append_partitions(df, store_dir=STORE_DIR):
+    """
+    Zaman indeksli tabloyu günlük bölümlere ekler. Aynı güne ait bölüm varsa
+    yalnızca o gün yeniden yazılır; aynı zaman damgasında yeni satır eskisini ezer.
+    Yazılan günlerin listesini döndürür.
+    """
+    if df.empty:
+        return []
+
+    df = df.sort_index()
+    df.index.name = INDEX_NAME
+    existing = set(list_partitions(store_dir))
+    written = []
+
+    for day, df_day in df.groupby(df.index.normalize()):
+        day = day.strftime('%Y-%m-%d')
+        if day in existing:
+            old = pd.read_parquet(os.path.join(_partition_dir(store_dir, day), _PART_FILE))
+            df_day = pd.concat([old, df_day])
+            df_day = df_day[~df_day.index.duplicated(keep='last')].sort_index()
+        _write_partition(store_dir, day, df_day)
+        written.append(day)
+
+    return written
+
+def read_range(store_dir=STORE_DIR, start=None, end=None, columns=None):
+    """
+    [start, end) aralığındaki satırları okur. Aralık dışındaki bölümler
+    dizin adından elenir ve diskten hiç okunmaz. columns ile sütun seçilebilir.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    days = list_partitions(store_dir)
+    if start is not None:
+        days = [d for d in days if pd.Timestamp(d) + pd.Timedelta(days=1) > start]
+    if end is not None:
+        days = [d for d in days if pd.Timestamp(d) < end]
+
+    if not days:
+        return pd.DataFrame(columns=columns or []).rename_axis(INDEX_NAME)
+
+    frames = [
+        pd.read_parquet(os.path.join(_partition_dir(store_dir, d), _PART_FILE), columns=columns)
+        for d in days
+    ]
+    df = pd.concat(frames)
+    if start is not None:
+        df = df[df.index >= start]
+    if end is not None:
+        df = df[df.index < end]
+    return df
@@ -0,0 +1,222 @@
+import numpy as np
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+
+from feature_pipeline import load_pipeline
+from forecast_cache import publish_mode
+from result_cache import artifact_digest
+from calibration import load_calibration_for
+from solar_geometry import GEOMETRY_VERSION, HORIZON_DEG, SUN_UP_COLUMN
+from solar_wizard import find_model_path, load_model, load_feature_frame, feature_matrix, predict_power
+from tracing import stage
+
+# Tahmin revizyonlarında yalnızca değişen satırları yeniden puanlama (nowcasting).
+# Open-Meteo tahminleri gün içinde birkaç kez yeniden yayımlar; yeni dosyadaki
+# satırların çoğu bir öncekiyle aynıdır. Her site için son puanlanan tahmin
+# (zaman, özellik matrisi, gündüz maskesi, tahmin ve günlük toplamlar) diskte
+# tutulur. Yeni dosya zaman damgası ve özellik değerleri üzerinden satır satır
+# karşılaştırılır; model yalnızca değişen ya da yeni satırlar için çalışır ve
+# günlük toplamlar farklar eklenerek güncellenir. Model, kalibrasyon tablosu
+# özellik listesi veya geometri sürümü değişirse durum geçersizdir ve tam puanlama yapılır.
+#
+#   python delta_scoring.py forecast_data.json --site ev
+#   python delta_scoring.py --manifest fetched_forecasts.txt
+
+DELTA_STATE_DIR = '.delta_state'
+SLOT_HOURS = 0.25
+
+def _state_path(site, state_dir=DELTA_STATE_DIR):
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', site)
+    return os.path.join(state_dir, f'{safe}.npz')
+
+def load_state(site, state_dir=DELTA_STATE_DIR):
+    """Sitenin son puanlama durumu; yoksa veya okunamıyorsa None."""
+    path = _state_path(site, state_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = {name: data[name] for name in data.files}
+        state['signature'] = json.loads(str(state['signature']))
+        return state
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_state(site, state, state_dir=DELTA_STATE_DIR):
+    """Durumu geçici dosyaya yazıp atomik olarak yerine taşır."""
+    os.makedirs(state_dir, exist_ok=True)
+    arrays = dict(state)
+    arrays['signature'] = np.array(json.dumps(state['signature'], sort_keys=True, ensure_ascii=False))
+    fd, tmp_path = tempfile.mkstemp(dir=state_dir, prefix='.tmp-', suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        publish_mode(tmp_path, _state_path(site, state_dir))
+        os.replace(tmp_path, _state_path(site, state_dir))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _daily_by(days, daily_date, energy_wh):
+    """Enerjiyi daily_date sırasındaki günlere toplar (float64)."""
+    return np.bincount(np.searchsorted(daily_date, days), weights=energy_wh, minlength=len(daily_date))
+
+class DeltaScorer:
+    """Bir model + kalibrasyon için siteler arası paylaşılan yeniden puanlayıcı."""
+
+    def __init__(self, model_path='best_solar_model.joblib', state_dir=DELTA_STATE_DIR):
+        self.model_path = find_model_path(model_path)
+        self.model = load_model(model_path)
+        self.pipeline = load_pipeline()
+        self.calibration = load_calibration_for(self.model_path)
+        self.state_dir = state_dir
+        self.signature = {
+            'model': artifact_digest(self.model_path),
+            'calibration': self.calibration.digest(),
+            'features': self.pipeline.features,
+            'night_gate': HORIZON_DEG,
+            'geometry': GEOMETRY_VERSION
+        }
+
+    def _predict(self, X, sun_up):
+        return predict_power(self.model, X, self.pipeline, sun_up, self.calibration)
+
+    def rescore(self, site, json_path, use_cache=True):
+        """
+        Sitenin yeni tahmin dosyasını puanlar. Dönüş: time, power_w, daily_date,
+        daily_wh dizileri ile rows / changed_rows / full (tam puanlama mı) bilgisi.
+        """
+        df = load_feature_frame(json_path, use_cache)
+        if df is None:
+            return None
+        times = df['time'].to_numpy().astype('datetime64[m]')
+        X = feature_matrix(df, self.pipeline)
+        sun_up = df[SUN_UP_COLUMN].to_numpy().astype(bool)
+        days = times.astype('datetime64[D]')
+        daily_date = np.unique(days)
+
+        state = load_state(site, self.state_dir)
+        if state is None or state['signature'] != self.signature:
+            # İlk çalıştırma veya model/kalibrasyon değişti: tüm satırlar
+            with stage('delta_predict', rows=len(X)):
+                power_w = self._predict(X, sun_up)
+            daily_wh = _daily_by(days, daily_date, power_w * SLOT_HOURS)
+            changed = np.ones(len(X), dtype=bool)
+            full = True
+        else:
+            old_times = state['time']
+            old_power = state['power_w']
+
+            # Zaman damgası eşleşmesi (iki dizi de sıralı)
+            with stage('delta_diff', rows=len(X)):
+                pos = np.searchsorted(old_times, times)
+                matched = pos < len(old_times)
+                matched[matched] = old_times[pos[matched]] == times[matched]
+                new_rows = np.flatnonzero(matched)
+                old_rows = pos[matched]
+
+                # Eşleşen satırlarda özellikler veya gündüz maskesi değiştiyse yeniden puanla
+                same = np.zeros(len(X), dtype=bool)
+                same[new_rows] = (
+                    (X[new_rows] == state['X'][old_rows]).all(axis=1)
+                    & (sun_up[new_rows] == state['sun_up'][old_rows])
+                )
+                changed = ~same
+
+            power_w = np.empty(len(X), dtype=old_power.dtype)
+            power_w[new_rows] = old_power[old_rows]
+            if changed.any():
+                with stage('delta_predict', rows=int(changed.sum())):
+                    power_w[changed] = self._predict(X[changed], sun_up[changed])
+
+            # Günlük toplamlar: önceki değerlerden farklar eklenerek
+            with stage('delta_daily', rows=int(changed.sum())):
+                daily_wh = np.zeros(len(daily_date))
+                kept = np.isin(state['daily_date'], daily_date)
+                daily_wh[np.searchsorted(daily_date, state['daily_date'][kept])] = state['daily_wh'][kept]
+
+                # Yeni dosyada artık bulunmayan eski satırlar (kalan günlerden) düşülür
+                dropped = np.ones(len(old_times), dtype=bool)
+                dropped[old_rows] = False
+                dropped &= np.isin(old_times.astype('datetime64[D]'), daily_date)
+                delta_wh = np.zeros(len(X))
+                delta_wh[changed] = power_w[changed] * SLOT_HOURS
+                changed_old = changed[new_rows]
+                delta_wh[new_rows[changed_old]] -= old_power[old_rows[changed_old]] * SLOT_HOURS
+                daily_wh += _daily_by(days, daily_date, delta_wh)
+                daily_wh -= _daily_by(old_times[dropped].astype('datetime64[D]'), daily_date,
+                                      old_power[dropped] * SLOT_HOURS)
+            full = False
+
+        save_state(site, {
+            'time': times,
+            'X': X,
+            'sun_up': sun_up,
+            'power_w': power_w,
+            'daily_date': daily_date,
+            'daily_wh': daily_wh,
+            'signature': self.signature
+        }, self.state_dir)
+
+        return {
+            'time': times,
+            'power_w': power_w,
+            'daily_date': daily_date,
+            'daily_wh': daily_wh,
+            'previous_daily': None if state is None else (state['daily_date'], state['daily_wh']),
+            'rows': len(X),
+            'changed_rows': int(changed.sum()),
+            'full': full
+        }
+
+def print_rescore(site, result, seconds):
+    """Yeniden puanlama özetini ve önceki revizyona göre günlük farkları yazdırır."""
+    mode = 'tam' if result['full'] else 'fark'
+    print(f"\n--- {site}: {result['changed_rows']}/{result['rows']} satır yeniden puanlandı ({mode}, {seconds * 1000:.1f} ms) ---")
+    previous = dict(zip(*result['previous_daily'])) if result['previous_daily'] is not None else {}
+    print(f"{'Tarih':<12} | {'Üretim (kWh)':>12} | {'Değişim (kWh)':>14}")
+    print("-" * 44)
+    for date, energy_wh in zip(result['daily_date'], result['daily_wh']):
+        old = previous.get(date)
+        change = f"{(energy_wh - old) / 1000:>+14.2f}" if old is not None else f"{'yeni':>14}"
+        print(f"{str(date):<12} | {energy_wh / 1000:>12.2f} | {change}")
+
+def main():
+    from batch_scoring import collect_forecast_files
+
+    parser = argparse.ArgumentParser(description="Tahmin revizyonlarında yalnızca değişen satırları yeniden puanlama")
+    parser.add_argument('forecast', nargs='?', default=None, help="Yeni tahmin JSON dosyası")
+    parser.add_argument('--site', default=None, help="Site adı (varsayılan: dosya adı)")
+    parser.add_argument('--manifest', default=None, help="'site,yol' manifesti veya JSON dizini (ör. forecast_fetch çıktısı)")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Model dosyası")
+    parser.add_argument('--state-dir', default=DELTA_STATE_DIR, help="Site durumlarının tutulduğu dizin")
+    args = parser.parse_args()
+
+    if args.manifest is not None:
+        entries = collect_forecast_files(args.manifest)
+    elif args.forecast is not None:
+        entries = [(args.site or os.path.splitext(os.path.basename(args.forecast))[0], args.forecast)]
+    else:
+        print("Hata: Tahmin dosyası veya --manifest belirtilmeli.")
+        return
+
+    if find_model_path(args.model) is None:
+        print(f"Hata: Model dosyası ({args.model}) bulunamadı.")
+        return
+    scorer = DeltaScorer(args.model, args.state_dir)
+
+    for site, path in entries:
+        start = time.perf_counter()
+        result = scorer.rescore(site, path)
+        if result is None:
+            print(f"Uyarı: '{site}' atlandı ({path} okunamadı).")
+            continue
+        print_rescore(site, result, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
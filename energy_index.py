@@ -0,0 +1,85 @@
+import numpy as np
+
+# Önek toplamı (prefix sum) tabanlı enerji indeksi.
+# 15 dakikalık enerji tahminlerinin kümülatif toplamı bir kez hesaplanır;
+# herhangi bir [başlangıç, bitiş) aralığının enerjisi iki indeks okuması ve
+# bir çıkarmayla bulunur. Zaman ızgarası düzenliyse (Open-Meteo çıktısı)
+# konum aritmetikle O(1), değilse ikili aramayla bulunur. Saat, gün ve ay
+# sınırlarının konumları da bir kez çıkarılır; bu çözünürlüklerdeki özetler
+# tabloyu yeniden gruplamadan kümülatif diziden okunur.
+#
+# Aralıklar aralık etiketine göre seçilir: etiketi [başlangıç, bitiş) içinde
+# kalan aralıklar sayılır (günlük toplamlarla aynı tanım).
+
+SLOT_MINUTES = 15
+RESOLUTIONS = {'hour': 'datetime64[h]', 'day': 'datetime64[D]', 'month': 'datetime64[M]'}
+
+def _as_minutes(value):
+    return np.asarray(value, dtype='datetime64[m]')
+
+def season_start(date):
+    """Meteorolojik mevsimin ilk günü (1 Aralık, 1 Mart, 1 Haziran, 1 Eylül)."""
+    months = _as_minutes(date).astype('datetime64[M]')
+    month_of_year = months.astype(np.int64) % 12          # 0 = Ocak
+    offset = (month_of_year + 1) % 3                      # Aralık/Mart/Haziran/Eylül için 0
+    return (months - offset.astype('timedelta64[M]')).astype('datetime64[D]')
+
+class EnergyIndex:
+    def __init__(self, times, energy_wh, slot_minutes=SLOT_MINUTES):
+        """
+        times: sıralı datetime64 aralık etiketleri
+        energy_wh: aralık başına enerji (Wh)
+        """
+        self.times = _as_minutes(times)
+        self.slot = np.timedelta64(slot_minutes, 'm')
+        self.cumulative = np.concatenate([[0.0], np.cumsum(energy_wh, dtype=np.float64)])
+        self.regular = len(self.times) < 2 or bool(np.all(np.diff(self.times) == self.slot))
+
+        # Her çözünürlükte dönem etiketleri ve dönemlerin ilk aralığının konumu
+        self.offsets = {}
+        for resolution, unit in RESOLUTIONS.items():
+            periods = self.times.astype(unit)
+            starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]]) if len(periods) else np.empty(0, np.int64)
+            self.offsets[resolution] = (periods[starts], starts)
+
+    @classmethod
+    def from_results(cls, results):
+        """result_cache.summarize_predictions çıktısından indeksi kurar."""
+        return cls(results['time'], results['energy_wh'])
+
+    def position(self, when):
+        """Etiketi when'den küçük olmayan ilk aralığın konumu (dizi de kabul eder)."""
+        when = _as_minutes(when)
+        n = len(self.times)
+        if n == 0:
+            return np.zeros(when.shape, dtype=np.int64)
+        if self.regular:
+            delta = (when - self.times[0]) // np.timedelta64(1, 'm')
+            step = self.slot // np.timedelta64(1, 'm')
+            return np.clip(-(-delta // step), 0, n)
+        return np.searchsorted(self.times, when, side='left')
+
+    def energy(self, start, end):
+        """[start, end) aralığındaki toplam enerji (Wh); diziler verilirse vektörel."""
+        return self.cumulative[self.position(end)] - self.cumulative[self.position(start)]
+
+    def rollup(self, resolution):
+        """Saatlik / günlük / aylık toplamlar. Dönüş: (dönem etiketleri, enerji Wh)."""
+        labels, starts = self.offsets[resolution]
+        bounds = np.append(starts, len(self.times))
+        return labels, np.diff(self.cumulative[bounds])
+
+    def summary(self):
+        """Tüm çözünürlüklerdeki toplamlar: {'hour': (etiketler, Wh), 'day': ..., 'month': ...}."""
+        return {resolution: self.rollup(resolution) for resolution in RESOLUTIONS}
+
+    def season_to_date(self, date):
+        """Mevsim başından verilen günün sonuna kadarki enerji (tahmin kapsamı içinde)."""
+        day = _as_minutes(date).astype('datetime64[D]')
+        return self.energy(season_start(day), day + np.timedelta64(1, 'D'))
+
+    def coverage(self):
+        """İndeksin kapsadığı [ilk etiket, son etiket + aralık) penceresi."""
+        if not len(self.times):
+            return None, None
+        return self.times[0], self.times[-1] + self.slot
@@ -0,0 +1,115 @@
+import numpy as np
+import joblib
+import os
+from functools import lru_cache
+
+# Eğitim ve tüm tahmin giriş noktalarının ortak kullandığı özellik hattı.
+# Ham sütunlar (Open-Meteo JSON adları, eğitim CSV adları veya veri deposu
+# adları) tek geçişte, ara DataFrame oluşturmadan, bitişik (C-contiguous)
+# float32 matrise yazılır. Eğitimde model ile birlikte kaydedilir; böylece
+# eğitim ve tahmin aynı dönüşümü kullanır.
+
+PIPELINE_FILE = 'feature_pipeline.joblib'
+
+# Modelin beklediği özellik sütunları (eğitimdeki sırayla)
+FEATURES = [
+    'temperature_2m (°C)',
+    'shortwave_radiation (W/m²)',
+    'diffuse_radiation (W/m²)',
+    'direct_normal_irradiance (W/m²)',
+    'cloud_cover (%)',
+    'hour',
+    'month',
+    'dayofyear'
+]
+
+# Her özellik için kabul edilen kaynak sütun adları
+# (eğitim CSV'si, Open-Meteo JSON, prepare_data veri deposu)
+SOURCE_COLUMNS = {
+    'temperature_2m (°C)': ['temperature_2m (°C)', 'temperature_2m', 'temp_c'],
+    'shortwave_radiation (W/m²)': ['shortwave_radiation (W/m²)', 'shortwave_radiation', 'shortwave_rad'],
+    'diffuse_radiation (W/m²)': ['diffuse_radiation (W/m²)', 'diffuse_radiation', 'diffuse_rad'],
+    'direct_normal_irradiance (W/m²)': ['direct_normal_irradiance (W/m²)', 'direct_normal_irradiance', 'direct_rad'],
+    'cloud_cover (%)': ['cloud_cover (%)', 'cloud_cover']
+}
+
+# Zaman sütunundan türetilen özellikler
+TIME_FEATURES = ('hour', 'month', 'dayofyear')
+TIME_COLUMN = 'time'
+
+def _time_features(times):
+    """datetime64 dizisinden saat, ay ve yılın günü (pandas'sız, vektörel)."""
+    minutes = np.asarray(times).astype('datetime64[m]')
+    days = minutes.astype('datetime64[D]')
+    return {
+        'hour': (minutes - days).astype('timedelta64[h]').astype(np.int64),
+        'month': minutes.astype('datetime64[M]').astype(np.int64) % 12 + 1,
+        'dayofyear': (days - minutes.astype('datetime64[Y]')).astype(np.int64) + 1
+    }
+
+class FeaturePipeline:
+    """Ham sütunlardan modelin özellik matrisini üreten, kaydedilebilir dönüşüm."""
+
+    def __init__(self, features=None, source_columns=None, dtype=np.float32):
+        self.features = list(features or FEATURES)
+        self.source_columns = dict(source_columns or SOURCE_COLUMNS)
+        self.dtype = dtype
+
+    def index(self, feature):
+        """Özelliğin matristeki sütun numarası."""
+        return self.features.index(feature)
+
+    def _resolve(self, columns, feature):
+        for name in self.source_columns.get(feature, [feature]):
+            if name in columns:
+                return name
+        return None
+
+    def missing_columns(self, columns):
+        """Verilen kaynakta bulunamayan özelliklerin listesi."""
+        missing = []
+        for feature in self.features:
+            if feature in TIME_FEATURES:
+                if TIME_COLUMN not in columns:
+                    missing.append(feature)
+            elif self._resolve(columns, feature) is None:
+                missing.append(feature)
+        return missing
+
+    def transform(self, columns):
+        """
+        columns: sütun adı -> dizi eşlemesi (dict, DataFrame veya parça).
+        Dönüş: (satır, özellik) boyutlu, bitişik float32 matris.
+        """
+        missing = self.missing_columns(columns)
+        if missing:
+            raise KeyError(missing)
+
+        first = self.features[0]
+        n_rows = len(columns[TIME_COLUMN if first in TIME_FEATURES else self._resolve(columns, first)])
+        X = np.empty((n_rows, len(self.features)), dtype=self.dtype)
+
+        time_values = None
+        for j, feature in enumerate(self.features):
+            if feature in TIME_FEATURES:
+                if time_values is None:
+                    time_values = _time_features(columns[TIME_COLUMN])
+                X[:, j] = time_values[feature]
+            else:
+                X[:, j] = np.asarray(columns[self._resolve(columns, feature)])
+        return X
+
+    def save(self, path=PIPELINE_FILE):
+        joblib.dump(self, path)
+
+@lru_cache(maxsize=None)
+def load_pipeline(model_path=None):
+    """
+    Modelin yanında kaydedilmiş hattı yükler ('feature_pipeline.joblib').
+    Bulunamazsa varsayılan tanımlı hat döner.
+    """
+    directory = os.path.dirname(os.path.abspath(model_path)) if model_path else os.getcwd()
+    path = os.path.join(directory, PIPELINE_FILE)
+    if os.path.exists(path):
+        return joblib.load(path)
+    return FeaturePipeline()
@@ -0,0 +1,150 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+# Tahmin dosyaları için ikili (binary) önbellek.
+# Anahtar, kaynak JSON'un içerik özeti (sha256) ile tabloyu üreten ayarların
+# (özellik listesi, ufuk açısı, geometri sürümü) özetidir (frame_key). Hazır özellik
+# tablosu sütun dizileri halinde .npy dosyalarına yazılır; sonraki çalıştırmalar
+# bu dosyaları bellek eşlemeli (mmap) açar ve JSON ayrıştırmayı tamamen atlar.
+
+CACHE_DIR = '.forecast_cache'
+MAX_CACHE_BYTES = 512 * 1024 * 1024   # Önbelleğin toplam boyut sınırı
+MAX_AGE_SECONDS = 30 * 24 * 3600      # 30 gün kullanılmayan kayıtlar silinir
+
+_MANIFEST = 'manifest.json'
+_MATRIX = 'matrix.npy'
+
+def _read_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+# İçe aktarmada bir kez okunur: os.umask süreç genelinde ve iş parçacığı güvenli değil
+_UMASK = _read_umask()
+
+def publish_mode(tmp_path, target):
+    """
+    tempfile geçici dosyaları 0600, dizinleri 0700 izniyle açar ve os.replace
+    bu izni korur; başka kullanıcıyla çalışan servisler dosyayı okuyamaz.
+    Yerine taşımadan önce çağrılır: hedef varsa onun izni, yoksa umask'a göre
+    varsayılan izin (dosya 0666, dizin 0777, umask düşülerek) uygulanır.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = (0o777 if os.path.isdir(tmp_path) else 0o666) & ~_UMASK
+    os.chmod(tmp_path, mode)
+
+def file_digest(path, block_size=1 << 20):
+    """Dosya içeriğinin sha256 özetini blok blok okuyarak hesaplar."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def frame_key(forecast_digest, **extra):
+    """Tahmin özeti + tabloyu etkileyen ayarlardan kararlı anahtar (sha256)."""
+    payload = {'forecast': forecast_digest, 'extra': extra}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def _entry_size(entry_dir):
+    return sum(
+        os.path.getsize(os.path.join(entry_dir, name))
+        for name in os.listdir(entry_dir)
+    )
+
+def load_frame(digest, cache_dir=CACHE_DIR):
+    """
+    Önbellekteki tabloyu bellek eşlemeli dizilerden kurar; kayıt yoksa None.
+    Özellik matrisi tek blok olarak kopyalanmadan DataFrame'e bağlanır.
+    """
+    entry_dir = os.path.join(cache_dir, digest)
+    manifest_path = os.path.join(entry_dir, _MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        matrix = np.load(os.path.join(entry_dir, _MATRIX), mmap_mode='r')
+        df = pd.DataFrame(matrix, columns=manifest['matrix_columns'], copy=False)
+        for i, name in enumerate(manifest['columns']):
+            df[name] = np.load(os.path.join(entry_dir, f'col_{i}.npy'), mmap_mode='r')
+    except (OSError, ValueError, KeyError):
+        # Bozuk kayıt: sil ve yeniden oluşturulmasına izin ver
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+    # Son kullanım zamanını güncelle (eskime ve boyut tahliyesi için)
+    os.utime(entry_dir)
+    return df
+
+def store_frame(digest, df, matrix_columns, cache_dir=CACHE_DIR,
+                max_bytes=MAX_CACHE_BYTES, max_age=MAX_AGE_SECONDS):
+    """
+    Tabloyu önbelleğe yazar. matrix_columns tek bir 2 boyutlu matriste tutulur,
+    diğer sütunlar ayrı dizilere yazılır. Yazma geçici dizine yapılıp atomik
+    olarak yerine taşınır.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, digest)
+    if os.path.exists(entry_dir):
+        return
+
+    other_columns = [c for c in df.columns if c not in matrix_columns]
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        matrix = np.ascontiguousarray(df[matrix_columns].to_numpy())
+        np.save(os.path.join(tmp_dir, _MATRIX), matrix)
+        for i, name in enumerate(other_columns):
+            np.save(os.path.join(tmp_dir, f'col_{i}.npy'), df[name].to_numpy())
+
+        manifest = {
+            'matrix_columns': list(matrix_columns),
+            'columns': other_columns,
+            'rows': len(df),
+            'created': time.time()
+        }
+        with open(os.path.join(tmp_dir, _MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        publish_mode(tmp_dir, entry_dir)
+        os.replace(tmp_dir, entry_dir)
+    except OSError as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        print(f"Uyarı: Önbelleğe yazılamadı: {e}")
+        return
+
+    evict(cache_dir, max_bytes, max_age)
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, max_age=MAX_AGE_SECONDS):
+    """Eski kayıtları siler; toplam boyut sınırı aşılırsa en az yakın zamanda kullanılanları atar."""
+    if not os.path.isdir(cache_dir):
+        return
+
+    now = time.time()
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, name)
+        if name.startswith('.') or not os.path.isdir(entry_dir):
+            continue
+        last_used = os.path.getmtime(entry_dir)
+        if max_age is not None and now - last_used > max_age:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            continue
+        entries.append((last_used, _entry_size(entry_dir), entry_dir))
+
+    total = sum(size for _, size, _ in entries)
+    for last_used, size, entry_dir in sorted(entries):
+        if max_bytes is None or total <= max_bytes:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
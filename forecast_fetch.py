@@ -0,0 +1,369 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from urllib.parse import urlencode, urlsplit
+
+from forecast_cache import evict, publish_mode
+
+# Open-Meteo'dan çok sayıda site için eşzamanlı 'minutely_15' tahmini indirme.
+# İstekler asyncio ile, eşzamanlılık sınırı altında gönderilir; bloklayan
+# http.client çağrıları sınır kadar iş parçacığı olan kendi havuzunda çalışır
+# (varsayılan yürütücünün min(32, CPU + 4) sınırı --concurrency'yi kısmaz). Bağlantılar
+# host başına havuzda tutulur (keep-alive), her istek için yeniden TLS el
+# sıkışması yapılmaz. Yanıtlar disk önbelleğine yazılır:
+#   - TTL süresi dolmamışsa aynı pencere için hiç istek gönderilmez,
+#   - süre dolduysa ETag / Last-Modified ile koşullu istek yapılır (304 -> gövde diskten),
+#   - istek başarısız olursa eski kayıt 'stale' olarak kullanılır.
+# İndirilen dosyalar doğrudan batch_scoring ile puanlanabilir (--score).
+# --base-url ile yerel bir sahte sunucuya yönlendirilebilir (ağ gerekmez).
+
+DEFAULT_BASE_URL = 'https://api.open-meteo.com/v1/forecast'
+HTTP_CACHE_DIR = '.http_cache'
+MAX_HTTP_CACHE_BYTES = 256 * 1024 * 1024
+MAX_AGE_SECONDS = 7 * 24 * 3600          # 7 gün kullanılmayan kayıtlar silinir
+DEFAULT_TTL_SECONDS = 15 * 60            # minutely_15 verisi 15 dakikada bir güncellenir
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MANIFEST = 'fetched_forecasts.txt'
+
+# Modelin ve sihirbazın kullandığı değişkenler (Open-Meteo adlarıyla)
+MINUTELY_15_VARIABLES = (
+    'temperature_2m',
+    'shortwave_radiation',
+    'diffuse_radiation',
+    'direct_normal_irradiance',
+    'cloud_cover',
+    'is_day'
+)
+
+USER_AGENT = 'gunes-paneli-uretim-tahmini/1.0'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_BODY = 'body.json'
+_META = 'meta.json'
+
+FetchResult = namedtuple('FetchResult', ['site', 'path', 'status', 'seconds', 'error'])
+
+def forecast_url(latitude, longitude, base_url=DEFAULT_BASE_URL, variables=MINUTELY_15_VARIABLES,
+                 forecast_days=None, start_date=None, end_date=None, timezone='auto'):
+    """Bir site ve tahmin penceresi için istek adresi (parametreler sıralı; önbellek anahtarı)."""
+    params = {
+        'latitude': f"{float(latitude):.4f}",
+        'longitude': f"{float(longitude):.4f}",
+        'minutely_15': ','.join(variables),
+        'timezone': timezone
+    }
+    if start_date is not None:
+        params['start_date'] = start_date
+        params['end_date'] = end_date or start_date
+    elif forecast_days is not None:
+        params['forecast_days'] = int(forecast_days)
+    return f"{base_url}?{urlencode(sorted(params.items()))}"
+
+class ConnectionPool:
+    """
+    Host başına boşta bekleyen http.client bağlantıları. Bağlantı yanıt tamamen
+    okunduktan sonra havuza geri döner; sunucu kapattıysa bir kez yenisiyle denenir.
+    """
+
+    def __init__(self, max_idle_per_host=DEFAULT_CONCURRENCY, timeout=30):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, port, timeout=self.timeout), False
+
+    def _release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, url, headers):
+        """GET isteği (bloklayan). Dönüş: (durum kodu, küçük harfli başlıklar, gövde)."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        target = parts.path + (f"?{parts.query}" if parts.query else '')
+
+        for attempt in range(2):
+            connection, reused = self._acquire(key)
+            try:
+                connection.request('GET', target, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if reused and attempt == 0:
+                    continue   # Sunucu boşta bekleyen bağlantıyı kapatmış: yenisiyle dene
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, body
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for connection in idle:
+                    connection.close()
+            self._idle.clear()
+
+class HttpCache:
+    """Adres anahtarlı yanıt önbelleği: her kayıt bir dizinde gövde + doğrulayıcılar."""
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, ttl=DEFAULT_TTL_SECONDS, max_bytes=MAX_HTTP_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def lookup(self, url):
+        """Kayıt varsa (meta, gövde yolu); yoksa None."""
+        entry_dir = self.entry_dir(url)
+        try:
+            with open(os.path.join(entry_dir, _META), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        body_path = os.path.join(entry_dir, _BODY)
+        if not os.path.exists(body_path):
+            return None
+        os.utime(entry_dir)   # Son kullanım (tahliye için)
+        return meta, body_path
+
+    def is_fresh(self, meta):
+        """Kayıt TTL içinde mi (sunucu max-age bildirdiyse hangisi kısaysa)."""
+        limit = min(self.ttl, meta.get('max_age', self.ttl))
+        return time.time() - meta['fetched_at'] < limit
+
+    def _write(self, entry_dir, name, payload):
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        publish_mode(tmp_path, os.path.join(entry_dir, name))
+        os.replace(tmp_path, os.path.join(entry_dir, name))
+
+    def _meta(self, url, headers):
+        meta = {'url': url, 'fetched_at': time.time()}
+        for name in ('etag', 'last-modified'):
+            if name in headers:
+                meta[name] = headers[name]
+        # Sunucu Cache-Control: max-age bildirirse o kullanılır
+        for directive in headers.get('cache-control', '').split(','):
+            directive = directive.strip()
+            if directive.startswith('max-age='):
+                try:
+                    meta['max_age'] = int(directive[len('max-age='):])
+                except ValueError:
+                    pass
+        return meta
+
+    def store(self, url, headers, body):
+        """Gövdeyi ve doğrulayıcıları atomik olarak yazar; gövde yolunu döndürür."""
+        entry_dir = self.entry_dir(url)
+        os.makedirs(entry_dir, exist_ok=True)
+        self._write(entry_dir, _BODY, body)
+        self._write(entry_dir, _META, json.dumps(self._meta(url, headers)).encode('utf-8'))
+        evict(self.cache_dir, self.max_bytes, MAX_AGE_SECONDS)
+        return os.path.join(entry_dir, _BODY)
+
+    def revalidated(self, url, headers, meta):
+        """304 yanıtı: gövde aynı kalır, zaman ve doğrulayıcılar yenilenir."""
+        fresh = self._meta(url, headers)
+        for name in ('etag', 'last-modified'):
+            fresh.setdefault(name, meta.get(name))
+        fresh = {k: v for k, v in fresh.items() if v is not None}
+        self._write(self.entry_dir(url), _META, json.dumps(fresh).encode('utf-8'))
+
+class OpenMeteoFetcher:
+    """Çok siteli eşzamanlı indirici (havuzlu bağlantılar + koşullu istek önbelleği)."""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, max_concurrency=DEFAULT_CONCURRENCY,
+                 ttl=DEFAULT_TTL_SECONDS, cache_dir=HTTP_CACHE_DIR, timeout=30, retries=2, backoff=0.5):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.cache = HttpCache(cache_dir, ttl)
+        self.pool = ConnectionPool(max_concurrency, timeout)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='forecast-fetch')
+        self.retries = retries
+        self.backoff = backoff
+
+    async def fetch(self, site, latitude, longitude, semaphore, **window):
+        """Tek site. Durum: 'cache', 'revalidated', 'downloaded', 'stale' veya 'error'."""
+        start = time.perf_counter()
+        url = forecast_url(latitude, longitude, self.base_url, **window)
+        cached = self.cache.lookup(url)
+        if cached is not None and self.cache.is_fresh(cached[0]):
+            return FetchResult(site, cached[1], 'cache', time.perf_counter() - start, None)
+
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip', 'User-Agent': USER_AGENT}
+        if cached is not None:
+            if 'etag' in cached[0]:
+                headers['If-None-Match'] = cached[0]['etag']
+            if 'last-modified' in cached[0]:
+                headers['If-Modified-Since'] = cached[0]['last-modified']
+            elif 'etag' not in cached[0]:
+                headers['If-Modified-Since'] = formatdate(cached[0]['fetched_at'], usegmt=True)
+
+        error = None
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    status, response_headers, body = await loop.run_in_executor(
+                        self.executor, self.pool.request, url, headers)
+                except (OSError, http.client.HTTPException) as e:
+                    status, error = None, str(e) or type(e).__name__
+                else:
+                    if status == 304 and cached is not None:
+                        self.cache.revalidated(url, response_headers, cached[0])
+                        return FetchResult(site, cached[1], 'revalidated', time.perf_counter() - start, None)
+                    if status == 200:
+                        if response_headers.get('content-encoding') == 'gzip':
+                            body = gzip.decompress(body)
+                        error = _validate(body)
+                        if error is None:
+                            path = self.cache.store(url, response_headers, body)
+                            return FetchResult(site, path, 'downloaded', time.perf_counter() - start, None)
+                        break
+                    error = f"HTTP {status}: {_reason(body)}"
+                    if status not in RETRY_STATUSES:
+                        break
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        if cached is not None:
+            # Ağ hatasında eski kayıt, hiç yoktan iyidir
+            return FetchResult(site, cached[1], 'stale', time.perf_counter() - start, error)
+        return FetchResult(site, None, 'error', time.perf_counter() - start, error)
+
+    async def fetch_all(self, sites, **window):
+        """sites: (ad, enlem, boylam) listesi. Sonuçlar aynı sırayla döner."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(
+            self.fetch(site, latitude, longitude, semaphore, **window)
+            for site, latitude, longitude in sites
+        ))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+def _validate(body):
+    """Gövde 'minutely_15' içeren bir JSON değilse hata metni döner."""
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        return f"Geçersiz JSON: {e}"
+    if not isinstance(data, dict) or 'minutely_15' not in data:
+        return "Yanıtta 'minutely_15' verisi yok"
+    return None
+
+def _reason(body):
+    """Open-Meteo hata gövdesi: {"error": true, "reason": "..."}"""
+    try:
+        return json.loads(body).get('reason', '')
+    except (ValueError, AttributeError):
+        return body[:200].decode('utf-8', 'replace')
+
+def fetch_forecasts(sites, base_url=DEFAULT_BASE_URL, max_concurrency=DEFAULT_CONCURRENCY,
+                    ttl=DEFAULT_TTL_SECONDS, cache_dir=HTTP_CACHE_DIR, **window):
+    """Senkron giriş noktası: tüm siteleri indirir, FetchResult listesi döndürür."""
+    fetcher = OpenMeteoFetcher(base_url, max_concurrency, ttl, cache_dir)
+    try:
+        return asyncio.run(fetcher.fetch_all(sites, **window))
+    finally:
+        fetcher.close()
+
+def read_sites(path):
+    """Site dosyası: her satırda 'ad,enlem,boylam' ('#' ile başlayan satırlar atlanır)."""
+    sites = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, latitude, longitude = [part.strip() for part in line.split(',')[:3]]
+            sites.append((name, float(latitude), float(longitude)))
+    return sites
+
+def write_manifest(results, path=DEFAULT_MANIFEST):
+    """Başarılı sonuçlardan batch_scoring'in okuduğu 'site,yol' manifestini yazar."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for result in results:
+            if result.path is not None:
+                f.write(f"{result.site},{os.path.abspath(result.path)}\n")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-Meteo'dan çok siteli eşzamanlı tahmin indirme")
+    parser.add_argument('--sites', default=None, help="Site dosyası ('ad,enlem,boylam' satırları)")
+    parser.add_argument('--lat', type=float, default=None, help="Tek site için enlem")
+    parser.add_argument('--lon', type=float, default=None, help="Tek site için boylam")
+    parser.add_argument('--name', default='site', help="Tek site için ad")
+    parser.add_argument('--forecast-days', type=int, default=None, help="Tahmin gün sayısı (Open-Meteo varsayılanı: 7)")
+    parser.add_argument('--start-date', default=None, help="Pencere başlangıcı (YYYY-MM-DD)")
+    parser.add_argument('--end-date', default=None, help="Pencere bitişi (YYYY-MM-DD, dahil)")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help="API adresi (test için yerel sahte sunucu)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Aynı anda en fazla istek")
+    parser.add_argument('--ttl', type=int, default=DEFAULT_TTL_SECONDS, help="Önbellek tazelik süresi (saniye)")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help="İndirilen dosyaların manifesti")
+    parser.add_argument('--score', action='store_true', help="İndirilenleri batch_scoring ile puanla")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Puanlamada kullanılacak model")
+    parser.add_argument('--output', default='fleet_daily_production.csv', help="Puanlama çıktısı (CSV)")
+    args = parser.parse_args()
+
+    if args.sites is not None:
+        sites = read_sites(args.sites)
+    elif args.lat is not None and args.lon is not None:
+        sites = [(args.name, args.lat, args.lon)]
+    else:
+        print("Hata: --sites veya --lat/--lon belirtilmeli.")
+        return
+
+    start = time.perf_counter()
+    results = fetch_forecasts(
+        sites, args.base_url, args.concurrency, args.ttl,
+        forecast_days=args.forecast_days, start_date=args.start_date, end_date=args.end_date
+    )
+    wall = time.perf_counter() - start
+
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if result.error is not None:
+            print(f"Uyarı: '{result.site}' {result.status}: {result.error}")
+    summary = ', '.join(f"{status}: {n}" for status, n in sorted(counts.items()))
+    print(f"[OK] {len(results)} site {wall:.2f} s içinde işlendi ({summary}).")
+
+    manifest = write_manifest(results, args.manifest)
+    print(f"[OK] Manifest '{manifest}' dosyasına yazıldı.")
+
+    if args.score:
+        from batch_scoring import score_fleet
+        score_fleet(manifest, args.model, args.output)
+
+if __name__ == "__main__":
+    main()
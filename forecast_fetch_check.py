@@ -0,0 +1,165 @@
+import argparse
+import gzip
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from forecast_fetch import fetch_forecasts
+
+# forecast_fetch için yerel sahte sunucu ile uçtan uca kontrol (ağ gerekmez).
+# ThreadingHTTPServer Open-Meteo gibi davranır: gzip gövde, ETag ve
+# If-None-Match gelirse 304. Sırasıyla denetlenenler:
+#   1. soğuk önbellek: her site indirilir ('downloaded'),
+#   2. TTL içinde: sunucuya hiç istek gitmez ('cache'),
+#   3. TTL dolmuş: koşullu istek, 304 ve gövde diskten ('revalidated'),
+#   4. eşzamanlılık: aynı anda işlenen istek sayısı --concurrency'ye ulaşır.
+#
+#   python forecast_fetch_check.py --sites 40 --concurrency 16
+
+PAYLOAD = {
+    'utc_offset_seconds': 7200,
+    'timezone': 'Europe/Nicosia',
+    'minutely_15_units': {'time': 'iso8601'},
+    'minutely_15': {
+        'time': ['2025-12-05T00:00', '2025-12-05T00:15'],
+        'temperature_2m': [10.0, 9.8],
+        'shortwave_radiation': [0.0, 0.0],
+        'diffuse_radiation': [0.0, 0.0],
+        'direct_normal_irradiance': [0.0, 0.0],
+        'cloud_cover': [20, 25],
+        'is_day': [0, 0]
+    }
+}
+
+class MockOpenMeteo(ThreadingHTTPServer):
+    """İstek, 304 ve en yüksek eşzamanlı istek sayılarını tutan sahte sunucu."""
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(('127.0.0.1', 0), MockHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.not_modified = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/forecast"
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            query = parse_qs(urlsplit(self.path).query)
+            data = dict(PAYLOAD, latitude=float(query['latitude'][0]), longitude=float(query['longitude'][0]))
+            body = json.dumps(data).encode('utf-8')
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                with server.lock:
+                    server.not_modified += 1
+                self._send(304, b'', etag)
+            else:
+                self._send(200, gzip.compress(body), etag, gzipped=True)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status, body, etag, gzipped=False):
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def _statuses(results):
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    return counts
+
+def run_checks(n_sites=40, concurrency=16, delay=0.05):
+    """Tüm adımları çalıştırır; başarısız kontrollerin listesini döndürür."""
+    server = MockOpenMeteo(delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache_dir = tempfile.mkdtemp(prefix='forecast_fetch_check-')
+    sites = [(f"site{i}", 35.0 + i * 0.01, 33.5) for i in range(n_sites)]
+    failures = []
+
+    def step(label, expected_status, ttl, expected_requests, expected_304):
+        server.reset()
+        start = time.perf_counter()
+        results = fetch_forecasts(sites, server.url, concurrency, ttl, cache_dir)
+        wall = time.perf_counter() - start
+        counts = _statuses(results)
+        ok = (
+            counts == {expected_status: n_sites}
+            and server.requests == expected_requests
+            and server.not_modified == expected_304
+        )
+        mark = 'OK' if ok else 'HATA'
+        print(f"[{mark}] {label:<12} {wall:.2f} s, durumlar: {counts}, istek: {server.requests}, "
+              f"304: {server.not_modified}, en fazla eşzamanlı: {server.max_in_flight}")
+        if not ok:
+            failures.append(label)
+        return results
+
+    try:
+        results = step('indirme', 'downloaded', 3600, n_sites, 0)
+        for result in results:
+            with open(result.path, 'r', encoding='utf-8') as f:
+                if 'minutely_15' not in json.load(f):
+                    failures.append('gövde')
+                    print(f"[HATA] '{result.site}' önbellek gövdesi 'minutely_15' içermiyor.")
+                    break
+        expected_peak = min(concurrency, n_sites)
+        if server.max_in_flight < expected_peak:
+            failures.append('eşzamanlılık')
+            print(f"[HATA] En fazla {server.max_in_flight} eşzamanlı istek (beklenen: {expected_peak}).")
+        step('önbellek', 'cache', 3600, 0, 0)
+        step('doğrulama', 'revalidated', 0, n_sites, n_sites)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="forecast_fetch için yerel sahte sunucu kontrolü")
+    parser.add_argument('--sites', type=int, default=40, help="Sahte site sayısı")
+    parser.add_argument('--concurrency', type=int, default=16, help="Aynı anda en fazla istek")
+    parser.add_argument('--delay', type=float, default=0.05, help="Sunucunun her yanıttan önce beklediği süre (saniye)")
+    args = parser.parse_args()
+
+    failures = run_checks(args.sites, args.concurrency, args.delay)
+    if failures:
+        print(f"Hata: Başarısız kontroller: {', '.join(failures)}")
+        raise SystemExit(1)
+    print("[OK] Tüm kontroller geçti.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import numpy as np
+import json
+
+# Open-Meteo 'minutely_15' JSON dosyaları için akışlı (streaming) okuyucu.
+# json.load tüm belgeyi Python listelerine açar; burada dosya bloklar halinde
+# okunur ve her sütun sırayla, doğrudan tipli NumPy tamponlarına yazılır.
+# Böylece bellekte belgenin kendisi değil, yalnızca sütun dizileri tutulur.
+
+DEFAULT_BLOCK_SIZE = 1 << 20   # Dosyadan tek seferde okunan karakter sayısı
+DEFAULT_CHUNK_SIZE = 96 * 7    # Bir haftalık 15 dakikalık veri
+
+_WHITESPACE = ' \t\r\n'
+
+
+class _ColumnBuffer:
+    """Kapasitesi ikiye katlanarak büyüyen tipli dizi."""
+
+    def __init__(self, dtype, capacity=1024):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            new_capacity = max(needed, 2 * len(self.data))
+            grown = np.empty(new_capacity, dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def values(self):
+        return self.data[:self.size]
+
+
+class _JsonScanner:
+    """JSON metnini blok blok okuyarak ilerleyen basit tarayıcı."""
+
+    def __init__(self, f, block_size=DEFAULT_BLOCK_SIZE):
+        self.f = f
+        self.block_size = block_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _error(self, msg):
+        return json.JSONDecodeError(msg, self.buf, min(self.pos, len(self.buf)))
+
+    def _fill(self):
+        """Tampona yeni blok ekler; tüketilmiş kısmı atar. Veri geldiyse True döner."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.block_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise self._error(f"'{ch}' bekleniyordu")
+        self.pos += 1
+
+    def read_string(self):
+        self.expect('"')
+        start = self.pos
+        i = start
+        while True:
+            end = self.buf.find('"', i)
+            if end == -1:
+                # self.pos metnin başında durur; doldurma sonrası konumları kaydır
+                scanned = len(self.buf) - start
+                if not self._fill():
+                    raise self._error("Kapanmamış metin")
+                start = self.pos
+                i = start + scanned
+                continue
+            # Kaçış karakteriyle (\") gelen tırnakları atla
+            backslashes = 0
+            j = end - 1
+            while j >= start and self.buf[j] == '\\':
+                backslashes += 1
+                j -= 1
+            if backslashes % 2 == 0:
+                raw = self.buf[start:end]
+                self.pos = end + 1
+                return json.loads('"' + raw + '"') if '\\' in raw else raw
+            i = end + 1
+
+    def read_scalar(self):
+        """Sayı, metin, true/false/null değerlerini okur."""
+        if self.peek() == '"':
+            return self.read_string()
+        while True:
+            start = self.pos
+            i = start
+            while i < len(self.buf) and self.buf[i] not in ',}]' + _WHITESPACE:
+                i += 1
+            if i < len(self.buf) or not self._fill():
+                break
+        token = self.buf[start:i]
+        self.pos = i
+        try:
+            return json.loads(token)
+        except json.JSONDecodeError:
+            raise self._error(f"Geçersiz değer: {token[:20]}")
+
+    def skip_value(self):
+        ch = self.peek()
+        if ch not in '[{':
+            self.read_scalar()
+            return
+        depth = 0
+        while True:
+            ch = self.peek()
+            if ch == '':
+                raise self._error("Beklenmeyen dosya sonu")
+            if ch == '"':
+                self.read_string()
+                continue
+            self.pos += 1
+            if ch in '[{':
+                depth += 1
+            elif ch in ']}':
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object_keys(self):
+        """Nesnenin anahtarlarını sırayla verir; değer çağıran tarafından tüketilmelidir."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(':')
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == '}':
+                return
+            if ch != ',':
+                raise self._error("',' veya '}' bekleniyordu")
+
+    def iter_array_segments(self):
+        """Düz bir dizinin elemanlarını ham metin parçaları (liste) halinde verir."""
+        self.expect('[')
+        while True:
+            close = self.buf.find(']', self.pos)
+            if close != -1:
+                segment = self.buf[self.pos:close]
+                self.pos = close + 1
+                if segment.strip():
+                    yield segment.split(',')
+                return
+            comma = self.buf.rfind(',')
+            if comma >= self.pos:
+                segment = self.buf[self.pos:comma]
+                self.pos = comma + 1
+                yield segment.split(',')
+            elif not self._fill():
+                raise self._error("Kapanmamış dizi")
+
+
+def _convert_tokens(tokens, is_text):
+    if is_text:
+        values = [t.strip().strip('"') for t in tokens]
+        try:
+            return np.array(values, dtype='datetime64[m]')
+        except ValueError:
+            return np.array(values, dtype=object)
+    for t in tokens:
+        if '[' in t or '{' in t:
+            raise ValueError("İç içe diziler desteklenmiyor")
+    return np.array([t.replace('null', 'nan') for t in tokens], dtype=np.float64)
+
+
+def _read_column(scanner):
+    buffer = None
+    for tokens in scanner.iter_array_segments():
+        if buffer is None:
+            is_text = tokens[0].strip().startswith('"')
+            values = _convert_tokens(tokens, is_text)
+            buffer = _ColumnBuffer(values.dtype, capacity=max(1024, len(values)))
+        else:
+            values = _convert_tokens(tokens, is_text)
+        buffer.extend(values)
+    if buffer is None:
+        return np.empty(0, dtype=np.float64)
+    return buffer.values()
+
+
+def read_minutely_15(json_path, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    'minutely_15' dizilerini sütun sütun tipli NumPy dizilerine okur.
+    Dönüş: (meta, columns). meta üst seviyedeki sayısal/metin alanları
+    (latitude, utc_offset_seconds...) içerir. columns, en kısa sütun uzunluğuna
+    kırpılmış sözlüktür; dosyada 'minutely_15' yoksa None döner.
+    """
+    meta = {}
+    columns = None
+    with open(json_path, 'r', encoding='utf-8') as f:
+        scanner = _JsonScanner(f, block_size)
+        for key in scanner.iter_object_keys():
+            if key == 'minutely_15' and scanner.peek() == '{':
+                columns = {}
+                for column in scanner.iter_object_keys():
+                    if scanner.peek() == '[':
+                        columns[column] = _read_column(scanner)
+                    else:
+                        scanner.skip_value()
+            elif scanner.peek() in '[{':
+                scanner.skip_value()
+            else:
+                meta[key] = scanner.read_scalar()
+
+    if columns:
+        # Mevcut davranış: tüm sütunlar en kısa sütunun uzunluğuna kırpılır
+        min_len = min(len(v) for v in columns.values())
+        columns = {k: v[:min_len] for k, v in columns.items()}
+    return meta, columns
+
+
+def iter_chunks(columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Sütun sözlüğünü sabit uzunluklu zaman parçalarına (görünüm olarak) böler."""
+    n_rows = min((len(v) for v in columns.values()), default=0)
+    for start in range(0, n_rows, chunk_size):
+        end = min(start + chunk_size, n_rows)
+        yield {k: v[start:end] for k, v in columns.items()}
+
+
+def iter_forecast_chunks(json_path, chunk_size=DEFAULT_CHUNK_SIZE, block_size=DEFAULT_BLOCK_SIZE):
+    """Dosyayı akışlı okur ve (meta, parça) çiftlerini sırayla verir."""
+    meta, columns = read_minutely_15(json_path, block_size)
+    if not columns:
+        return
+    for chunk in iter_chunks(columns, chunk_size):
+        yield meta, chunk
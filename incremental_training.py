@@ -0,0 +1,357 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import warnings
+import joblib
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from dataset_store import STORE_DIR
+from forecast_cache import publish_mode
+from feature_pipeline import load_pipeline
+from result_cache import artifact_digest
+from compiled_model import export_model
+from model_registry import REGISTRY_DIR, open_registry
+from tracing import stage
+
+# Güçlendirme (boosting) modelleri için artımlı (warm-start) yeniden eğitim.
+# Tüm geçmişle sıfırdan eğitmek yerine mevcut 'best_solar_model.joblib'
+# yüklenir ve yalnızca yeni veri dilimine uydurulan ek ağaçlar eklenir
+# (XGBoost: xgb_model, LightGBM / CatBoost: init_model); ek ağaçlar geçmişi
+# ezmesin diye daha küçük öğrenme oranıyla eğitilir. Yeni modelin hatası yeni
+# dilimin son kısmında veya hemen önceki geçmişte eski modelinkinden belirgin
+# şekilde kötüyse sürüm yazılmaz. Kabul edilen her sürüm
+# 'model_versions/' altına numaralı olarak atomik yazılır, ardından etkin
+# model dosyası, derlenmiş kopyası ve model kaydındaki (model_registry)
+# karşılığı güncellenir; kayıtta yeni modelin doğrulama dilimindeki ölçütleri
+# ve eğitim penceresi yer alır.
+#
+#   python incremental_training.py --start 2025-12-06
+#   python incremental_training.py --rollback 3
+
+VERSIONS_DIR = 'model_versions'
+MANIFEST_FILE = 'manifest.json'
+
+# Artımlı eğitimi destekleyen modeller: sınıf adı -> ağaç sayısı parametresi
+WARM_START_MODELS = {
+    'XGBRegressor': 'n_estimators',
+    'LGBMRegressor': 'n_estimators',
+    'CatBoostRegressor': 'n_estimators'
+}
+
+MIN_NEW_ROWS = 96            # En az bir günlük 15 dakikalık veri
+DEFAULT_EXTRA_TREES = 20
+DEFAULT_LEARNING_RATE = 0.1  # Ek ağaçların öğrenme oranı
+# İzin verilen en fazla MAE artışı, ortalama gerçekleşen gücün oranı olarak.
+# Eski modelin eğitimde gördüğü günlerde MAE sıfıra yakın olabilir; bu yüzden
+# eski MAE'ye göre oran yerine üretim ölçeği kullanılır.
+DEFAULT_TOLERANCE = 0.05
+DEFAULT_HISTORY_DAYS = 7     # Unutma kontrolü için yeni dilimden önceki gün sayısı
+
+def _atomic_write(path, write):
+    """write(dosya_nesnesi) ile geçici dosyaya yazar, sonra atomik olarak yerine taşır."""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        publish_mode(tmp_path, path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def load_manifest(versions_dir=VERSIONS_DIR):
+    path = os.path.join(versions_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'versions': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, versions_dir=VERSIONS_DIR):
+    payload = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+    return _atomic_write(os.path.join(versions_dir, MANIFEST_FILE), lambda f: f.write(payload))
+
+def version_path(model_path, version, versions_dir=VERSIONS_DIR):
+    """best_solar_model.joblib, 3 -> model_versions/best_solar_model.v0003.joblib"""
+    stem, ext = os.path.splitext(os.path.basename(model_path))
+    return os.path.join(versions_dir, f"{stem}.v{version:04d}{ext}")
+
+def warm_start(model, X, y, extra_trees=DEFAULT_EXTRA_TREES, learning_rate=DEFAULT_LEARNING_RATE):
+    """
+    Mevcut modelin ağaçlarına, (X, y) üzerinde eğitilen extra_trees ağaç ekler.
+    learning_rate None ise modelin kendi öğrenme oranı kullanılır.
+    """
+    name = type(model).__name__
+    if name not in WARM_START_MODELS:
+        raise ValueError(f"{name} artımlı eğitimi desteklemiyor")
+
+    params = model.get_params()
+    params[WARM_START_MODELS[name]] = extra_trees
+    if learning_rate is not None:
+        params['learning_rate'] = learning_rate
+    updated = type(model)(**params)
+    if name == 'XGBRegressor':
+        updated.fit(X, y, xgb_model=model.get_booster())
+    elif name == 'LGBMRegressor':
+        updated.fit(X, y, init_model=model.booster_)
+    else:
+        updated.fit(X, y, init_model=model)
+    return updated
+
+def tree_count(model):
+    name = type(model).__name__
+    if name == 'XGBRegressor':
+        return model.get_booster().num_boosted_rounds()
+    if name == 'LGBMRegressor':
+        return model.booster_.num_trees()
+    if name == 'CatBoostRegressor':
+        return model.tree_count_
+    return None
+
+def _load_rows(store_dir, start, end, pipeline):
+    """Veri deposundan [start, end) satırlarını özellik matrisi + hedef olarak okur."""
+    from solar_prediction import load_from_store
+
+    df = load_from_store(store_dir, start, end).sort_values('time')
+    X = pipeline.transform(df)
+    return X, df['Power [W]'].to_numpy(dtype=np.float64), df['time']
+
+def _mae(model, X, y):
+    return float(mean_absolute_error(y, np.maximum(model.predict(X), 0))) if len(y) else None
+
+def _metrics(model, X, y):
+    """Model kaydına yazılan ölçütler (doğrulama dilimi)."""
+    if not len(y):
+        return {}
+    y_pred = np.maximum(model.predict(X), 0)
+    metrics = {'MAE': mean_absolute_error(y, y_pred), 'RMSE': float(np.sqrt(mean_squared_error(y, y_pred)))}
+    if len(y) > 1:
+        metrics['R2'] = r2_score(y, y_pred)
+    return {k: float(v) for k, v in metrics.items()}
+
+def _registry_name(registry, model_sha):
+    """Etkin modelin kayıttaki adı: manifestteki 'champion', yoksa dosya özeti eşleşen model."""
+    return registry.champion() or registry.find_by_digest(model_sha)
+
+def registry_snapshot(model_path, registry_dir=REGISTRY_DIR):
+    """Etkin modelin kayıttaki ölçütleri ve eğitim penceresi (geri dönüşte yeniden yazılır)."""
+    registry = open_registry(registry_dir)
+    if registry is None:
+        return None
+    name = _registry_name(registry, artifact_digest(model_path))
+    if name is None:
+        return None
+    info = registry.info(name)
+    return {key: info.get(key) for key in ('metrics', 'train_start', 'train_end', 'rows')}
+
+def _update_registry(model, parent_sha, snapshot, registry_dir=REGISTRY_DIR):
+    """Etkin model değişince kayıttaki karşılığını (dosya, sha256, boyut, ölçütler) yeniler."""
+    registry = open_registry(registry_dir)
+    if registry is None:
+        return None
+    name = _registry_name(registry, parent_sha)
+    if name is None:
+        print("Uyarı: Etkin model kayıtta bulunamadı; model kaydı güncellenmedi.")
+        return None
+    info = registry.info(name)
+    snapshot = snapshot or {}
+    registry.register(
+        name, model,
+        metrics=snapshot.get('metrics', info.get('metrics')),
+        features=info.get('features'),
+        train_start=snapshot.get('train_start', info.get('train_start')),
+        train_end=snapshot.get('train_end', info.get('train_end')),
+        rows=snapshot.get('rows', info.get('rows'))
+    )
+    # Kayıttaki dosya yeniden yazıldığından özeti artık etkin dosyayla eşleşmez; ad saklanır
+    if registry.champion() != name:
+        registry.set_champion(name)
+    return name
+
+def _install(source_path, model_path, snapshot=None, registry_dir=REGISTRY_DIR):
+    """
+    Sürüm dosyasını etkin model olarak atomik kopyalar; derlenmiş kopyayı ve
+    model kaydındaki karşılığını yeniler.
+    """
+    parent_sha = artifact_digest(model_path) if os.path.exists(model_path) else None
+
+    def copy(f):
+        with open(source_path, 'rb') as src:
+            shutil.copyfileobj(src, f)
+    _atomic_write(model_path, copy)
+    model = joblib.load(model_path)
+    name = _update_registry(model, parent_sha, snapshot, registry_dir)
+    if name is not None:
+        print(f"[OK] Model kaydındaki '{name}' güncellendi.")
+    return export_model(model, model_path)
+
+def incremental_retrain(start, end=None, model_path='best_solar_model.joblib', store_dir=STORE_DIR,
+                        extra_trees=DEFAULT_EXTRA_TREES, learning_rate=DEFAULT_LEARNING_RATE, val_fraction=0.2,
+                        tolerance=DEFAULT_TOLERANCE, history_days=DEFAULT_HISTORY_DAYS, force=False,
+                        versions_dir=VERSIONS_DIR):
+    """
+    Yeni veri dilimiyle artımlı eğitim yapar. Dönüş: manifest kaydı
+    (kabul edilmediyse None).
+    """
+    warnings.filterwarnings('ignore')
+    total_start = time.perf_counter()
+    pipeline = load_pipeline()
+
+    model = joblib.load(model_path)
+    if type(model).__name__ not in WARM_START_MODELS:
+        print(f"Hata: {type(model).__name__} artımlı eğitimi desteklemiyor. "
+              f"Desteklenenler: {', '.join(WARM_START_MODELS)}. Tam eğitim için solar_prediction.py kullanın.")
+        return None
+
+    with stage('load_store') as traced:
+        X_new, y_new, times = _load_rows(store_dir, start, end, pipeline)
+        traced.rows = len(y_new)
+    if len(y_new) < MIN_NEW_ROWS:
+        print(f"Hata: Yeni dilimde {len(y_new)} satır var; en az {MIN_NEW_ROWS} gerekli.")
+        return None
+
+    # Zaman sırasına göre: baş kısım eğitim, son kısım doğrulama
+    split = int(len(y_new) * (1 - val_fraction))
+    X_fit, y_fit = X_new[:split], y_new[:split]
+    X_val, y_val = X_new[split:], y_new[split:]
+
+    # Unutma kontrolü: yeni dilimden hemen önceki geçmiş
+    history_start = pd.Timestamp(start) - pd.Timedelta(days=history_days)
+    X_hist, y_hist, _ = _load_rows(store_dir, history_start, start, pipeline)
+
+    fit_start = time.perf_counter()
+    with stage('fit', rows=len(y_fit), model=type(model).__name__):
+        updated = warm_start(model, X_fit, y_fit, extra_trees, learning_rate)
+    fit_seconds = time.perf_counter() - fit_start
+
+    checks = {
+        'new_data': (_mae(model, X_val, y_val), _mae(updated, X_val, y_val)),
+        'history': (_mae(model, X_hist, y_hist), _mae(updated, X_hist, y_hist))
+    }
+    allowed_w = tolerance * float(np.mean(y_new))
+    print(f"{'Kontrol':<10} | {'Satır':>6} | {'Eski MAE':>9} | {'Yeni MAE':>9}   (izin verilen artış: {allowed_w:.1f} W)")
+    print("-" * 45)
+    accepted = True
+    for (label, (old_mae, new_mae)), rows in zip(checks.items(), (len(y_val), len(y_hist))):
+        if old_mae is None:
+            print(f"{label:<10} | {rows:>6} | {'-':>9} | {'-':>9}")
+            continue
+        passed = new_mae <= old_mae + allowed_w
+        accepted &= passed
+        print(f"{label:<10} | {rows:>6} | {old_mae:>9.2f} | {new_mae:>9.2f}{'' if passed else '  <-- KÖTÜLEŞME'}")
+
+    if not accepted and not force:
+        print("\n[!] Yeni model doğrulamayı geçemedi; sürüm yazılmadı (zorlamak için --force).")
+        return None
+
+    manifest = load_manifest(versions_dir)
+    versions = manifest['versions']
+    parent_sha = artifact_digest(model_path)
+    if not versions:
+        # İlk artımlı eğitimde mevcut model 0. sürüm olarak saklanır (geri dönüş için)
+        base_path = version_path(model_path, 0, versions_dir)
+        _atomic_write(base_path, lambda f: joblib.dump(model, f))
+        versions.append({'version': 0, 'file': base_path, 'sha256': parent_sha, 'trees': tree_count(model),
+                         'registry': registry_snapshot(model_path),
+                         'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'note': 'temel model'})
+
+    version = versions[-1]['version'] + 1
+    previous = registry_snapshot(model_path) or {}
+    data_end = times.iloc[-1] + pd.Timedelta(minutes=15)
+    path = version_path(model_path, version, versions_dir)
+    with stage('save_models'):
+        _atomic_write(path, lambda f: joblib.dump(updated, f))
+    entry = {
+        'version': version,
+        'file': path,
+        'sha256': artifact_digest(path),
+        'parent_sha256': parent_sha,
+        'trees': tree_count(updated),
+        'extra_trees': extra_trees,
+        'learning_rate': learning_rate,
+        'data_start': str(times.iloc[0]),
+        'data_end': str(data_end),
+        'rows': int(len(y_new)),
+        'val_mae_old': checks['new_data'][0],
+        'val_mae_new': checks['new_data'][1],
+        'history_mae_old': checks['history'][0],
+        'history_mae_new': checks['history'][1],
+        'forced': bool(force and not accepted),
+        'fit_s': round(fit_seconds, 3),
+        'registry': {
+            'metrics': _metrics(updated, X_val, y_val),
+            'train_start': previous.get('train_start'),
+            'train_end': str(data_end),
+            'rows': (previous.get('rows') or 0) + len(y_fit)
+        },
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    versions.append(entry)
+    manifest['active'] = version
+    save_manifest(manifest, versions_dir)
+    compiled_dir = _install(path, model_path, entry['registry'])
+
+    print(f"\n[OK] Sürüm {version} '{path}' dosyasına yazıldı ve '{model_path}' olarak etkinleştirildi "
+          f"({entry['trees']} ağaç, +{extra_trees}).")
+    if compiled_dir:
+        print(f"[OK] Derlenmiş (NumPy) model '{compiled_dir}' dizinine kaydedildi.")
+    print(f"     Eğitim: {fit_seconds:.2f} s, toplam: {time.perf_counter() - total_start:.2f} s")
+    return entry
+
+def rollback(version, model_path='best_solar_model.joblib', versions_dir=VERSIONS_DIR):
+    """Kayıtlı bir sürümü yeniden etkin model yapar."""
+    manifest = load_manifest(versions_dir)
+    entry = next((v for v in manifest['versions'] if v['version'] == version), None)
+    if entry is None or not os.path.exists(entry['file']):
+        print(f"Hata: {version}. sürüm bulunamadı.")
+        return None
+    _install(entry['file'], model_path, entry.get('registry'))
+    manifest['active'] = version
+    save_manifest(manifest, versions_dir)
+    print(f"[OK] {version}. sürüm ('{entry['file']}') '{model_path}' olarak etkinleştirildi.")
+    return entry
+
+def main():
+    parser = argparse.ArgumentParser(description="Boosting modelleri için artımlı (warm-start) yeniden eğitim")
+    parser.add_argument('--start', default=None, help="Yeni veri diliminin başlangıcı (varsayılan: son sürümün veri sonu)")
+    parser.add_argument('--end', default=None, help="Yeni veri diliminin bitişi (hariç)")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Etkin model dosyası")
+    parser.add_argument('--store', default=STORE_DIR, help="Veri deposu dizini (prepare_data.py çıktısı)")
+    parser.add_argument('--trees', type=int, default=DEFAULT_EXTRA_TREES, help="Eklenecek ağaç sayısı")
+    parser.add_argument('--learning-rate', type=float, default=DEFAULT_LEARNING_RATE, help="Ek ağaçların öğrenme oranı")
+    parser.add_argument('--val-fraction', type=float, default=0.2, help="Yeni dilimin doğrulamaya ayrılan son kısmı")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="İzin verilen en fazla MAE artışı (ortalama gücün oranı)")
+    parser.add_argument('--history-days', type=int, default=DEFAULT_HISTORY_DAYS, help="Unutma kontrolü için geçmiş gün sayısı")
+    parser.add_argument('--force', action='store_true', help="Doğrulama başarısız olsa da sürümü yaz")
+    parser.add_argument('--rollback', type=int, default=None, help="Belirtilen sürümü yeniden etkinleştir")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Hata: Model dosyası ({args.model}) bulunamadı.")
+        return
+
+    if args.rollback is not None:
+        rollback(args.rollback, args.model)
+        return
+
+    start = args.start
+    if start is None:
+        versions = load_manifest()['versions']
+        start = versions[-1].get('data_end') if versions else None
+        if start is None:
+            print("Hata: İlk artımlı eğitimde --start belirtilmeli.")
+            return
+
+    incremental_retrain(start, args.end, args.model, args.store, args.trees, args.learning_rate,
+                        args.val_fraction, args.tolerance, args.history_days, args.force)
+
+if __name__ == "__main__":
+    main()
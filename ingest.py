@@ -0,0 +1,101 @@
+import pandas as pd
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Vectorized ingestion for the inverter "Energy and power - PV - Week" exports.
+# Each export starts with a preamble (sep=;, Version, Language, Time zone...)
+# before the real header. The preamble is detected by scanning for the header
+# line, then the file is parsed with the C engine: "1,116" style power strings
+# are handled by the thousands separator and timestamps are parsed in one
+# vectorized to_datetime call. Several files are loaded in parallel and
+# overlapping weeks are deduplicated by timestamp.
+
+TIME_COLUMN = 'Time period'
+POWER_COLUMN = 'Power [W]'
+TIME_FORMAT = '%m/%d/%Y %I.%M %p'  # e.g. 11/29/2025 12.15 AM
+DEFAULT_PATTERN = 'Energy and power - PV - Week*.csv'
+
+MAX_PREAMBLE_LINES = 50
+
+def _split_cells(line, sep):
+    return [cell.strip().strip('"').strip() for cell in line.rstrip('\r\n').split(sep)]
+
+def detect_layout(path):
+    """
+    Finds the separator, the header line index and the preamble metadata.
+    Returns (sep, header_row, metadata) where metadata holds the key/value
+    pairs of the preamble (e.g. 'Time zone': 'Europe/Bucharest').
+    """
+    sep = ';'
+    metadata = {}
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for i, line in enumerate(f):
+            if i >= MAX_PREAMBLE_LINES:
+                break
+            stripped = line.strip()
+            if stripped.lower().startswith('sep='):
+                sep = stripped[4:] or sep
+                continue
+            cells = _split_cells(line, sep)
+            if TIME_COLUMN in cells:
+                return sep, i, metadata
+            if len(cells) >= 2 and cells[0]:
+                metadata[cells[0]] = cells[1]
+
+    raise ValueError(f"Header line with '{TIME_COLUMN}' not found in {path}")
+
+def read_export(path):
+    """Reads one export into a frame indexed by timestamp with a 'power_w' column."""
+    sep, header_row, metadata = detect_layout(path)
+    df = pd.read_csv(
+        path,
+        sep=sep,
+        skiprows=header_row,
+        engine='c',
+        encoding='utf-8-sig',
+        thousands=',',
+        usecols=[TIME_COLUMN, POWER_COLUMN],
+        dtype={TIME_COLUMN: str}
+    )
+
+    timestamps = pd.to_datetime(df[TIME_COLUMN], format=TIME_FORMAT)
+    power = pd.to_numeric(df[POWER_COLUMN], errors='coerce').astype(float)
+    result = pd.DataFrame({'power_w': power.values}, index=pd.DatetimeIndex(timestamps, name='timestamp'))
+    result.attrs['metadata'] = metadata
+    return result
+
+def expand_paths(patterns):
+    """Expands one or more glob patterns (or plain paths) into a sorted file list."""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        if not matches and os.path.exists(pattern):
+            matches = [pattern]
+        paths.update(matches)
+    return sorted(paths)
+
+def load_exports(patterns=DEFAULT_PATTERN, max_workers=None):
+    """
+    Loads every matching export in parallel and merges them into one
+    timestamp-sorted frame. When weeks overlap, the row from the file that
+    sorts last (the newer export) wins.
+    """
+    paths = expand_paths(patterns)
+    if not paths:
+        raise FileNotFoundError(f"No export files match: {patterns}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = list(pool.map(read_export, paths))
+
+    metadata = {}
+    for frame in frames:
+        metadata.update(frame.attrs.get('metadata', {}))
+
+    df = pd.concat(frames)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    df.attrs['metadata'] = metadata
+    df.attrs['files'] = paths
+    return df
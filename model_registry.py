@@ -0,0 +1,233 @@
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import joblib
+
+from forecast_cache import file_digest, publish_mode
+from tracing import stage
+
+# Model kaydı: her eğitilmiş model kendi dosyasında, yanında küçük bir manifest.
+#   model_registry/manifest.json        ölçütler, özellik listesi, eğitim penceresi,
+#                                        boyut, sha256, ağaç sayısı, özellik önemleri
+#   model_registry/<model_adı>.joblib    sıkıştırılmamış model
+# Modelleri listelemek ve seçmek yalnızca manifesti okur; model dosyası ancak
+# load() çağrılınca ve yalnızca seçilen model için açılır. mmap_mode='r'
+# joblib'in okuma sırasındaki ara kopyasını önler; düz NumPy dizileri (ör.
+# Linear Regression, MLP katsayıları) bellek eşlemeli kalır. sklearn ağaçları
+# (Random Forest, Extra Trees) ise yüklenirken düğüm dizilerini kendi
+# belleğine kopyalar (Tree.__setstate__); bu modeller yine tamamen belleğe
+# gelir. Manifest, solar_prediction'ın seçtiği etkin modeli ('champion') de
+# tutar; incremental_training etkin modeli değiştirince kaydını günceller. Eski tek parça
+# 'solar_models_all.joblib' dosyası bir kez dönüştürülebilir:
+#
+#   python model_registry.py import solar_models_all.joblib
+#   python model_registry.py list
+
+REGISTRY_DIR = 'model_registry'
+MANIFEST_FILE = 'manifest.json'
+BUNDLE_FILE = 'solar_models_all.joblib'
+
+def model_slug(name):
+    """Model adından dosya adı: 'MLP (Neural Network)' -> 'mlp_neural_network'."""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+def describe_model(model):
+    """Model yüklenmeden raporlanabilmesi için manifeste yazılan yapı bilgisi."""
+    info = {'class': type(model).__name__}
+    n_estimators = getattr(model, 'n_estimators', None)
+    # Artımlı eğitimde n_estimators yalnızca eklenen ağaç sayısıdır: eğitilmiş ağaç sayısı tercih edilir
+    try:
+        if hasattr(model, 'tree_count_'):
+            n_estimators = model.tree_count_
+        elif hasattr(model, 'get_booster'):
+            n_estimators = model.get_booster().num_boosted_rounds()
+        elif hasattr(model, 'booster_'):
+            n_estimators = model.booster_.num_trees()
+    except Exception:
+        pass
+    if n_estimators is not None:
+        info['n_estimators'] = int(n_estimators)
+    try:
+        importances = getattr(model, 'feature_importances_', None)
+    except Exception:
+        importances = None
+    if importances is not None:
+        info['feature_importances'] = [float(v) for v in np.asarray(importances, dtype=np.float64)]
+    return info
+
+def _atomic_write(path, write):
+    """write(dosya_yolu) geçici dosyaya yazar; sonuç atomik olarak yerine taşınır."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        publish_mode(tmp_path, path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ModelRegistry:
+    """Manifesti okuyan, modelleri istendiğinde tek tek yükleyen kayıt."""
+
+    def __init__(self, registry_dir=REGISTRY_DIR):
+        self.registry_dir = registry_dir
+        self.manifest_path = os.path.join(registry_dir, MANIFEST_FILE)
+        self.manifest = {'models': {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        self._loaded = {}
+
+    def names(self):
+        return list(self.manifest['models'])
+
+    def __contains__(self, name):
+        return name in self.manifest['models']
+
+    def info(self, name):
+        return self.manifest['models'][name]
+
+    def path(self, name):
+        return os.path.join(self.registry_dir, self.info(name)['file'])
+
+    def load(self, name):
+        """Tek modeli yükler (mmap_mode='r'; ağaç modellerinde diziler yine kopyalanır); aynı süreçte tekrar yüklenmez."""
+        if name not in self._loaded:
+            with stage('load_model', model=name):
+                self._loaded[name] = joblib.load(self.path(name), mmap_mode='r')
+        return self._loaded[name]
+
+    def load_all(self):
+        return {name: self.load(name) for name in self.names()}
+
+    def champion(self):
+        """Etkin (best_solar_model.joblib olarak kurulan) modelin adı; kayıtlı değilse None."""
+        name = self.manifest.get('champion')
+        return name if name in self else None
+
+    def set_champion(self, name):
+        self.manifest['champion'] = name
+        self.save_manifest()
+
+    def find_by_digest(self, sha256):
+        """Dosya özeti eşleşen kayıtlı modelin adı; yoksa None."""
+        return next((name for name in self.names() if self.info(name).get('sha256') == sha256), None)
+
+    def digest(self, names=None):
+        """Seçilen modellerin dosya özetlerinden kararlı özet (sonuç önbelleği anahtarı için)."""
+        h = hashlib.sha256()
+        for name in names or self.names():
+            h.update(f"{name}={self.info(name)['sha256']};".encode('utf-8'))
+        return h.hexdigest()
+
+    def register(self, name, model, metrics=None, features=None, train_start=None, train_end=None, rows=None):
+        """Modeli kendi dosyasına yazar ve manifest kaydını günceller."""
+        os.makedirs(self.registry_dir, exist_ok=True)
+        file_name = f"{model_slug(name)}.joblib"
+        path = os.path.join(self.registry_dir, file_name)
+        # Sıkıştırma yok: numpy dizileri mmap_mode ile doğrudan dosyadan açılabilsin
+        _atomic_write(path, lambda tmp: joblib.dump(model, tmp))
+
+        entry = {
+            'file': file_name,
+            'size_bytes': os.path.getsize(path),
+            'sha256': file_digest(path),
+            'metrics': {k: float(v) for k, v in (metrics or {}).items() if v is not None and np.isfinite(v)},
+            'features': list(features) if features is not None else None,
+            'train_start': str(train_start) if train_start is not None else None,
+            'train_end': str(train_end) if train_end is not None else None,
+            'rows': int(rows) if rows is not None else None,
+            'registered': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        entry.update(describe_model(model))
+        self.manifest['models'][name] = entry
+        self._loaded.pop(name, None)
+        self.save_manifest()
+        return entry
+
+    def save_manifest(self):
+        os.makedirs(self.registry_dir, exist_ok=True)
+
+        def write(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        _atomic_write(self.manifest_path, write)
+
+def open_registry(registry_dir=REGISTRY_DIR):
+    """Manifest varsa kaydı açar (hiçbir model yüklenmez); yoksa None."""
+    if not os.path.exists(os.path.join(registry_dir, MANIFEST_FILE)):
+        return None
+    return ModelRegistry(registry_dir)
+
+def import_bundle(bundle_path=BUNDLE_FILE, registry_dir=REGISTRY_DIR, benchmark_csv='model_benchmark.csv'):
+    """Eski tek parça model sözlüğünü kayda dönüştürür (ölçütler doğruluk raporundan)."""
+    import pandas as pd
+    from feature_pipeline import load_pipeline
+
+    models = joblib.load(bundle_path)
+    if not isinstance(models, dict):
+        print(f"Hata: '{bundle_path}' model sözlüğü içermiyor.")
+        return None
+
+    report = pd.read_csv(benchmark_csv).set_index('Model') if os.path.exists(benchmark_csv) else None
+    features = load_pipeline().features
+    registry = ModelRegistry(registry_dir)
+    for name, model in models.items():
+        metrics = None
+        if report is not None and name in report.index:
+            metrics = report.loc[name].drop(labels=['Size_KB', 'Threads'], errors='ignore').to_dict()
+        entry = registry.register(name, model, metrics=metrics, features=features)
+        print(f"[OK] {name:<25} -> {entry['file']} ({entry['size_bytes'] / 1024:.0f} KB)")
+    return registry
+
+def print_registry(registry):
+    print(f"{'MODEL':<25} | {'MAE':>8} | {'R2':>7} | {'AĞAÇ':>5} | {'BOYUT (KB)':>10} | {'EĞİTİM PENCERESİ'}")
+    print("-" * 100)
+    for name in registry.names():
+        info = registry.info(name)
+        metrics = info.get('metrics', {})
+        window = f"{info.get('train_start') or '?'} .. {info.get('train_end') or '?'}"
+        print(f"{name:<25} | {metrics.get('MAE', float('nan')):>8.2f} | {metrics.get('R2', float('nan')):>7.4f} | "
+              f"{str(info.get('n_estimators', '-')):>5} | {info['size_bytes'] / 1024:>10.0f} | {window}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Model kaydı: listeleme, inceleme ve eski paket dosyasını dönüştürme")
+    parser.add_argument('--dir', default=REGISTRY_DIR, help="Kayıt dizini")
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('list', help="Kayıtlı modelleri manifestten listele")
+    show = sub.add_parser('show', help="Tek modelin manifest kaydı")
+    show.add_argument('name')
+    imp = sub.add_parser('import', help="Tek parça model sözlüğünü kayda dönüştür")
+    imp.add_argument('bundle', nargs='?', default=BUNDLE_FILE)
+    imp.add_argument('--benchmark', default='model_benchmark.csv', help="Ölçütlerin okunacağı doğruluk raporu")
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        if not os.path.exists(args.bundle):
+            print(f"Hata: {args.bundle} bulunamadı.")
+            return
+        import_bundle(args.bundle, args.dir, args.benchmark)
+        return
+
+    registry = open_registry(args.dir)
+    if registry is None:
+        print(f"Hata: Model kaydı ({os.path.join(args.dir, MANIFEST_FILE)}) bulunamadı.")
+        return
+    if args.command == 'show':
+        if args.name not in registry:
+            print(f"Hata: '{args.name}' kayıtlı değil. Kayıtlı modeller: {', '.join(registry.names())}")
+            return
+        print(json.dumps(registry.info(args.name), ensure_ascii=False, indent=2))
+        return
+    print_registry(registry)
+
+if __name__ == "__main__":
+    main()
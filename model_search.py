@@ -0,0 +1,255 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import shutil
+import tempfile
+import time
+import argparse
+import warnings
+from joblib import Parallel, delayed
+from sklearn.model_selection import ParameterGrid
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from solar_prediction import load_and_process_data, define_models, THREAD_PARAMS
+
+# Zaman serisi çapraz doğrulama (walk-forward) ve hiperparametre araması.
+# Özellik matrisi bir kez .npy olarak yazılır ve tüm işçiler tarafından bellek
+# eşlemeli açılır; katlar (fold) bu matrisin ardışık dilimleri olduğundan her
+# aday için yeniden kopyalanmaz. Umutsuz adaylar ardışık yarılama
+# (successive halving) ile erken elenir, boosting modelleri erken durdurma kullanır.
+
+# Aile başına arama uzayı
+SEARCH_SPACES = {
+    "Linear Regression": {},
+    "Random Forest": {
+        "max_depth": [None, 10, 20],
+        "min_samples_leaf": [1, 3, 5],
+        "max_features": [1.0, 0.5]
+    },
+    "Extra Trees": {
+        "max_depth": [None, 10, 20],
+        "min_samples_leaf": [1, 3, 5],
+        "max_features": [1.0, 0.5]
+    },
+    "XGBoost": {
+        "learning_rate": [0.03, 0.1, 0.3],
+        "max_depth": [3, 6, 9],
+        "subsample": [0.8, 1.0]
+    },
+    "LightGBM": {
+        "learning_rate": [0.03, 0.1, 0.3],
+        "num_leaves": [15, 31, 63],
+        "min_child_samples": [10, 20, 40]
+    },
+    "CatBoost": {
+        "learning_rate": [0.03, 0.1, 0.3],
+        "depth": [4, 6, 8]
+    },
+    "MLP (Neural Network)": {
+        "hidden_layer_sizes": [(50,), (100, 50)],
+        "alpha": [0.0001, 0.001],
+        "learning_rate_init": [0.001, 0.01]
+    }
+}
+
+# Ardışık yarılamada bütçe olarak büyütülen parametre
+RESOURCE_PARAMS = {
+    "Random Forest": "n_estimators",
+    "Extra Trees": "n_estimators",
+    "XGBoost": "n_estimators",
+    "LightGBM": "n_estimators",
+    "CatBoost": "n_estimators",
+    "MLP (Neural Network)": "max_iter"
+}
+
+BOOSTING_MODELS = ("XGBoost", "LightGBM", "CatBoost")
+EARLY_STOPPING_ROUNDS = 20
+EARLY_STOPPING_FRACTION = 0.1  # Eğitim penceresinin sonundaki erken durdurma payı
+
+def make_walk_forward_folds(n_rows, n_folds=4, min_train_fraction=0.5):
+    """
+    Genişleyen pencereli katlar: her kat (train_end, valid_end) çiftidir.
+    Eğitim [0, train_end), doğrulama [train_end, valid_end) aralığıdır.
+    """
+    first_train_end = int(n_rows * min_train_fraction)
+    edges = np.linspace(first_train_end, n_rows, n_folds + 1).astype(int)
+    return [
+        (int(edges[i]), int(edges[i + 1]))
+        for i in range(n_folds)
+        if edges[i + 1] > edges[i]
+    ]
+
+def write_fold_cache(X, y, cache_dir):
+    """Özellik matrisi ve hedefi bir kez diske yazar; işçiler mmap ile okur."""
+    np.save(os.path.join(cache_dir, 'X.npy'), np.ascontiguousarray(X, dtype=np.float64))
+    np.save(os.path.join(cache_dir, 'y.npy'), np.ascontiguousarray(y, dtype=np.float64))
+
+def _load_fold_cache(cache_dir):
+    X = np.load(os.path.join(cache_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(cache_dir, 'y.npy'), mmap_mode='r')
+    return X, y
+
+def build_model(family, params, resource=None):
+    model = define_models()[family]
+    settings = dict(params)
+    if resource is not None and family in RESOURCE_PARAMS:
+        settings[RESOURCE_PARAMS[family]] = resource
+    # Paralellik görevler arasında; her model tek iş parçacığı kullanır
+    if family in THREAD_PARAMS:
+        settings[THREAD_PARAMS[family]] = 1
+    if family == "XGBoost":
+        settings["early_stopping_rounds"] = EARLY_STOPPING_ROUNDS
+    model.set_params(**settings)
+    return model
+
+def _fit(family, model, X_train, y_train):
+    """Boosting modellerini eğitim penceresinin son kısmıyla erken durdurarak eğitir."""
+    if family not in BOOSTING_MODELS:
+        model.fit(X_train, y_train)
+        return None
+
+    split = int(len(X_train) * (1 - EARLY_STOPPING_FRACTION))
+    X_fit, y_fit = X_train[:split], y_train[:split]
+    X_es, y_es = X_train[split:], y_train[split:]
+
+    if family == "XGBoost":
+        model.fit(X_fit, y_fit, eval_set=[(X_es, y_es)], verbose=False)
+        return model.best_iteration + 1
+    if family == "LightGBM":
+        import lightgbm as lgb
+        model.fit(X_fit, y_fit, eval_set=[(X_es, y_es)],
+                  callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        return model.best_iteration_
+    model.fit(X_fit, y_fit, eval_set=(X_es, y_es), early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+    return model.get_best_iteration() + 1
+
+def evaluate_candidate(cache_dir, family, params, resource, fold):
+    """Tek aday + tek kat: eğitir ve doğrulama hatasını döndürür."""
+    warnings.filterwarnings('ignore')
+    X, y = _load_fold_cache(cache_dir)
+    train_end, valid_end = fold
+
+    model = build_model(family, params, resource)
+    start = time.perf_counter()
+    best_iteration = _fit(family, model, X[:train_end], y[:train_end])
+    fit_time = time.perf_counter() - start
+
+    y_valid = y[train_end:valid_end]
+    y_pred = model.predict(X[train_end:valid_end])
+    return {
+        "MAE": mean_absolute_error(y_valid, y_pred),
+        "RMSE": np.sqrt(mean_squared_error(y_valid, y_pred)),
+        "Fit_s": fit_time,
+        "Best_Iteration": best_iteration
+    }
+
+def successive_halving(family, cache_dir, folds, min_resource=50, max_resource=800, eta=3, n_jobs=-1):
+    """
+    Tüm adaylar küçük bütçeyle başlar; her turda en iyi 1/eta kısmı kalır ve
+    bütçe eta katına çıkar. Dönüş: (tüm turların sonuçları, en iyi parametreler).
+    """
+    candidates = list(ParameterGrid(SEARCH_SPACES.get(family, {})))
+    has_resource = family in RESOURCE_PARAMS
+    resource = min_resource if has_resource else None
+    history = []
+    round_no = 0
+
+    while True:
+        tasks = [(params, fold) for params in candidates for fold in folds]
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(evaluate_candidate)(cache_dir, family, params, resource, fold)
+            for params, fold in tasks
+        )
+
+        per_candidate = {}
+        for (params, fold), score in zip(tasks, scores):
+            per_candidate.setdefault(json.dumps(params, sort_keys=True), []).append(score)
+
+        ranked = []
+        for key, fold_scores in per_candidate.items():
+            row = {
+                "Model": family,
+                "Round": round_no,
+                "Resource": resource,
+                "Params": key,
+                "MAE": np.mean([s["MAE"] for s in fold_scores]),
+                "RMSE": np.mean([s["RMSE"] for s in fold_scores]),
+                "Fit_s": np.mean([s["Fit_s"] for s in fold_scores])
+            }
+            iterations = [s["Best_Iteration"] for s in fold_scores if s["Best_Iteration"] is not None]
+            row["Best_Iteration"] = int(np.median(iterations)) if iterations else None
+            ranked.append(row)
+        ranked.sort(key=lambda r: r["MAE"])
+        history.extend(ranked)
+
+        if not has_resource or len(ranked) <= 1 or resource >= max_resource:
+            break
+
+        keep = max(1, len(ranked) // eta)
+        candidates = [json.loads(r["Params"]) for r in ranked[:keep]]
+        # JSON listeleri tuple'a geri çevir (ör. hidden_layer_sizes)
+        candidates = [
+            {k: tuple(v) if isinstance(v, list) else v for k, v in params.items()}
+            for params in candidates
+        ]
+        resource = min(resource * eta, max_resource)
+        round_no += 1
+
+    best = ranked[0]
+    best_params = {
+        k: tuple(v) if isinstance(v, list) else v
+        for k, v in json.loads(best["Params"]).items()
+    }
+    if has_resource:
+        # Boosting için erken durdurmanın bulduğu ağaç sayısını kullan
+        if family in BOOSTING_MODELS and best["Best_Iteration"]:
+            best_params[RESOURCE_PARAMS[family]] = best["Best_Iteration"]
+        else:
+            best_params[RESOURCE_PARAMS[family]] = best["Resource"]
+    return history, best_params
+
+def run_search(families=None, n_folds=4, min_resource=50, max_resource=800, eta=3, n_jobs=-1,
+               results_csv='search_results.csv', params_json='best_params.json'):
+    X, y, _ = load_and_process_data()
+    folds = make_walk_forward_folds(len(X), n_folds)
+    if families is None:
+        families = list(SEARCH_SPACES)
+
+    cache_dir = tempfile.mkdtemp(prefix='solar_folds_')
+    try:
+        write_fold_cache(X, y.to_numpy(), cache_dir)
+        print(f"{len(X)} satır, {len(folds)} kat. Katlar '{cache_dir}' altında paylaşılıyor.")
+
+        all_results = []
+        best_params = {}
+        for family in families:
+            start = time.perf_counter()
+            history, params = successive_halving(family, cache_dir, folds, min_resource, max_resource, eta, n_jobs)
+            all_results.extend(history)
+            best_params[family] = params
+            best = min((r for r in history if r["Round"] == history[-1]["Round"]), key=lambda r: r["MAE"])
+            print(f"{family:<25} | MAE: {best['MAE']:<10.2f} | {time.perf_counter() - start:>6.1f} s | {params}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    pd.DataFrame(all_results).to_csv(results_csv, index=False)
+    with open(params_json, 'w', encoding='utf-8') as f:
+        json.dump(best_params, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] Tüm sonuçlar '{results_csv}', en iyi parametreler '{params_json}' dosyasına kaydedildi.")
+    return best_params
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward çapraz doğrulama ve hiperparametre araması")
+    parser.add_argument('--models', nargs='*', default=None, help="Aranacak model aileleri (varsayılan: hepsi)")
+    parser.add_argument('--folds', type=int, default=4, help="Kat sayısı")
+    parser.add_argument('--min-resource', type=int, default=50, help="İlk turdaki ağaç/iterasyon sayısı")
+    parser.add_argument('--max-resource', type=int, default=800, help="En yüksek ağaç/iterasyon sayısı")
+    parser.add_argument('--eta', type=int, default=3, help="Her turda kalan aday oranı (1/eta)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Paralel görev sayısı")
+    args = parser.parse_args()
+
+    run_search(args.models, args.folds, args.min_resource, args.max_resource, args.eta, args.n_jobs)
+
+if __name__ == "__main__":
+    main()
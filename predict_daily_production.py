@@ -1,8 +1,165 @@
 import pandas as pd
 import numpy as np
-import joblib
-import json
+import os
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from forecast_stream import read_minutely_15, iter_chunks
+from forecast_cache import file_digest
+from feature_pipeline import load_pipeline
+from result_cache import result_key, summarize_predictions, load_results, store_results
+from solar_wizard import predict_power
+from calibration import load_calibration_for
+from model_registry import REGISTRY_DIR, MANIFEST_FILE, BUNDLE_FILE, open_registry
+from solar_geometry import GEOMETRY_FEATURES, GEOMETRY_VERSION, HORIZON_DEG, site_from_meta, with_geometry
+from tracing import stage
+
+ENSEMBLE_NAME = '__ensemble__'
+BENCHMARK_CSV = 'model_benchmark.csv'
+
+def load_ensemble_weights(model_names, benchmark_csv=BENCHMARK_CSV):
+    """
+    Ağırlıklı karışım için model ağırlıkları: solar_prediction.py'nin yazdığı
+    doğruluk raporundaki MAE'nin tersiyle orantılıdır. Rapor yoksa eşit ağırlık.
+    """
+    weights = pd.Series(1.0, index=model_names)
+    if os.path.exists(benchmark_csv):
+        report = pd.read_csv(benchmark_csv).set_index('Model')
+        mae = report['MAE'].reindex(model_names)
+        if mae.notna().all() and (mae > 0).all():
+            weights = 1 / mae
+    return weights / weights.sum()
+
+class EnsembleScorer:
+    """
+    Tüm modelleri aynı özellik matrisi üzerinde eşzamanlı çalıştırır. Matris
+    bir kez üretilir ve iş parçacıkları arasında salt okunur paylaşılır; model
+    kütüphaneleri tahmin sırasında GIL'i bıraktığından toplam süre en yavaş
+    modele yakındır. Aralık bazında ağırlıklı karışım, ortalama ve modellerin
+    ayrı tahminleri döner.
+    """
+
+    def __init__(self, models, pipeline, weights=None, max_workers=None, calibration=None):
+        self.models = models
+        self.pipeline = pipeline
+        self.calibration = calibration
+        self.names = list(models)
+        if weights is None:
+            weights = pd.Series(1.0 / len(self.names), index=self.names)
+        self.weights = np.asarray(weights.reindex(self.names), dtype=np.float64)
+        self.model_seconds = dict.fromkeys(self.names, 0.0)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or len(self.names))
+
+        # Çekirdekleri modeller arasında paylaştır (iç içe paralellik olmasın).
+        # CatBoost eğitilmiş modelde parametre değişikliğine izin vermez; atlanır.
+        from solar_prediction import THREAD_PARAMS, plan_thread_budget
+        _, budget = plan_thread_budget(self.names, n_workers=len(self.names))
+        for name, model in models.items():
+            if THREAD_PARAMS.get(name) == 'n_jobs' and hasattr(model, 'set_params'):
+                model.set_params(n_jobs=budget[name])
+
+    def _score_one(self, name, X, sun_up=None):
+        start = time.perf_counter()
+        with stage('ensemble_member', rows=len(X), model=name):
+            power_w = predict_power(self.models[name], X, self.pipeline, sun_up, self.calibration)
+        self.model_seconds[name] += time.perf_counter() - start
+        return power_w
+
+    def __call__(self, X, sun_up=None):
+        X.setflags(write=False)   # Tüm iş parçacıkları aynı matrisi okur
+        futures = [self._pool.submit(self._score_one, name, X, sun_up) for name in self.names]
+        stacked = np.stack([np.asarray(f.result(), dtype=np.float64) for f in futures])   # (model, satır)
+        return {
+            'power_w': self.weights @ stacked,
+            'mean_power_w': stacked.mean(axis=0),
+            'member_power_w': stacked.T   # (satır, model): günlük yayılım modellerin kendi toplamlarından
+        }
+
+    def close(self):
+        self._pool.shutdown()
+
+def predict_range(json_file, score, pipeline, start_date, end_date):
+    """
+    Tahmin dosyasını akışlı okur, [start_date, end_date) aralığını parça parça
+    tahmin eder ve sonuç dizilerini (aralık + günlük/saatlik toplamlar) döndürür.
+    score(X, sun_up) tek model için güç dizisi, topluluk için ise 'power_w' anahtarını
+    içeren dizi sözlüğü döndürür; ek diziler günlük toplamlarıyla birlikte eklenir.
+    sun_up güneşin ufkun altında olduğu (gece) satırları işaretler; bunlar modele gönderilmez.
+    """
+    try:
+        # Akışlı okuyucu: sütunlar doğrudan NumPy dizilerine okunur
+        with stage('json_decode') as traced:
+            meta, minutely_data = read_minutely_15(json_file)
+            traced.rows = len(minutely_data['time']) if minutely_data else 0
+    except FileNotFoundError:
+        print(f"Hata: {json_file} dosyası bulunamadı.")
+        return None
+
+    if not minutely_data:
+        print("Hata: JSON dosyasında 'minutely_15' verisi bulunamadı.")
+        return None
+
+    # 2-3. Tarih Aralığını Filtrele
+    times = minutely_data['time']
+    mask = (times >= np.datetime64(start_date)) & (times < np.datetime64(end_date))
+    if not mask.any():
+        print("Belirtilen tarih aralığında veri bulunamadı.")
+        return None
+    minutely_data = {k: v[mask] for k, v in minutely_data.items()}
+    
+    site = site_from_meta(meta)
+
+    # Eksik sütun kontrolü (geometri sütunları site biliniyorsa parça başına eklenir)
+    missing_cols = [
+        f for f in pipeline.missing_columns(minutely_data)
+        if site is None or f not in GEOMETRY_FEATURES
+    ]
+    if missing_cols:
+        print(f"Hata: Şu sütunlar eksik: {missing_cols}")
+        return None
+
+    # 6. Parça parça tahmin: tüm tablo yerine sabit uzunluklu zaman dilimleri işlenir
+    chunk_times = []
+    chunk_outputs = []
+    for chunk in iter_chunks(minutely_data):
+        # 4. Özellik Çıkarımı: tek geçişte float32 matris
+        with stage('solar_geometry', rows=len(chunk['time'])):
+            chunk, sun_up = with_geometry(chunk, site, pipeline.features)
+        with stage('feature_build', rows=len(chunk['time'])):
+            X = pipeline.transform(chunk)
+
+        # --- KALİBRASYON ADIMI ---
+        # predict_power negatifleri 0'a eşitler ve bulutluluk × doğrudan ışınım × saat
+        # bölmesinin çarpanını uygular (calibration.py). Çarpanlar invertör ölçümleriyle
+        # güncellenir; ölçüm görmemiş bölmelerde eski kural geçerlidir
+        # (10 Aralık: bulut > %90 VE doğrudan ışık < 50 W/m² ise 0.32).
+        output = score(X, sun_up)
+        chunk_outputs.append(output if isinstance(output, dict) else {'power_w': output})
+        chunk_times.append(chunk['time'])
+        # -------------------------
+
+    # Enerji Hesabı (Watt -> Watt-Saat)
+    # Veriler 15 dakikalık olduğu için, o 15 dakika boyunca ortalama gücün bu olduğunu varsayıyoruz.
+    # Enerji (Wh) = Güç (W) * Süre (h) = W * (15/60) = W * 0.25
+    times = np.concatenate(chunk_times)
+    outputs = {name: np.concatenate([o[name] for o in chunk_outputs]) for name in chunk_outputs[0]}
+    with stage('rollups', rows=len(times)):
+        results = summarize_predictions(times, outputs.pop('power_w'), slot_hours=0.25)
+        member_power_w = outputs.pop('member_power_w', None)
+        for name, power_w in outputs.items():
+            results[name] = power_w
+            results[f"daily_{name[:-len('_power_w')]}_wh"] = summarize_predictions(times, power_w, slot_hours=0.25)['daily_wh']
+        if member_power_w is not None:
+            # Min/max, aralık bazında zarf değil: en düşük ve en yüksek model günlük toplamı
+            member_daily_wh = np.column_stack([
+                summarize_predictions(times, member_power_w[:, i], slot_hours=0.25)['daily_wh']
+                for i in range(member_power_w.shape[1])
+            ])
+            results['daily_member_wh'] = member_daily_wh
+            results['daily_min_wh'] = member_daily_wh.min(axis=1)
+            results['daily_max_wh'] = member_daily_wh.max(axis=1)
+    return results
 
 def main():
     print("Tahmin işlemi başlatılıyor...")
@@ -13,130 +170,97 @@ def main():
         json_file = 'forecast_data.json'
 
     try:
-        with open(json_file, 'r') as f:
-            data_json = json.load(f)
+        # Sonuç önbelleği anahtarı için dosya içeriğinin özeti
+        forecast_digest = file_digest(json_file)
     except FileNotFoundError:
         print(f"Hata: {json_file} dosyası bulunamadı.")
         return
 
-    # 2. DataFrame Oluştur (15 dakikalık veriler)
-    minutely_data = data_json['minutely_15']
-    df = pd.DataFrame(minutely_data)
-
-    # Zamanı datetime'a çevir
-    df['time'] = pd.to_datetime(df['time'])
-
-    # 3. Tarih Aralığını Filtrele (10 Aralık - 19 Aralık)
+    # Tarih Aralığı (10 Aralık - 19 Aralık)
     # Başlangıç: 2025-12-10 00:00:00
     # Bitiş: 2025-12-19 23:59:59 (yani 2025-12-20'den küçük)
     start_date = "2025-12-10"
     end_date = "2025-12-20" # Bu tarih dahil değil
-    
-    mask = (df['time'] >= start_date) & (df['time'] < end_date)
-    df_filtered = df.loc[mask].copy()
-    
-    if df_filtered.empty:
-        print("Belirtilen tarih aralığında veri bulunamadı.")
-        return
 
-    # 4. Özellik Çıkarımı (Feature Engineering)
-    df_filtered['hour'] = df_filtered['time'].dt.hour
-    df_filtered['month'] = df_filtered['time'].dt.month
-    df_filtered['dayofyear'] = df_filtered['time'].dt.dayofyear
-    
-    # Sütun isimlerini modelin özelliklerine eşle
-    # JSON'daki isimler -> Modelin beklediği isimler
-    column_mapping = {
-        'temperature_2m': 'temperature_2m (°C)',
-        'shortwave_radiation': 'shortwave_radiation (W/m²)',
-        'diffuse_radiation': 'diffuse_radiation (W/m²)',
-        'direct_normal_irradiance': 'direct_normal_irradiance (W/m²)',
-        'cloud_cover': 'cloud_cover (%)'
-    }
-    df_filtered.rename(columns=column_mapping, inplace=True)
-
-    # Modelin beklediği özellik sütunları (Sırası önemli olabilir, ama XGBoost genelde isme bakar)
-    features = [
-        'temperature_2m (°C)', 
-        'shortwave_radiation (W/m²)', 
-        'diffuse_radiation (W/m²)', 
-        'direct_normal_irradiance (W/m²)', 
-        'cloud_cover (%)',
-        'hour', 
-        'month', 
-        'dayofyear'
-    ]
-    
-    # Eksik sütun kontrolü
-    missing_cols = [col for col in features if col not in df_filtered.columns]
-    if missing_cols:
-        print(f"Hata: Şu sütunlar eksik: {missing_cols}")
-        return
-
-    X = df_filtered[features]
+    # Ortak özellik hattı: JSON adları -> modelin beklediği özellikler (eğitimle aynı)
+    pipeline = load_pipeline()
 
-    # 5. Modeli Seç ve Yükle
-    all_models_path = 'solar_models_all.joblib'
-    try:
-        models_dict = joblib.load(all_models_path)
-    except FileNotFoundError:
-        print(f"Hata: Model dosyası ({all_models_path}) bulunamadı. Lütfen önce 'solar_prediction.py'yi çalıştırarak modelleri eğitin.")
+    # 5. Modeli Seç ve Yükle: liste yalnızca manifestten gelir, seçilen model sonra açılır
+    registry = open_registry()
+    if registry is None:
+        print(f"Hata: Model kaydı ({REGISTRY_DIR}/{MANIFEST_FILE}) bulunamadı. Lütfen önce 'solar_prediction.py'yi çalıştırarak modelleri eğitin.")
+        if os.path.exists(BUNDLE_FILE):
+            print(f"Eski '{BUNDLE_FILE}' dosyası için: python model_registry.py import {BUNDLE_FILE}")
         return
 
     print("\n--- Kullanılabilir Modeller ---")
-    model_names = list(models_dict.keys())
+    model_names = registry.names()
+    print("0. Tüm modeller (topluluk: ortalama, ağırlıklı karışım, min/max)")
     for i, name in enumerate(model_names, 1):
-        print(f"{i}. {name}")
+        info = registry.info(name)
+        mae = info.get('metrics', {}).get('MAE')
+        mae_text = f"MAE {mae:.1f} W, " if mae is not None else ""
+        print(f"{i}. {name} ({mae_text}{info['size_bytes'] / 1024:.0f} KB)")
     
     while True:
         try:
-            choice = int(input("\nLütfen bir model numarası seçin (1-7): "))
+            choice = int(input(f"\nLütfen bir model numarası seçin (0-{len(model_names)}): "))
+            if choice == 0:
+                selected_model_name = ENSEMBLE_NAME
+                print(f"\nSeçilen: {len(model_names)} modelin topluluğu")
+                break
             if 1 <= choice <= len(model_names):
                 selected_model_name = model_names[choice - 1]
-                model = models_dict[selected_model_name]
                 print(f"\nSeçilen Model: {selected_model_name}")
                 break
             else:
-                print(f"Lütfen 1 ile {len(model_names)} arasında bir sayı girin.")
+                print(f"Lütfen 0 ile {len(model_names)} arasında bir sayı girin.")
         except ValueError:
             print("Geçersiz giriş. Lütfen bir sayı girin.")
 
-    predictions_power_w = model.predict(X)
-    
-    # Negatif tahminleri 0'a eşitle
-    predictions_power_w = np.maximum(predictions_power_w, 0)
+    # Aynı tahmin dosyası + model dosyası + model seçimi + kalibrasyon tablosu daha önce
+    # hesaplandıysa sonuçlar önbellekten gelir; JSON ayrıştırılmaz, model çağrılmaz.
+    # Tek model için tablo model dosyasının, topluluk için manifestin yanında durur
+    ensemble = selected_model_name == ENSEMBLE_NAME
+    calibration = load_calibration_for(registry.manifest_path if ensemble else registry.path(selected_model_name))
+    key = result_key(
+        forecast_digest,
+        registry.digest(None if ensemble else [selected_model_name]),
+        calibration.digest(),
+        model=selected_model_name,
+        start=start_date,
+        end=end_date,
+        features=pipeline.features,
+        night_gate=HORIZON_DEG,
+        geometry=GEOMETRY_VERSION,
+        ensemble_spread='model_daily_totals'
+    )
+    with stage('result_cache_lookup'):
+        results = load_results(key)
+    if results is None:
+        if ensemble:
+            scorer = EnsembleScorer(registry.load_all(), pipeline, load_ensemble_weights(model_names), calibration=calibration)
+            start = time.perf_counter()
+            try:
+                results = predict_range(json_file, scorer, pipeline, start_date, end_date)
+            finally:
+                scorer.close()
+            wall = time.perf_counter() - start
+            slowest = max(scorer.model_seconds, key=scorer.model_seconds.get)
+            print(f"\nTopluluk süresi: {wall:.2f} s (en yavaş model: {slowest}, {scorer.model_seconds[slowest]:.2f} s; "
+                  f"modellerin toplamı: {sum(scorer.model_seconds.values()):.2f} s)")
+        else:
+            model = registry.load(selected_model_name)
+            results = predict_range(json_file, lambda X, sun_up: predict_power(model, X, pipeline, sun_up, calibration), pipeline, start_date, end_date)
+        if results is None:
+            return
+        store_results(key, results, meta={'forecast': json_file, 'model': selected_model_name})
 
-    # --- KALİBRASYON ADIMI ---
-    # Kullanıcı Geri Bildirimi: 10 Aralık'ta model 5.62 kWh tahmin etti, gerçekleşen 1.79 kWh.
-    # Bu, %100 bulutlu ve düşük ışıkta modelin fazla iyimser olduğunu gösteriyor (Factor ~0.32).
-    # Bu durumu düzeltmek için "Ağır Bulutluluk Cezası" ekliyoruz.
-    
-    # Pandas serisi olarak işlem yapmak daha kolay
-    prediction_series = pd.Series(predictions_power_w, index=X.index)
-    cloud_cover = X['cloud_cover (%)']
-    direct_rad = X['direct_normal_irradiance (W/m²)'] # Doğrudan ışık
-    
-    # Kural: Bulut > %90 VE Doğrudan Işık < 50 W/m² ise tahmini 0.32 ile çarp
-    heavy_cloud_mask = (cloud_cover > 90) & (direct_rad < 50)
-    
-    # Mevcut tahminleri katsayı ile güncelle
-    prediction_series.loc[heavy_cloud_mask] *= 0.32
-    
-    # Güncellenmiş değerleri geri al
-    predictions_power_w = prediction_series.values
-    # -------------------------
-    
-    # 6. Enerji Hesabı (Watt -> Watt-Saat)
-    # Veriler 15 dakikalık olduğu için, o 15 dakika boyunca ortalama gücün bu olduğunu varsayıyoruz.
-    # Enerji (Wh) = Güç (W) * Süre (h) = W * (15/60) = W * 0.25
-    predictions_energy_wh = predictions_power_w * 0.25
-    
-    df_filtered['Predicted_Power_W'] = predictions_power_w
-    df_filtered['Predicted_Energy_Wh'] = predictions_energy_wh
-    
-    # 7. Sonuçları Günlük Olarak Grupla ve Yazdır
-    df_filtered['Date'] = df_filtered['time'].dt.date
-    daily_production = df_filtered.groupby('Date')['Predicted_Energy_Wh'].sum()
+    # 7. Günlük toplamlar (sonuçlarla birlikte hesaplanıp önbelleğe alınır)
+    daily_production = pd.Series(
+        np.asarray(results['daily_wh']),
+        index=np.asarray(results['daily_date']).astype(object)
+    )
     
     print("\n--- 10-19 ARALIK GÜNLÜK GÜNEŞ ENERJİSİ ÜRETİM TAHMİNİ ---")
     print(f"{'Tarih':<15} | {'Toplam Üretim (Wh)':<20} | {'Toplam Üretim (kWh)':<20}")
@@ -152,5 +276,14 @@ def main():
     print("-" * 60)
     print(f"TOPLAM (10 Gün) : {total_period_production:>18.2f} Wh | {(total_period_production/1000):>18.2f} kWh")
 
+    # Topluluk: yukarıdaki tablo ağırlıklı karışımdır; modeller arası yayılım ayrıca gösterilir
+    if 'daily_mean_wh' in results:
+        print("\n--- TOPLULUK YAYILIMI (kWh; Min/Max: en düşük / en yüksek modelin günlük toplamı) ---")
+        print(f"{'Tarih':<15} | {'Ağırlıklı':>10} | {'Ortalama':>10} | {'Min model':>10} | {'Max model':>10}")
+        print("-" * 66)
+        for i, date in enumerate(daily_production.index):
+            print(f"{str(date):<15} | {results['daily_wh'][i] / 1000:>10.2f} | {results['daily_mean_wh'][i] / 1000:>10.2f} | "
+                  f"{results['daily_min_wh'][i] / 1000:>10.2f} | {results['daily_max_wh'][i] / 1000:>10.2f}")
+
 if __name__ == "__main__":
     main()
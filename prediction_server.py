@@ -0,0 +1,189 @@
+import pandas as pd
+import numpy as np
+import json
+import queue
+import threading
+import time
+import argparse
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from solar_wizard import find_model_path, load_model, build_feature_frame, feature_matrix, predict_power
+from calibration import load_calibration_for
+from solar_geometry import SUN_UP_COLUMN
+
+# Modeli bellekte sıcak tutan yerel tahmin servisi.
+# Eşzamanlı gelen istekler kısa bir bekleme penceresinde toplanıp (micro-batch)
+# tek bir model.predict çağrısıyla tahmin edilir.
+#
+# Kullanım:
+#   python prediction_server.py --port 8765
+#   curl -X POST --data-binary @forecast_data.json http://127.0.0.1:8765/predict
+
+class MicroBatcher:
+    """İstekleri kuyrukta toplayıp tek predict çağrısında işleyen arka plan iş parçacığı."""
+
+    def __init__(self, model, max_batch_rows=200000, max_wait_ms=5, calibration=None):
+        self.model = model
+        self.calibration = calibration
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, X, sun_up=None):
+        """X için tahmin (W) dönecek bir Future verir. sun_up: gece satırları False."""
+        future = Future()
+        if sun_up is None:
+            sun_up = np.ones(len(X), dtype=bool)
+        self.requests.put((X, sun_up, future))
+        return future
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                X_all = np.concatenate([X for X, _, _ in batch])
+                sun_up = np.concatenate([mask for _, mask, _ in batch])
+                power_w = predict_power(self.model, X_all, sun_up=sun_up, calibration=self.calibration)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for X, _, future in batch:
+                end = start + len(X)
+                future.set_result(power_w[start:end])
+                start = end
+
+def summarize(df, power_w):
+    """Aralık tahminlerinden günlük ve saatlik toplamları oluşturur."""
+    result = pd.DataFrame({
+        'Date': df['time'].dt.date.astype(str),
+        'hour': df['hour'].astype(int),
+        'Predicted_Power_W': power_w,
+        'Predicted_Energy_Wh': power_w * 0.25
+    })
+
+    daily = result.groupby('Date')['Predicted_Energy_Wh'].sum()
+    hourly = result.groupby(['Date', 'hour']).agg({
+        'Predicted_Power_W': 'mean',
+        'Predicted_Energy_Wh': 'sum'
+    }).reset_index()
+
+    return {
+        'rows': len(result),
+        'daily': [
+            {'date': date, 'energy_wh': round(float(wh), 2)}
+            for date, wh in daily.items()
+        ],
+        'hourly': [
+            {
+                'date': row.Date,
+                'hour': int(row.hour),
+                'power_w': round(float(row.Predicted_Power_W), 2),
+                'energy_wh': round(float(row.Predicted_Energy_Wh), 2)
+            }
+            for row in hourly.itertuples(index=False)
+        ]
+    }
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'error': 'Bulunamadı'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send_json(404, {'error': 'Bulunamadı'})
+            return
+
+        started = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            data_json = json.loads(self.rfile.read(length))
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {'error': 'Geçersiz JSON formatı'})
+            return
+
+        try:
+            df = build_feature_frame(data_json) if isinstance(data_json, dict) else None
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            # Bozuk zaman damgası, yanlış tipte 'minutely_15' vb.: bağlantı düşmesin, 400 dönsün
+            self._send_json(400, {'error': f"Geçersiz 'minutely_15' verisi: {e}"})
+            return
+        if df is None or df.empty:
+            self._send_json(400, {'error': "Geçerli 'minutely_15' verisi bulunamadı"})
+            return
+
+        try:
+            power_w = self.batcher.submit(feature_matrix(df), df[SUN_UP_COLUMN].to_numpy()).result()
+        except Exception as e:
+            self._send_json(500, {'error': f"Tahmin başarısız: {e}"})
+            return
+
+        payload = summarize(df, power_w)
+        payload['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        self._send_json(200, payload)
+
+    def log_message(self, format, *args):
+        # Her istek için konsola yazmayı kapat
+        pass
+
+def serve(model_path='best_solar_model.joblib', host='127.0.0.1', port=8765,
+          max_batch_rows=200000, max_wait_ms=5):
+    model = load_model(model_path)
+    calibration = load_calibration_for(find_model_path(model_path))
+    PredictionHandler.batcher = MicroBatcher(model, max_batch_rows, max_wait_ms, calibration)
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    print(f"Model yüklendi. Tahmin servisi http://{host}:{port}/predict adresinde çalışıyor...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServis durduruluyor.")
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sıcak model tutan yerel tahmin servisi")
+    parser.add_argument('--model', default='best_solar_model.joblib', help="Model dosyası")
+    parser.add_argument('--host', default='127.0.0.1', help="Dinlenecek adres")
+    parser.add_argument('--port', type=int, default=8765, help="Dinlenecek port")
+    parser.add_argument('--max-batch-rows', type=int, default=200000, help="Tek predict çağrısındaki en fazla satır")
+    parser.add_argument('--max-wait-ms', type=float, default=5, help="Toplu işlem için bekleme süresi (ms)")
+    args = parser.parse_args()
+
+    serve(args.model, args.host, args.port, args.max_batch_rows, args.max_wait_ms)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Gün × saat × metrik üretim küpü.
+# Tahminden hemen sonra bir kez kurulur; sihirbazdaki gün detayı, grafikler ve
+# öneriler tabloyu yeniden filtrelemek/gruplamak yerine tarih -> satır indeksiyle
+# doğrudan küpten okur. Haftalık ve aylık özetler de aynı küpten türetilir.
+
+METRICS = ('power_w', 'energy_wh')   # Saatlik ortalama güç (W), saatlik toplam enerji (Wh)
+HOURS = 24
+
+class ProductionCube:
+    def __init__(self, dates, values):
+        """
+        dates: (gün,) datetime64[D] dizisi (sıralı)
+        values: (gün, 24, metrik) dizisi; metrik sırası METRICS ile aynıdır
+        """
+        self.dates = np.asarray(dates).astype('datetime64[D]')
+        self.values = np.ascontiguousarray(values)
+        self.row = {str(d): i for i, d in enumerate(self.dates)}
+
+    @classmethod
+    def from_results(cls, results):
+        """result_cache.summarize_predictions çıktısından küpü kurar."""
+        values = np.stack([
+            np.asarray(results['hourly_power_w']),
+            np.asarray(results['hourly_energy_wh'])
+        ], axis=-1)
+        return cls(results['daily_date'], values)
+
+    def labels(self):
+        """Küpteki günler (YYYY-MM-DD metni)."""
+        return list(self.row)
+
+    def day(self, date):
+        """Günün (24, metrik) görünümü; gün küpte yoksa None."""
+        i = self.row.get(str(date))
+        return None if i is None else self.values[i]
+
+    def hourly_power(self, date):
+        day = self.day(date)
+        return None if day is None else day[:, METRICS.index('power_w')]
+
+    def daily_energy(self):
+        """Her günün toplam enerjisi (Wh)."""
+        return self.values[:, :, METRICS.index('energy_wh')].sum(axis=1)
+
+    def period_starts(self, period):
+        """Her günün bağlı olduğu dönemin ilk günü ('week': Pazartesi, 'month': ayın 1'i)."""
+        if period == 'week':
+            # 1970-01-01 Perşembe: (gün + 3) % 7 Pazartesi için 0 verir
+            weekday = (self.dates.astype(np.int64) + 3) % 7
+            return self.dates - weekday.astype('timedelta64[D]')
+        if period == 'month':
+            return self.dates.astype('datetime64[M]').astype('datetime64[D]')
+        raise ValueError(f"Bilinmeyen dönem: {period}")
+
+    def period_summary(self, period):
+        """
+        Haftalık veya aylık özet. Dönüş: (dönem başlangıçları, gün sayıları,
+        toplam enerji Wh, dönem içindeki saatlik ortalama güç profili (dönem, 24)).
+        """
+        starts = self.period_starts(period)
+        labels, first, counts = np.unique(starts, return_index=True, return_counts=True)
+        # Günler sıralı olduğundan her dönem küpte ardışık bir dilimdir
+        totals = np.add.reduceat(self.daily_energy(), first)
+        profiles = np.add.reduceat(self.values[:, :, METRICS.index('power_w')], first, axis=0) / counts[:, None]
+        return labels, counts, totals, profiles
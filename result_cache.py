@@ -0,0 +1,132 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from forecast_cache import evict, file_digest, publish_mode
+
+# Tahmin sonuçları için içerik adresli önbellek.
+# Anahtar; tahmin dosyasının içerik özeti, model dosyasının içerik özeti ve
+# kalibrasyon parametrelerinden türetilir. Model yeniden eğitildiğinde özeti
+# değiştiği için eski sonuçlar kendiliğinden geçersiz olur ve zamanla LRU
+# tahliyesiyle silinir. Kayıtta 15 dakikalık tahminler ile günlük ve saatlik
+# toplamlar .npy dizileri olarak tutulur; tekrar çalıştırmada model hiç çağrılmaz.
+
+RESULT_CACHE_DIR = '.result_cache'
+MAX_RESULT_BYTES = 128 * 1024 * 1024   # Önbelleğin toplam boyut sınırı
+MAX_AGE_SECONDS = 30 * 24 * 3600       # 30 gün kullanılmayan kayıtlar silinir
+
+_MANIFEST = 'manifest.json'
+
+# Model dosyalarının özeti; dosya değişmedikçe (boyut + değişiklik zamanı) yeniden hesaplanmaz
+_digest_memo = {}
+
+def artifact_digest(path):
+    """Model gibi büyük dosyaların sha256 özetini, dosya değişmedikçe bellekte tutar."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        _digest_memo[memo_key] = file_digest(path)
+    return _digest_memo[memo_key]
+
+def result_key(forecast_digest, model_digest, calibration=None, **extra):
+    """Girdilerin tamamını kapsayan kararlı anahtar (sha256)."""
+    payload = {
+        'forecast': forecast_digest,
+        'model': model_digest,
+        'calibration': calibration or {},
+        'extra': extra
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def summarize_predictions(times, power_w, slot_hours=0.25):
+    """
+    15 dakikalık güç tahminlerinden sonuç dizilerini üretir:
+      time, power_w, energy_wh: aralık bazında tahminler
+      daily_date, daily_wh: günlük toplam enerji
+      hourly_power_w, hourly_energy_wh: (gün, 24) saatlik ortalama güç ve toplam enerji
+    Verisi olmayan saatler 0 olur. Toplamlar pandas'ın telafili (Kahan)
+    toplamıyla alınır; raporlardaki groupby sonuçlarıyla birebir aynıdır.
+    """
+    times = np.asarray(times).astype('datetime64[m]')
+    power_w = np.asarray(power_w)   # Modelin çıktı tipi korunur (ör. float32)
+    energy_wh = power_w * slot_hours
+
+    days = times.astype('datetime64[D]')
+    daily_date, day_index = np.unique(days, return_inverse=True)
+    hours = (times - days).astype('timedelta64[h]').astype(np.int64)
+
+    cells = pd.RangeIndex(len(daily_date) * 24)
+    by_cell = pd.DataFrame({'power_w': power_w, 'energy_wh': energy_wh}).groupby(day_index * 24 + hours)
+    hourly_power_w = by_cell['power_w'].mean().reindex(cells, fill_value=0.0)
+    hourly_energy_wh = by_cell['energy_wh'].sum().reindex(cells, fill_value=0.0)
+
+    return {
+        'time': times,
+        'power_w': power_w,
+        'energy_wh': energy_wh,
+        'daily_date': daily_date,
+        'daily_wh': pd.Series(energy_wh).groupby(day_index).sum().to_numpy(),
+        'hourly_power_w': hourly_power_w.to_numpy().reshape(-1, 24),
+        'hourly_energy_wh': hourly_energy_wh.to_numpy().reshape(-1, 24)
+    }
+
+def load_results(key, cache_dir=RESULT_CACHE_DIR):
+    """Kayıtlı sonuç dizilerini bellek eşlemeli açar; kayıt yoksa None."""
+    entry_dir = os.path.join(cache_dir, key)
+    manifest_path = os.path.join(entry_dir, _MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        results = {
+            name: np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode='r')
+            for name in manifest['arrays']
+        }
+    except (OSError, ValueError, KeyError):
+        # Bozuk kayıt: sil ve yeniden oluşturulmasına izin ver
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+    # Son kullanım zamanını güncelle (LRU tahliyesi için)
+    os.utime(entry_dir)
+    return results
+
+def store_results(key, results, cache_dir=RESULT_CACHE_DIR, meta=None,
+                  max_bytes=MAX_RESULT_BYTES, max_age=MAX_AGE_SECONDS):
+    """
+    Sonuç dizilerini önbelleğe yazar. Yazma geçici dizine yapılıp atomik
+    olarak yerine taşınır; ardından boyut sınırı için tahliye çalışır.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(entry_dir):
+        return
+
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        for name, values in results.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.asarray(values))
+
+        manifest = {
+            'arrays': list(results),
+            'meta': meta or {},
+            'created': time.time()
+        }
+        with open(os.path.join(tmp_dir, _MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, default=str)
+        publish_mode(tmp_dir, entry_dir)
+        os.replace(tmp_dir, entry_dir)
+    except OSError as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        print(f"Uyarı: Sonuç önbelleğine yazılamadı: {e}")
+        return
+
+    evict(cache_dir, max_bytes, max_age)
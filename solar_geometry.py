@@ -0,0 +1,192 @@
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+from time_alignment import to_utc
+
+# Vektörel güneş konumu ve açık gökyüzü ışınımı (NOAA güneş hesabı).
+# Tahmin dosyasındaki latitude / longitude / elevation / timezone bilgisiyle
+# her 15 dakikalık aralık için güneş zenit ve azimut açısı ile açık gökyüzü
+# ışınımı hesaplanır. Yerel saatler IANA saat dilimiyle UTC'ye çevrilir (yaz
+# saati geçişleri dahil, time_alignment.to_utc); dilim adı yoksa veya
+# tanınmıyorsa sabit utc_offset_seconds kullanılır. Bir günün değerleri
+# site + tarih anahtarıyla önbelleğe alınır. Güneşin aralık boyunca ufkun altında kaldığı satırlar
+# (gece) için model hiç çalıştırılmaz; üretim doğrudan 0 kabul edilir.
+
+SLOT_MINUTES = 15
+# Gün doğumu/batımı tanımı: güneş merkezinin yüksekliği -0.833° (kırılma + yarıçap)
+HORIZON_DEG = -0.833
+SUN_UP_COLUMN = 'sun_up'
+# Gece maskesini veya geometri sütunlarını değiştiren her düzeltmede artırılır;
+# özellik tablosu ve sonuç önbelleklerinin anahtarlarına girer
+GEOMETRY_VERSION = 2
+
+# İsteğe bağlı model özellikleri (FeaturePipeline(features=FEATURES + GEOMETRY_FEATURES))
+GEOMETRY_FEATURES = ('solar_zenith', 'solar_azimuth', 'clear_sky_ghi')
+
+Site = namedtuple('Site', ['latitude', 'longitude', 'elevation', 'utc_offset_seconds', 'timezone'],
+                  defaults=(None,))
+
+def site_from_meta(meta):
+    """Open-Meteo JSON üst bilgisinden site; konum yoksa None."""
+    if meta is None or 'latitude' not in meta or 'longitude' not in meta:
+        return None
+    return Site(
+        float(meta['latitude']),
+        float(meta['longitude']),
+        float(meta.get('elevation') or 0.0),
+        int(meta.get('utc_offset_seconds') or 0),
+        meta.get('timezone') if isinstance(meta.get('timezone'), str) else None
+    )
+
+def local_to_utc(local, site):
+    """
+    Yerel saat (datetime64) -> UTC datetime64[m]. Saat dilimiyle çevrilemeyen
+    zamanlar (ilkbahar geçişinde olmayan, sonbaharda iki kez yaşanan saat)
+    sabit UTC farkıyla çevrilir.
+    """
+    local = np.asarray(local).astype('datetime64[m]')
+    fixed = local - np.timedelta64(site.utc_offset_seconds, 's')
+    if not site.timezone:
+        return fixed
+    utc = to_utc(local, site.timezone, site.utc_offset_seconds).tz_localize(None).to_numpy().astype('datetime64[m]')
+    return np.where(np.isnat(utc), fixed, utc)
+
+def solar_position(times_utc, latitude, longitude):
+    """
+    times_utc: datetime64 dizisi (UTC). Dönüş: (zenit, azimut) derece cinsinden;
+    azimut kuzeyden saat yönünde ölçülür.
+    """
+    minutes = np.asarray(times_utc).astype('datetime64[s]').astype(np.int64) / 60.0
+    julian_day = minutes / 1440.0 + 2440587.5
+    jc = (julian_day - 2451545.0) / 36525.0
+
+    mean_long = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    center = np.radians(
+        np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * mean_anom) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = mean_long + center - np.radians(0.00569 + 0.00478 * np.sin(omega))
+    mean_obliq = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliq = np.radians(mean_obliq + 0.00256 * np.cos(omega))
+    declination = np.arcsin(np.sin(obliq) * np.sin(apparent_long))
+
+    y = np.tan(obliq / 2) ** 2
+    eq_time = 4 * np.degrees(
+        y * np.sin(2 * mean_long)
+        - 2 * eccent * np.sin(mean_anom)
+        + 4 * eccent * y * np.sin(mean_anom) * np.cos(2 * mean_long)
+        - 0.5 * y * y * np.sin(4 * mean_long)
+        - 1.25 * eccent * eccent * np.sin(2 * mean_anom)
+    )
+
+    true_solar_minutes = (minutes % 1440 + eq_time + 4 * longitude) % 1440
+    hour_angle = np.radians(true_solar_minutes / 4 - 180)
+    lat = np.radians(latitude)
+
+    cos_zenith = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    zenith = np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+    azimuth = (np.degrees(np.arctan2(
+        np.sin(hour_angle),
+        np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat)
+    )) + 180) % 360
+    return zenith, azimuth
+
+def clear_sky_ghi(zenith, elevation=0.0):
+    """
+    Açık gökyüzü yatay ışınımı (W/m²). Doğrudan ışınım Meinel modeli ve
+    yükseklik düzeltmesiyle (Laue), hava kütlesi Kasten-Young ile hesaplanır;
+    dağınık bileşen doğrudanın %10'u kabul edilir.
+    """
+    zenith = np.asarray(zenith, dtype=float)
+    cos_zenith = np.cos(np.radians(zenith))
+    up = zenith < 90
+    air_mass = np.full(zenith.shape, np.inf)
+    air_mass[up] = 1 / (cos_zenith[up] + 0.50572 * (96.07995 - zenith[up]) ** -1.6364)
+    height_km = elevation / 1000
+    dni = 1353 * ((1 - 0.14 * height_km) * 0.7 ** (air_mass ** 0.678) + 0.14 * height_km)
+    return np.where(up, 1.1 * dni * cos_zenith, 0.0)
+
+@lru_cache(maxsize=4096)
+def _day_geometry(site, day, slot_minutes=SLOT_MINUTES):
+    """
+    Bir site ve yerel gün için aralık başına geometri (önbellekli).
+    Open-Meteo 15 dakikalık ışınımı önceki 15 dakikanın ortalamasıdır; bu yüzden
+    güneş [t - 15 dk, t] aralığının herhangi bir noktasında ufkun üstündeyse
+    aralık 'gündüz' sayılır.
+    """
+    n_slots = 24 * 60 // slot_minutes
+    local = np.datetime64(day, 'm') + np.arange(n_slots) * np.timedelta64(slot_minutes, 'm')
+    utc = local_to_utc(local, site)
+
+    zenith, azimuth = solar_position(utc, site.latitude, site.longitude)
+    # Aralığın başı ve ortası da örneklenir (ufuk geçişleri kaçmasın)
+    offsets = (slot_minutes, slot_minutes // 2)
+    max_elevation = 90 - zenith
+    for offset in offsets:
+        earlier, _ = solar_position(utc - np.timedelta64(offset, 'm'), site.latitude, site.longitude)
+        max_elevation = np.maximum(max_elevation, 90 - earlier)
+
+    geometry = {
+        'solar_zenith': zenith,
+        'solar_azimuth': azimuth,
+        'clear_sky_ghi': clear_sky_ghi(zenith, site.elevation),
+        SUN_UP_COLUMN: max_elevation > HORIZON_DEG
+    }
+    for values in geometry.values():
+        values.setflags(write=False)
+    return geometry
+
+def solar_geometry(times, site, slot_minutes=SLOT_MINUTES):
+    """
+    times: yerel saatle datetime64 dizisi (Open-Meteo 'time' sütunu).
+    Dönüş: 'solar_zenith', 'solar_azimuth', 'clear_sky_ghi', 'sun_up' dizileri.
+    Aralık ızgarasındaki zamanlar günlük önbellekten okunur.
+    """
+    minutes = np.asarray(times).astype('datetime64[m]')
+    days = minutes.astype('datetime64[D]')
+    offsets = (minutes - days).astype(np.int64)
+    if len(minutes) and np.any(offsets % slot_minutes):
+        # Izgara dışı zamanlar: doğrudan hesapla
+        utc = local_to_utc(minutes, site)
+        zenith, azimuth = solar_position(utc, site.latitude, site.longitude)
+        return {
+            'solar_zenith': zenith,
+            'solar_azimuth': azimuth,
+            'clear_sky_ghi': clear_sky_ghi(zenith, site.elevation),
+            SUN_UP_COLUMN: 90 - zenith > HORIZON_DEG
+        }
+
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    slot_index = offsets // slot_minutes
+    per_day = [_day_geometry(site, str(day), slot_minutes) for day in unique_days]
+    return {
+        name: np.stack([g[name] for g in per_day])[day_index, slot_index] if per_day else np.empty(0)
+        for name in GEOMETRY_FEATURES + (SUN_UP_COLUMN,)
+    }
+
+def daylight_mask(times, site):
+    """Güneşin ufkun üstünde olduğu aralıklar (bool dizi); site bilinmiyorsa None."""
+    if site is None:
+        return None
+    return solar_geometry(times, site)[SUN_UP_COLUMN]
+
+def with_geometry(columns, site, features=(), time_column='time'):
+    """
+    Sütun eşlemesine, özellik listesinde istenen geometri sütunlarını ekler.
+    Dönüş: (sütunlar, sun_up). Site bilinmiyorsa hiçbir satır elenmez (tümü True).
+    """
+    times = columns[time_column]
+    if site is None:
+        return columns, np.ones(len(times), dtype=bool)
+
+    geometry = solar_geometry(times, site)
+    wanted = [name for name in GEOMETRY_FEATURES if name in features]
+    if wanted:
+        columns = dict(columns)
+        columns.update({name: geometry[name] for name in wanted})
+    return columns, geometry[SUN_UP_COLUMN]
@@ -1,64 +1,102 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
 from sklearn.neural_network import MLPRegressor
-import xgboost as xgb
-import lightgbm as lgb
-import catboost as cb
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import warnings
+import io
+import os
+import json
+import sys
+import time
+import multiprocessing
+from threadpoolctl import threadpool_limits
+
+from dataset_store import STORE_DIR, read_range
+from ingest import DEFAULT_PATTERN, load_exports
+from time_alignment import read_weather, solar_to_utc, to_local, align
+from feature_pipeline import FeaturePipeline, PIPELINE_FILE
+from tracing import stage
+from compiled_model import export_model
+from model_registry import REGISTRY_DIR, MANIFEST_FILE, ModelRegistry
 
 # Gereksiz uyarıları gizle
 warnings.filterwarnings('ignore')
 
-def load_and_process_data():
+# Eğitim ve tahminde kullanılan ortak özellik hattı (modelle birlikte kaydedilir)
+PIPELINE = FeaturePipeline()
+
+# Veri deposundaki (prepare_data.py) sütun adları -> eğitimde kullanılan adlar
+STORE_COLUMNS = {
+    'power_w': 'Power [W]',
+    'temp_c': 'temperature_2m (°C)',
+    'shortwave_rad': 'shortwave_radiation (W/m²)',
+    'diffuse_rad': 'diffuse_radiation (W/m²)',
+    'direct_rad': 'direct_normal_irradiance (W/m²)',
+    'cloud_cover': 'cloud_cover (%)'
+}
+
+def load_from_store(store_dir, start=None, end=None):
+    """Bölümlenmiş veri deposundan yalnızca [start, end) dilimini okur."""
+    df = read_range(store_dir, start, end, columns=list(STORE_COLUMNS))
+    df = df.rename(columns=STORE_COLUMNS)
+    df['time'] = df.index
+    return df.reset_index(drop=True)
+
+def load_and_process_data(start=None, end=None, store_dir=None, energy_files=DEFAULT_PATTERN):
     print("Veriler yükleniyor...")
+
+    if store_dir is not None:
+        # Tarih aralığı dışındaki bölümler diskten hiç okunmaz
+        with stage('load_store') as traced:
+            df_merged = load_from_store(store_dir, start, end)
+            traced.rows = len(df_merged)
+        return _build_features(df_merged)
     
-    # 1. Hava Durumu Verisi
+    # 1. Hava Durumu Verisi (CSV üst bilgisindeki saat dilimiyle UTC'ye çevrilir)
     weather_file = "open-meteo-35.19N33.50E87m.csv"
-    df_weather = pd.read_csv(weather_file, skiprows=3)
-    df_weather.columns = [col.strip() for col in df_weather.columns]
-    df_weather['time'] = pd.to_datetime(df_weather['time'])
-    
-    # 2. Üretim Verisi
-    energy_file = "Energy and power - PV - Week - Mustafa Kizmazoglu  - 2025-11-29 - 2025-12-05.csv"
-    df_energy = pd.read_csv(energy_file, skiprows=11, sep=';')
-    df_energy.columns = [col.replace('"', '').strip() for col in df_energy.columns]
-    df_energy['Time period'] = pd.to_datetime(df_energy['Time period'], format='%m/%d/%Y %I.%M %p')
+    df_weather, weather_meta = read_weather(weather_file)
     
-    # Temizlik
-    df_energy['Power [W]'] = df_energy['Power [W]'].astype(str).str.replace('"', '').str.replace(',', '').str.replace('.', '')
-    df_energy['Power [W]'] = pd.to_numeric(df_energy['Power [W]'], errors='coerce').fillna(0)
+    # 2. Üretim Verisi (tüm haftalık dışa aktarımlar; ön bilgi satırları otomatik atlanır)
+    with stage('load_energy') as traced:
+        df_solar = load_exports(energy_files)
+        traced.rows = len(df_solar)
+    df_solar = solar_to_utc(df_solar, weather_meta.get('timezone'), weather_meta.get('utc_offset_seconds'))
     
     print("Veri birleştiriliyor...")
-    df_merged = pd.merge(df_energy, df_weather, left_on='Time period', right_on='time', how='inner')
-    
-    # Tarihsel özellikler
-    df_merged['hour'] = df_merged['time'].dt.hour
-    df_merged['month'] = df_merged['time'].dt.month
-    df_merged['dayofyear'] = df_merged['time'].dt.dayofyear
-    
-    features = [
-        'temperature_2m (°C)', 
-        'shortwave_radiation (W/m²)', 
-        'diffuse_radiation (W/m²)', 
-        'direct_normal_irradiance (W/m²)', 
-        'cloud_cover (%)',
-        'hour', 
-        'month', 
-        'dayofyear'
-    ]
-    
-    X = df_merged[features]
+    # UTC ızgarasında sıralı asof birleştirme (prepare_data.py ile aynı hizalama);
+    # kısa boşluklar doldurulur, doldurulamayan satırlar eğitime alınmaz
+    with stage('merge') as traced:
+        aligned, _ = align([df_solar, df_weather])
+        aligned = aligned.dropna()
+        traced.rows = len(aligned)
+    aligned.index = to_local(aligned.index, weather_meta.get('timezone'), weather_meta.get('utc_offset_seconds'))
+    df_merged = aligned.rename(columns=STORE_COLUMNS)
+    df_merged['time'] = df_merged.index
+    df_merged = df_merged.reset_index(drop=True)
+    if start is not None:
+        df_merged = df_merged[df_merged['time'] >= pd.Timestamp(start)]
+    if end is not None:
+        df_merged = df_merged[df_merged['time'] < pd.Timestamp(end)]
+    return _build_features(df_merged)
+
+def _build_features(df_merged):
+    # Özellikler (tarihsel özellikler dahil) ortak hat ile tek geçişte float32 matrise
+    with stage('feature_build', rows=len(df_merged)):
+        X = PIPELINE.transform(df_merged)
     y = df_merged['Power [W]']
     
     return X, y, df_merged
 
-def define_models():
-    return {
+def define_models(params=None):
+    # Gradient boosting kütüphaneleri ağırdır; yalnızca eğitim gerektiğinde yüklenir
+    import xgboost as xgb
+    import lightgbm as lgb
+    import catboost as cb
+
+    models = {
         "Linear Regression": LinearRegression(),
         "Random Forest": RandomForestRegressor(n_estimators=100, random_state=42),
         "XGBoost": xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100, random_state=42),
@@ -68,67 +106,239 @@ def define_models():
         "Extra Trees": ExtraTreesRegressor(n_estimators=100, random_state=42)
     }
 
+    # model_search.py'nin bulduğu hiperparametreleri uygula
+    for name, overrides in (params or {}).items():
+        if name in models and overrides:
+            models[name].set_params(**overrides)
+    return models
+
+def load_best_params(path='best_params.json'):
+    """model_search.py çıktısını okur; dosya yoksa boş sözlük döner."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# Modellerin iş parçacığı ayarları: süreç başına çekirdek bütçesi bu parametrelere yazılır
+THREAD_PARAMS = {
+    "Random Forest": "n_jobs",
+    "XGBoost": "n_jobs",
+    "LightGBM": "n_jobs",
+    "CatBoost": "thread_count",
+    "Extra Trees": "n_jobs"
+}
+
+def plan_thread_budget(model_names, n_cores=None, n_workers=None):
+    """
+    Çekirdekleri paralel eğitilen modeller arasında paylaştırır.
+    Her model en az 1 iş parçacığı alır; toplam, çekirdek sayısını aşmaz.
+    """
+    if n_cores is None:
+        n_cores = os.cpu_count() or 1
+    if n_workers is None:
+        n_workers = min(len(model_names), n_cores)
+    n_workers = max(1, n_workers)
+    threads = max(1, n_cores // n_workers)
+    return n_workers, {name: threads for name in model_names}
+
+def _reset_peak_rss():
+    """Linux: sürecin tepe bellek sayacını (VmHWM) şimdiki kullanıma indirir. Dönüş: başarılı mı."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _current_rss_mb():
+    """Sürecin o anki bellek kullanımı (MB); /proc yoksa None."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _peak_rss_mb():
+    """
+    Bu sürecin en yüksek bellek kullanımı (MB). Linux'ta VmHWM (_reset_peak_rss
+    ile sıfırlanabilir), diğer sistemlerde süreç boyunca yalnızca artan ru_maxrss.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux KB, macOS bayt cinsinden döndürür
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 / 1024
+        except (ImportError, AttributeError):
+            return float('nan')
+
+def fit_and_benchmark(task):
+    """Tek bir modeli eğitir; doğruluk ve maliyet ölçümleriyle birlikte döndürür."""
+    name, model, threads, X_train, y_train, X_test, y_test = task
+    warnings.filterwarnings('ignore')
+
+    param = THREAD_PARAMS.get(name)
+    if param is not None:
+        model.set_params(**{param: threads})
+
+    # Taban: yorumlayıcı, kütüphaneler ve eğitim verisi (görev taze bir süreçte açıldı);
+    # raporlanan değer modelin eğitim/tahmin/serileştirme sırasında bunun üstüne çıktığı miktardır.
+    # Tepe sayacı sıfırlanamıyorsa taban, içe aktarmaların bıraktığı tepedir
+    baseline_rss = _current_rss_mb() if _reset_peak_rss() else None
+    if baseline_rss is None:
+        baseline_rss = _peak_rss_mb()
+
+    # BLAS/OpenMP havuzlarını da bütçeyle sınırla (iç içe paralellik olmasın)
+    with threadpool_limits(limits=threads):
+        start = time.perf_counter()
+        with stage('fit', rows=len(X_train), model=name):
+            model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        # Tahmin gecikmesi: 3 tekrarın en hızlısı
+        predict_times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            y_pred = model.predict(X_test)
+            predict_times.append(time.perf_counter() - start)
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+
+    result = {
+        "Model": name,
+        "MAE": mean_absolute_error(y_test, y_pred),
+        "RMSE": np.sqrt(mean_squared_error(y_test, y_pred)),
+        "R2": r2_score(y_test, y_pred),
+        "Fit_s": fit_time,
+        "Predict_ms_per_1k": min(predict_times) / max(len(X_test), 1) * 1000 * 1000,
+        "Peak_RSS_Delta_MB": max(_peak_rss_mb() - baseline_rss, 0.0),
+        "Size_KB": buffer.getbuffer().nbytes / 1024,
+        "Threads": threads
+    }
+    return result, model
+
+def train_models_parallel(models, X_train, y_train, X_test, y_test, n_workers=None):
+    """
+    Modelleri ayrı süreçlerde aynı anda eğitir. Her görev taze bir süreçte
+    çalışır (maxtasksperchild=1), tek çekirdekte de: tepe bellek süreç boyunca
+    yalnızca artar, aynı süreçte sırayla eğitilen modeller öncekilerin tepesini
+    devralırdı. Rapor edilen değer modelin sürecin tabanına eklediği tepe bellektir.
+    """
+    n_workers, budget = plan_thread_budget(list(models), n_workers=n_workers)
+    tasks = [
+        (name, model, budget[name], X_train, y_train, X_test, y_test)
+        for name, model in models.items()
+    ]
+
+    results = []
+    trained_models = {}
+    ctx = multiprocessing.get_context('spawn')
+    pool = ctx.Pool(processes=n_workers, maxtasksperchild=1)
+    outputs = pool.imap_unordered(fit_and_benchmark, tasks)
+
+    try:
+        for result, model in outputs:
+            results.append(result)
+            trained_models[result["Model"]] = model
+            print(f"{result['Model']:<25} | {result['MAE']:<10.2f} | {result['RMSE']:<10.2f} | {result['R2']:<10.4f} | "
+                  f"{result['Fit_s']:<8.2f} | {result['Predict_ms_per_1k']:<10.2f} | {result['Peak_RSS_Delta_MB']:<8.0f} | {result['Size_KB']:<10.0f}")
+    finally:
+        pool.close()
+        pool.join()
+
+    # Sonuçları define_models() sırasına göre döndür
+    order = {name: i for i, name in enumerate(models)}
+    results.sort(key=lambda r: order[r["Model"]])
+    trained_models = {name: trained_models[name] for name in models}
+    return results, trained_models
+
+def select_champion(results_df, r2_tolerance=0.005):
+    """
+    En iyi R2'ye r2_tolerance kadar yakın modeller arasından tahmini en ucuz
+    olanı (1k satır gecikmesi, sonra dosya boyutu) seçer.
+    """
+    best_r2 = results_df['R2'].max()
+    candidates = results_df[results_df['R2'] >= best_r2 - r2_tolerance]
+    return candidates.sort_values(by=['Predict_ms_per_1k', 'Size_KB']).iloc[0]
+
 if __name__ == "__main__":
     try:
         # --- VERİ HAZIRLIĞI ---
-        X, y, df_full = load_and_process_data()
+        # prepare_data.py ile oluşturulmuş bölümlenmiş depo varsa onu kullan
+        store_dir = STORE_DIR if os.path.isdir(STORE_DIR) else None
+        X, y, df_full = load_and_process_data(store_dir=store_dir)
         print(f"\nToplam Veri Sayısı: {len(X)} satır.")
         
         # Train/Test Split
         split_index = int(len(X) * 0.8)
-        X_train, X_test = X.iloc[:split_index], X.iloc[split_index:]
+        X_train, X_test = X[:split_index], X[split_index:]
         y_train, y_test = y.iloc[:split_index], y.iloc[split_index:]
         
-        # --- MODEL EĞİTİM DÖNGÜSÜ ---
-        models = define_models()
-        results = []
-        trained_models = {}
+        # --- PARALEL MODEL EĞİTİMİ ---
+        best_params = load_best_params()
+        if best_params:
+            print("[i] 'best_params.json' bulundu, aranmış hiperparametreler kullanılıyor.")
+        models = define_models(best_params)
 
-        print(f"\n{'MODEL ADI':<25} | {'MAE':<10} | {'RMSE':<10} | {'R2 SKOR':<10}")
-        print("-" * 65)
+        header = (f"{'MODEL ADI':<25} | {'MAE':<10} | {'RMSE':<10} | {'R2 SKOR':<10} | "
+                  f"{'FIT (s)':<8} | {'ms/1k':<10} | {'+RSS (MB)':<8} | {'BOYUT (KB)':<10}")
+        print(f"\n{header}")
+        print("-" * len(header))
 
-        for name, model in models.items():
-            # Eğit
-            model.fit(X_train, y_train)
-            
-            # Test Et
-            y_pred = model.predict(X_test)
-            
-            # Skorla
-            mae = mean_absolute_error(y_test, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-            r2 = r2_score(y_test, y_pred)
-            
-            # Listeye ekle
-            results.append({
-                "Model": name,
-                "MAE": mae,
-                "RMSE": rmse,
-                "R2": r2
-            })
-            
-            # Eğitilmiş modeli sözlüğe kaydet
-            trained_models[name] = model
-            
-            print(f"{name:<25} | {mae:<10.2f} | {rmse:<10.2f} | {r2:<10.4f}")
+        with stage('train_models', rows=len(X_train)):
+            results, trained_models = train_models_parallel(models, X_train, y_train, X_test, y_test)
 
         # --- SONUÇLARI KAYDETME ---
-        print("-" * 65)
+        print("-" * len(header))
         
-        # 1. Tüm modelleri topluca kaydet
-        joblib.dump(trained_models, 'solar_models_all.joblib')
-        print("\n[OK] Tüm modeller 'solar_models_all.joblib' dosyasına kaydedildi.")
+        # 1. Her modeli kendi dosyasına, ölçütleri ve eğitim penceresiyle kaydet
+        with stage('save_models'):
+            registry = ModelRegistry()
+            for result in results:
+                registry.register(
+                    result["Model"],
+                    trained_models[result["Model"]],
+                    metrics={k: v for k, v in result.items() if k not in ("Model", "Threads")},
+                    features=PIPELINE.features,
+                    train_start=df_full['time'].iloc[0],
+                    train_end=df_full['time'].iloc[split_index - 1],
+                    rows=len(X_train)
+                )
+        print(f"\n[OK] Tüm modeller '{REGISTRY_DIR}/' altına ayrı dosyalar olarak kaydedildi ({MANIFEST_FILE}).")
 
-        # 2. En iyi modeli bul ve ayrıca kaydet
+        # 2. Doğruluk ve maliyet raporunu kaydet
         results_df = pd.DataFrame(results)
-        best_model_row = results_df.sort_values(by='R2', ascending=False).iloc[0]
+        results_df.to_csv('model_benchmark.csv', index=False)
+        print("[OK] Doğruluk/maliyet raporu 'model_benchmark.csv' dosyasına kaydedildi.")
+
+        # 3. En iyi modeli bul (doğruluk + maliyet) ve ayrıca kaydet
+        best_model_row = select_champion(results_df)
         best_model_name = best_model_row['Model']
         best_model = trained_models[best_model_name]
         
         joblib.dump(best_model, 'best_solar_model.joblib')
+        registry.set_champion(best_model_name)
+        PIPELINE.save(PIPELINE_FILE)
+        # Ağaç modelleri için xgboost/lightgbm gerektirmeyen, bellek eşlemeli kopya
+        compiled_dir = export_model(best_model, 'best_solar_model.joblib')
         
-        print(f"[OK] EN İYİ MODEL: '{best_model_name}' (R2: {best_model_row['R2']:.4f})")
+        print(f"[OK] EN İYİ MODEL: '{best_model_name}' (R2: {best_model_row['R2']:.4f}, "
+              f"{best_model_row['Predict_ms_per_1k']:.2f} ms/1k satır)")
         print(f"     Bu model 'best_solar_model.joblib' olarak ayrıca kaydedildi.")
+        print(f"[OK] Özellik hattı '{PIPELINE_FILE}' dosyasına kaydedildi.")
+        if compiled_dir:
+            print(f"[OK] Derlenmiş (NumPy) model '{compiled_dir}' dizinine kaydedildi.")
 
     except Exception as e:
-        print(f"KRİTİK HATA: {e}")
\ No newline at end of file
+        print(f"KRİTİK HATA: {e}")
@@ -1,57 +1,81 @@
 import pandas as pd
 import numpy as np
 import joblib
-import json
 import os
 import sys
 from datetime import datetime
 import plotext as plt  # Terminalde grafik çizimi için eklendi
 
+from forecast_stream import read_minutely_15
+from forecast_cache import file_digest, frame_key, load_frame, store_frame
+from feature_pipeline import TIME_COLUMN, load_pipeline
+from result_cache import artifact_digest, result_key, summarize_predictions, load_results, store_results
+from production_cube import ProductionCube
+from energy_index import EnergyIndex
+from tracing import stage
+from compiled_model import load_compiled_for
+from calibration import Calibration, load_calibration_for
+from solar_geometry import GEOMETRY_VERSION, HORIZON_DEG, SUN_UP_COLUMN, site_from_meta, with_geometry
+from appliance_scheduler import DEFAULT_APPLIANCES, daily_production_curves, schedule_appliances, format_schedule
+
+def find_model_path(model_path='best_solar_model.joblib'):
+    """Kullanılacak model dosyasının yolunu bulur; bulunamazsa None."""
+    if os.path.exists(model_path):
+        return model_path
+    # Yedek kontrol: Eski isimle kaydedilmiş olabilir mi?
+    if os.path.exists('solar_model_xgboost.joblib'):
+        return 'solar_model_xgboost.joblib'
+    return None
+
 def load_model(model_path='best_solar_model.joblib'):
     # Not: solar_prediction.py modeli 'best_solar_model.joblib' olarak kaydediyor.
     # Eğer dosya adınız farklıysa burayı veya dosya adını değiştirin.
-    if not os.path.exists(model_path):
-        # Yedek kontrol: Eski isimle kaydedilmiş olabilir mi?
-        if os.path.exists('solar_model_xgboost.joblib'):
-            return joblib.load('solar_model_xgboost.joblib')
-            
+    path = find_model_path(model_path)
+    if path is None:
         print(f"Hata: Model dosyası ({model_path}) bulunamadı.")
         print("Lütfen önce 'solar_prediction.py' dosyasını çalıştırarak modeli eğitin.")
         sys.exit(1)
-    return joblib.load(model_path)
+    with stage('load_model'):
+        # Derlenmiş (yalnızca NumPy) karşılığı varsa xgboost hiç yüklenmez
+        compiled = load_compiled_for(path)
+        if compiled is not None:
+            return compiled
+        return joblib.load(path)
 
 def draw_terminal_bar_chart(dates, values):
     """Günlük üretimleri terminalde çubuk grafik olarak gösterir."""
     try:
-        plt.clf()  # Önceki grafiği temizle
-        plt.theme('pro')  # Tema seçimi
-        
-        # Tarihleri stringe çevir
-        str_dates = [str(d) for d in dates]
-        
-        plt.bar(str_dates, values, color='yellow', fill=True)
-        plt.title("Gunluk Uretim Tahmini (Wh)")
-        plt.xlabel("Tarih")
-        plt.ylabel("Enerji (Wh)")
-        plt.show()
+        with stage('chart_bar', rows=len(values)):
+            plt.clf()  # Önceki grafiği temizle
+            plt.theme('pro')  # Tema seçimi
+            
+            # Tarihleri stringe çevir
+            str_dates = [str(d) for d in dates]
+            
+            plt.bar(str_dates, values, color='yellow', fill=True)
+            plt.title("Gunluk Uretim Tahmini (Wh)")
+            plt.xlabel("Tarih")
+            plt.ylabel("Enerji (Wh)")
+            plt.show()
     except Exception as e:
         print(f"Grafik çizilemedi: {e}")
 
 def draw_terminal_line_chart(hours, power_values, date_str):
     """Saatlik üretimi terminalde çizgi grafik olarak gösterir."""
     try:
-        plt.clf()
-        plt.theme('pro')
-        
-        plt.plot(hours, power_values, color='green', marker="dot")
-        plt.title(f"{date_str} - Saatlik Guc Uretimi (W)")
-        plt.xlabel("Saat (00-23)")
-        plt.ylabel("Guc (Watt)")
-        # Y eksenini biraz yukarıdan başlat ki tepe noktası tavana yapışmasın
-        if len(power_values) > 0:
-            plt.ylim(0, max(power_values) * 1.1) 
+        with stage('chart_line', rows=len(power_values)):
+            plt.clf()
+            plt.theme('pro')
             
-        plt.show()
+            plt.plot(hours, power_values, color='green', marker="dot")
+            plt.title(f"{date_str} - Saatlik Guc Uretimi (W)")
+            plt.xlabel("Saat (00-23)")
+            plt.ylabel("Guc (Watt)")
+            # Y eksenini biraz yukarıdan başlat ki tepe noktası tavana yapışmasın
+            if len(power_values) > 0:
+                plt.ylim(0, max(power_values) * 1.1) 
+                
+            plt.show()
     except Exception as e:
         print(f"Grafik çizilemedi: {e}")
 
@@ -66,7 +90,7 @@ def get_suggestions(predictions, df_forecast):
     HIGH_THRESHOLD = 2000 
     MEDIUM_THRESHOLD = 800 
     
-    # 1. En İyi 3 Saatlik Aralığı Bul (Moving Sum)
+    # 1. En İyi 3 Saatlik Aralığı Bul (önek toplamı ile tüm pencereler tek seferde)
     best_window_sum = 0
     best_window_start = -1
     window_size = 3
@@ -80,11 +104,12 @@ def get_suggestions(predictions, df_forecast):
     if len(predictions) < window_size:
          return ["Veri aralığı öneri üretmek için çok kısa."]
 
-    for i in range(len(predictions) - window_size + 1):
-        current_sum = np.sum(predictions[i : i+window_size])
-        if current_sum > best_window_sum:
-            best_window_sum = current_sum
-            best_window_start = i
+    predictions = np.asarray(predictions, dtype=float)
+    prefix = np.concatenate(([0.0], np.cumsum(predictions)))
+    window_sums = prefix[window_size:] - prefix[:-window_size]
+    if window_sums.max() > 0:
+        best_window_start = int(np.argmax(window_sums))
+        best_window_sum = window_sums[best_window_start]
             
     best_window_indices = []
     if best_window_start != -1 and best_window_sum > (window_size * MEDIUM_THRESHOLD):
@@ -105,20 +130,15 @@ def get_suggestions(predictions, df_forecast):
         suggestions.append("   ✅ ÖNERİLEN CİHAZLAR: Çamaşır Makinesi, Bulaşık Makinesi, Fırın, Elektrikli Araç Şarjı.")
         suggestions.append("   -> En çok enerji tüketen işlerinizi bu aralığa sıkıştırın!\n")
     
-    # 2. Diğer Verimli Saatleri Bul
-    secondary_high = []
-    secondary_medium = []
-    
-    for i, pred in enumerate(predictions):
-        if i in best_window_indices:
-            continue # Zaten zirve aralığında
-        
-        if i < len(hours):    
-            h = int(hours[i])
-            if pred >= HIGH_THRESHOLD:
-                secondary_high.append(h)
-            elif pred >= MEDIUM_THRESHOLD:
-                secondary_medium.append(h)
+    # 2. Diğer Verimli Saatleri Bul (zirve aralığı dışındakiler)
+    n = min(len(predictions), len(hours))
+    outside_peak = np.ones(n, dtype=bool)
+    outside_peak[[i for i in best_window_indices if i < n]] = False
+    preds = predictions[:n]
+    hour_values = np.asarray(hours[:n]).astype(int)
+
+    secondary_high = hour_values[outside_peak & (preds >= HIGH_THRESHOLD)].tolist()
+    secondary_medium = hour_values[outside_peak & (preds >= MEDIUM_THRESHOLD) & (preds < HIGH_THRESHOLD)].tolist()
             
     def group_hours(hour_list):
         if not hour_list:
@@ -157,17 +177,12 @@ def get_suggestions(predictions, df_forecast):
 
     return suggestions
 
-def process_forecast(json_path, model):
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data_json = json.load(f)
-    except FileNotFoundError:
-        print("Hata: Dosya bulunamadı.")
-        return None
-    except json.JSONDecodeError:
-        print("Hata: Geçersiz JSON formatı.")
-        return None
-
+def build_feature_frame(data_json, pipeline=None):
+    """
+    Open-Meteo JSON içeriğinden tahmin tablosunu oluşturur. Özellikler ortak
+    özellik hattı ile tek geçişte float32 matrise yazılır; tablo bu matrisi
+    kopyalamadan kullanır.
+    """
     # DataFrame Oluştur
     if 'minutely_15' not in data_json:
         print("Hata: JSON dosyasında 'minutely_15' verisi bulunamadı.")
@@ -175,7 +190,7 @@ def process_forecast(json_path, model):
         
     minutely_data = data_json['minutely_15']
     
-    lengths = {k: len(v) for k, v in minutely_data.items() if isinstance(v, list)}
+    lengths = {k: len(v) for k, v in minutely_data.items() if isinstance(v, (list, np.ndarray))}
     if not lengths:
         print("Hata: Veri bulunamadı.")
         return None
@@ -183,55 +198,138 @@ def process_forecast(json_path, model):
     min_len = min(lengths.values())
     
     for k in minutely_data:
-        if isinstance(minutely_data[k], list):
+        if isinstance(minutely_data[k], (list, np.ndarray)):
              minutely_data[k] = minutely_data[k][:min_len]
 
-    df = pd.DataFrame(minutely_data)
-    df['time'] = pd.to_datetime(df['time'])
+    if pipeline is None:
+        pipeline = load_pipeline()
 
-    df['hour'] = df['time'].dt.hour
-    df['month'] = df['time'].dt.month
-    df['dayofyear'] = df['time'].dt.dayofyear
-    
-    column_mapping = {
-        'temperature_2m': 'temperature_2m (°C)',
-        'shortwave_radiation': 'shortwave_radiation (W/m²)',
-        'diffuse_radiation': 'diffuse_radiation (W/m²)',
-        'direct_normal_irradiance': 'direct_normal_irradiance (W/m²)',
-        'cloud_cover': 'cloud_cover (%)'
-    }
-    df.rename(columns=column_mapping, inplace=True)
-
-    features = [
-        'temperature_2m (°C)', 
-        'shortwave_radiation (W/m²)', 
-        'diffuse_radiation (W/m²)', 
-        'direct_normal_irradiance (W/m²)', 
-        'cloud_cover (%)',
-        'hour', 
-        'month', 
-        'dayofyear'
-    ]
-    
-    missing_cols = [col for col in features if col not in df.columns]
+    # Güneş geometrisi: gece satırları işaretlenir, istenirse özellik olarak eklenir
+    if TIME_COLUMN in minutely_data:
+        minutely_data[TIME_COLUMN] = np.asarray(minutely_data[TIME_COLUMN]).astype('datetime64[m]')
+        with stage('solar_geometry', rows=min_len):
+            columns, sun_up = with_geometry(minutely_data, site_from_meta(data_json), pipeline.features)
+    else:
+        columns, sun_up = minutely_data, np.ones(min_len, dtype=bool)
+
+    missing_cols = pipeline.missing_columns(columns)
     if missing_cols:
         print(f"Hata: Şu sütunlar eksik: {missing_cols}")
         return None
 
-    X = df[features]
-    
-    predictions_power_w = model.predict(X)
-    predictions_power_w = np.maximum(predictions_power_w, 0)
+    with stage('feature_build', rows=min_len):
+        X = pipeline.transform(columns)
+    df = pd.DataFrame(X, columns=pipeline.features, copy=False)
+    with stage('datetime_parse', rows=min_len):
+        df[TIME_COLUMN] = pd.to_datetime(np.asarray(minutely_data[TIME_COLUMN]))
+    df[SUN_UP_COLUMN] = sun_up
 
-    # Kalibrasyon: Yüksek bulutluluk cezası
-    prediction_series = pd.Series(predictions_power_w, index=X.index)
-    cloud_cover = X['cloud_cover (%)']
-    direct_rad = X['direct_normal_irradiance (W/m²)']
-    
-    heavy_cloud_mask = (cloud_cover > 90) & (direct_rad < 50)
-    prediction_series.loc[heavy_cloud_mask] *= 0.32
-    
-    predictions_power_w = prediction_series.values
+    # Modelde kullanılmayan ham sütunlar (ör. is_day) tabloda kalır
+    used = {name for names in pipeline.source_columns.values() for name in names}
+    for k, v in minutely_data.items():
+        if k not in used and k not in df.columns and isinstance(v, (list, np.ndarray)):
+            df[k] = v
+
+    return df
+
+def feature_matrix(df, pipeline=None):
+    """Tablodaki özellikleri modelin beklediği bitişik float32 matris olarak verir."""
+    if pipeline is None:
+        pipeline = load_pipeline()
+    return np.ascontiguousarray(df[pipeline.features].to_numpy(dtype=np.float32))
+
+def predict_raw_power(model, X, sun_up=None):
+    """
+    Modeli çalıştırır ve negatifleri sıfırlar (W, kalibrasyonsuz).
+    sun_up verilirse güneşin ufkun altında olduğu satırlar modele hiç gönderilmez, 0 olur.
+    """
+    if sun_up is None or sun_up.all():
+        with stage('model_predict', rows=len(X)):
+            predictions_power_w = model.predict(X)
+    else:
+        sun_up = np.asarray(sun_up, dtype=bool)
+        with stage('model_predict', rows=int(sun_up.sum())):
+            day_power_w = model.predict(X[sun_up]) if sun_up.any() else np.empty(0, dtype=np.float32)
+        predictions_power_w = np.zeros(len(X), dtype=day_power_w.dtype)
+        predictions_power_w[sun_up] = day_power_w
+    return np.maximum(predictions_power_w, 0)
+
+def predict_power(model, X, pipeline=None, sun_up=None, calibration=None):
+    """
+    Modeli çalıştırır, negatifleri sıfırlar ve kalibrasyon çarpanlarını uygular (W).
+    calibration verilmezse yalnızca önsel tablo (eski bulutluluk cezası) kullanılır.
+    """
+    if pipeline is None:
+        pipeline = load_pipeline()
+    if calibration is None:
+        calibration = Calibration()
+
+    predictions_power_w = predict_raw_power(model, X, sun_up)
+
+    # Kalibrasyon: bulutluluk × doğrudan ışınım × saat bölmesinin çarpanı
+    with stage('calibration', rows=len(X)):
+        return calibration.apply(predictions_power_w, X, pipeline)
+
+def load_forecast_json(json_path):
+    """
+    Tahmin dosyasını akışlı okuyucu ile yükler. 'minutely_15' sütunları
+    doğrudan NumPy dizilerine okunur; dönüş değeri JSON ile aynı yapıdadır.
+    """
+    try:
+        with stage('json_decode') as traced:
+            meta, columns = read_minutely_15(json_path)
+            traced.rows = len(columns[TIME_COLUMN]) if columns else 0
+    except FileNotFoundError:
+        print("Hata: Dosya bulunamadı.")
+        return None
+    except ValueError:
+        print("Hata: Geçersiz JSON formatı.")
+        return None
+
+    data_json = dict(meta)
+    if columns is not None:
+        data_json['minutely_15'] = columns
+    return data_json
+
+def load_feature_frame(json_path, use_cache=True):
+    """
+    Özellik tablosunu döndürür. Aynı içerikli dosya aynı özellik listesi, ufuk
+    açısı ve geometri sürümüyle daha önce işlendiyse tablo önbellekten bellek
+    eşlemeli olarak açılır ve JSON hiç ayrıştırılmaz.
+    """
+    pipeline = load_pipeline()
+    if use_cache:
+        try:
+            digest = frame_key(
+                file_digest(json_path),
+                features=pipeline.features,
+                night_gate=HORIZON_DEG,
+                geometry=GEOMETRY_VERSION
+            )
+        except FileNotFoundError:
+            print("Hata: Dosya bulunamadı.")
+            return None
+        df = load_frame(digest)
+        # Özellik listesi değiştiyse önbellekteki matris kullanılamaz
+        if df is not None and all(f in df.columns for f in pipeline.features + [SUN_UP_COLUMN]):
+            return df
+
+    data_json = load_forecast_json(json_path)
+    if data_json is None:
+        return None
+
+    df = build_feature_frame(data_json, pipeline)
+    if df is not None and use_cache:
+        store_frame(digest, df, pipeline.features)
+    return df
+
+def process_forecast(json_path, model, use_cache=True, calibration=None):
+    df = load_feature_frame(json_path, use_cache)
+    if df is None:
+        return None
+
+    X = feature_matrix(df)
+    predictions_power_w = predict_power(model, X, sun_up=df[SUN_UP_COLUMN].to_numpy(), calibration=calibration)
     
     # 15 dk veri -> Wh hesabı (W * 0.25h)
     predictions_energy_wh = predictions_power_w * 0.25
@@ -242,11 +340,81 @@ def process_forecast(json_path, model):
     
     return df
 
+def predict_results(json_path, model, model_path=None, use_cache=True):
+    """
+    Tahmin sonuçlarını (aralık bazında tahminler + günlük/saatlik toplamlar)
+    döndürür. Aynı tahmin dosyası, aynı model dosyası ve aynı kalibrasyon tablosu
+    ile daha önce hesaplandıysa sonuçlar önbellekten okunur ve model çağrılmaz.
+    """
+    calibration = load_calibration_for(model_path)
+    key = None
+    if use_cache and model_path is not None:
+        try:
+            key = result_key(
+                file_digest(json_path),
+                artifact_digest(model_path),
+                calibration.digest(),
+                features=load_pipeline().features,
+                night_gate=HORIZON_DEG,
+                geometry=GEOMETRY_VERSION
+            )
+        except FileNotFoundError:
+            print("Hata: Dosya bulunamadı.")
+            return None
+        with stage('result_cache_lookup'):
+            results = load_results(key)
+        if results is not None:
+            return results
+
+    df = process_forecast(json_path, model, use_cache, calibration)
+    if df is None:
+        return None
+
+    with stage('rollups', rows=len(df)):
+        results = summarize_predictions(df['time'].values, df['Predicted_Power_W'].values)
+    if key is not None:
+        store_results(key, results, meta={'forecast': json_path, 'model': model_path})
+    return results
+
+def print_period_summary(cube, period):
+    """Haftalık veya aylık üretim özetini ve ortalama saatlik profilin zirvesini yazdırır."""
+    title = 'HAFTALIK' if period == 'week' else 'AYLIK'
+    labels, counts, totals, profiles = cube.period_summary(period)
+
+    print(f"\n--- {title} ÜRETİM ÖZETİ ---")
+    print(f"{'Başlangıç':<12} | {'Gün':<4} | {'Toplam (kWh)':<14} | {'Günlük Ort. (kWh)':<18} | {'Zirve Saat':<10}")
+    print("-" * 72)
+    for label, n_days, total_wh, profile in zip(labels, counts, totals, profiles):
+        peak_hour = int(np.argmax(profile))
+        print(f"{str(label):<12} | {n_days:<4} | {total_wh / 1000:>14.2f} | {total_wh / 1000 / n_days:>18.2f} | {peak_hour:02d}:00")
+
+def print_window_energy(energy_index):
+    """Kullanıcının girdiği [başlangıç, bitiş) aralığının enerjisini ve mevsim toplamını yazdırır."""
+    first, last = energy_index.coverage()
+    print(f"Tahmin kapsamı: {first} - {last}")
+    try:
+        start = np.datetime64(input("Başlangıç (YYYY-MM-DD veya YYYY-MM-DD HH:MM): ").strip(), 'm')
+        end = np.datetime64(input("Bitiş, hariç (YYYY-MM-DD veya YYYY-MM-DD HH:MM): ").strip(), 'm')
+    except ValueError:
+        print("Hatalı tarih/saat girişi!")
+        return
+    if end <= start:
+        print("Bitiş başlangıçtan sonra olmalı.")
+        return
+
+    energy_wh = energy_index.energy(start, end)
+    print(f"\n{start} - {end} arası tahmini üretim: {energy_wh:.2f} Wh ({energy_wh / 1000:.2f} kWh)")
+    if start < first or end > last:
+        print("(Not: Aralığın tahmin kapsamı dışındaki kısmı hesaba katılmadı.)")
+    last_day = (end - np.timedelta64(1, 'm')).astype('datetime64[D]')
+    print(f"Mevsim başından {last_day} sonuna kadar (tahmin kapsamında): {energy_index.season_to_date(last_day) / 1000:.2f} kWh")
+
 def main():
     print("=============================================")
     print("   GÜNEŞ ENERJİSİ ÜRETİM TAHMİN SİSTEMİ")
     print("=============================================")
     
+    model_path = find_model_path()
     model = load_model()
     print("Model başarıyla yüklendi.")
     
@@ -261,14 +429,24 @@ def main():
             print(f"Hata: '{json_path}' bulunamadı. Lütfen tekrar deneyin.")
 
     print(f"\n'{json_path}' işleniyor...")
-    df_result = process_forecast(json_path, model)
+    results = predict_results(json_path, model, model_path)
     
-    if df_result is None:
+    if results is None:
         print("İşlem başarısız oldu. Program sonlandırılıyor.")
         return
 
-    # Günlük Toplamları Hesapla
-    daily_production = df_result.groupby('Date')['Predicted_Energy_Wh'].sum()
+    # Gün × saat küpü, enerji önek toplamı indeksi ve 15 dakikalık günlük eğriler
+    # bir kez kurulur; gün detayları ve aralık sorguları bunlardan doğrudan okunur.
+    with stage('cube_build', rows=len(results['time'])):
+        cube = ProductionCube.from_results(results)
+        energy_index = EnergyIndex.from_results(results)
+        _, day_curves = daily_production_curves(results['time'], results['power_w'])
+
+    # Günlük Toplamlar (sonuçlarla birlikte hesaplanıp önbelleğe alınır)
+    daily_production = pd.Series(
+        np.asarray(results['daily_wh']),
+        index=np.asarray(results['daily_date']).astype(object)
+    )
     
     print("\n--- GÜNLÜK ÜRETİM TAHMİNLERİ ---")
     print(f"{'Tarih':<15} | {'Toplam Üretim (Wh)':<20} | {'Toplam Üretim (kWh)':<20}")
@@ -294,52 +472,57 @@ def main():
     while True:
         print("\nDetaylı görmek istediğiniz bir gün var mı?")
         print(f"Mevcut Tarihler: {', '.join(available_dates)}")
-        choice = input("Tarih girin (YYYY-MM-DD formatında) veya çıkmak için 'q'/'exit' yazın: ").strip()
+        choice = input("Tarih girin (YYYY-MM-DD formatında), haftalık/aylık özet için 'hafta'/'ay', "
+                       "saat aralığı için 'aralık' veya çıkmak için 'q'/'exit' yazın: ").strip()
         
         if choice.lower() in ['q', 'exit', 'hayır', 'yok']:
             print("Program sonlandırılıyor. İyi günler!")
             break
+
+        if choice.lower() in ['hafta', 'ay']:
+            print_period_summary(cube, 'week' if choice.lower() == 'hafta' else 'month')
+            continue
+
+        if choice.lower() in ['aralık', 'aralik']:
+            print_window_energy(energy_index)
+            continue
             
         if choice not in available_dates:
             print("Hatalı tarih girişi! Lütfen listedeki tarihlerden birini girin.")
             continue
             
-        # Seçilen günün verilerini filtrele
+        # Seçilen günün saatlik ortalama gücü doğrudan küpten okunur
         selected_date = datetime.strptime(choice, "%Y-%m-%d").date()
-        day_df = df_result[df_result['Date'] == selected_date].copy()
-        
-        # Saatlik ortalama güç ve toplam enerji
-        hourly_stats = day_df.groupby('hour').agg({
-            'Predicted_Power_W': 'mean',
-            'Predicted_Energy_Wh': 'sum'
-        }).reset_index()
+        hourly_predictions = cube.hourly_power(choice)
         
         print(f"\n--- {choice} DETAYLI SAATLİK TAHMİN ---")
         print(f"{'Saat':<10} | {'Ortalama Güç (W)':<20}")
         print("-" * 35)
         
-        # Tam 24 saati doldurmak için
-        full_day = pd.DataFrame({'hour': range(24)})
-        hourly_merged = pd.merge(full_day, hourly_stats, on='hour', how='left').fillna(0)
-        
-        hourly_predictions = hourly_merged['Predicted_Power_W'].values
-        
-        for index, row in hourly_merged.iterrows():
-            print(f"{int(row['hour']):02d}:00      | {row['Predicted_Power_W']:>15.0f} W")
+        for hour, power_w in enumerate(hourly_predictions):
+            print(f"{hour:02d}:00      | {power_w:>15.0f} W")
             
         print("\n--- GÜNLÜK AKILLI PLANLAMA ---")
         
         # --- SAATLİK GRAFİK ---
         print(f"\n[{choice} için Saatlik Güç Grafiği]")
-        draw_terminal_line_chart(hourly_merged['hour'].tolist(), hourly_merged['Predicted_Power_W'].tolist(), str(selected_date))
+        draw_terminal_line_chart(list(range(24)), hourly_predictions.tolist(), str(selected_date))
         print("-" * 40)
         # ----------------------
         
         df_for_suggestion = pd.DataFrame({'hour': range(24)})
         
-        advice_list = get_suggestions(hourly_predictions, df_for_suggestion)
+        with stage('suggestions'):
+            advice_list = get_suggestions(hourly_predictions, df_for_suggestion)
         for line in advice_list:
             print(line)
 
+        # --- CİHAZ PLANI (15 dakikalık üretim eğrisi üzerinde) ---
+        with stage('appliance_schedule'):
+            starts, solar_wh, grid_wh = schedule_appliances(day_curves[cube.row[choice]], DEFAULT_APPLIANCES)
+        print("\n📅 ÖNERİLEN CİHAZ PLANI (güneş enerjisinden en yüksek pay):")
+        for line in format_schedule(DEFAULT_APPLIANCES, starts, solar_wh, grid_wh):
+            print(line)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,242 @@
+import pandas as pd
+import numpy as np
+
+from tracing import stage
+
+# Sorted-merge time alignment of the inverter exports and the Open-Meteo data.
+# Both sources are converted to UTC from the metadata in the files: the
+# inverter preamble carries an IANA 'Time zone' and the Open-Meteo header a
+# 'timezone' plus 'utc_offset_seconds'. Wall-clock times are localized with
+# the IANA zone (so DST switches are honoured); the fixed offset is used only
+# when no zone name is available. The repeated hour at the autumn switch is
+# inferred when both copies are present, otherwise those rows are dropped.
+#
+# Each source is then matched onto a regular UTC slot grid with one sorted
+# linear merge (merge_asof, nearest within a tolerance). Gaps are filled by
+# linear interpolation only when they are bounded on both sides and at most
+# max_gap slots long; longer gaps stay NaN and are listed in the gap report.
+# The grid is processed in chunks of chunk_days with a max_gap + 1 slot
+# overlap, so fills across chunk boundaries are identical to a single pass.
+# Only the grid, the merged values and the fills are chunked: the sources
+# themselves (and their int64 UTC timestamps) stay in memory for the whole
+# history, as read by read_weather / ingest.load_exports.
+
+SLOT = pd.Timedelta(minutes=15)
+MAX_GAP_SLOTS = 4           # Longest gap that is interpolated (1 hour)
+CHUNK_DAYS = 31
+
+# Preamble key of the inverter export that holds the IANA time zone
+EXPORT_TIMEZONE_KEY = 'Time zone'
+
+# Open-Meteo CSV columns -> dataset store names
+WEATHER_COLUMNS = {
+    'temperature_2m (°C)': 'temp_c',
+    'shortwave_radiation (W/m²)': 'shortwave_rad',
+    'diffuse_radiation (W/m²)': 'diffuse_rad',
+    'direct_normal_irradiance (W/m²)': 'direct_rad',
+    'cloud_cover (%)': 'cloud_cover',
+    'is_day ()': 'is_day'
+}
+
+# Step-like columns are filled with the previous value instead of interpolated
+STEP_COLUMNS = ('is_day',)
+
+_FIXED_ZONES = ('', 'GMT', 'UTC')
+
+def to_utc(index, timezone=None, utc_offset_seconds=None):
+    """
+    Converts naive wall-clock timestamps to a UTC DatetimeIndex. Times that do
+    not exist (spring switch) or cannot be disambiguated become NaT.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        return index.tz_convert('UTC')
+    if timezone and timezone not in _FIXED_ZONES:
+        try:
+            try:
+                localized = index.tz_localize(timezone, ambiguous='infer', nonexistent='NaT')
+            except ValueError:
+                localized = index.tz_localize(timezone, ambiguous='NaT', nonexistent='NaT')
+            return localized.tz_convert('UTC')
+        except KeyError:
+            print(f"Warning: unknown time zone '{timezone}', using the fixed UTC offset.")
+    offset = pd.Timedelta(seconds=int(utc_offset_seconds or 0))
+    return (index - offset).tz_localize('UTC')
+
+def to_local(index, timezone=None, utc_offset_seconds=None):
+    """UTC index -> naive wall-clock time of the site (the inverse of to_utc)."""
+    index = pd.DatetimeIndex(index)
+    if timezone and timezone not in _FIXED_ZONES:
+        try:
+            return index.tz_convert(timezone).tz_localize(None)
+        except KeyError:
+            pass
+    return index.tz_localize(None) + pd.Timedelta(seconds=int(utc_offset_seconds or 0))
+
+def read_weather(path):
+    """
+    Reads an Open-Meteo CSV export. Returns (frame indexed by UTC with store
+    column names, header metadata with 'timezone' and 'utc_offset_seconds').
+    """
+    meta = pd.read_csv(path, nrows=1).iloc[0].to_dict()
+    with stage('load_weather') as traced:
+        df = pd.read_csv(path, sep=',', skiprows=3)
+        traced.rows = len(df)
+    df.columns = [col.strip() for col in df.columns]
+    with stage('datetime_parse', rows=len(df)):
+        local = pd.to_datetime(df['time'])
+    utc = to_utc(local, meta.get('timezone'), meta.get('utc_offset_seconds'))
+
+    columns = [col for col in WEATHER_COLUMNS if col in df.columns]
+    df = df[columns].rename(columns=WEATHER_COLUMNS)
+    df.index = pd.DatetimeIndex(utc, name='timestamp')
+    return _sorted_unique(df), meta
+
+def solar_to_utc(df_solar, default_timezone=None, default_offset_seconds=None):
+    """Inverter frame from ingest.load_exports -> UTC index (zone from the export preamble)."""
+    timezone = df_solar.attrs.get('metadata', {}).get(EXPORT_TIMEZONE_KEY) or default_timezone
+    df = df_solar.copy()
+    df.index = pd.DatetimeIndex(to_utc(df_solar.index, timezone, default_offset_seconds), name='timestamp')
+    return _sorted_unique(df)
+
+def _sorted_unique(df):
+    df = df[df.index.notna()]
+    df = df[~df.index.duplicated(keep='last')]
+    return df.sort_index()
+
+def _utc_ns(index):
+    return pd.DatetimeIndex(index).tz_convert('UTC').tz_localize(None).as_unit('ns').asi8
+
+def fill_gaps(values, max_gap=MAX_GAP_SLOTS, step=False):
+    """
+    Fills NaN runs in place when they are bounded on both sides and at most
+    max_gap long (linear, or previous value if step=True).
+    Returns (run starts, run ends (exclusive), filled flags).
+    """
+    missing = np.isnan(values)
+    edges = np.diff(np.concatenate(([0], missing.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    filled = (starts > 0) & (ends < len(values)) & (ends - starts <= max_gap)
+
+    if filled.any():
+        # NaN positions are ordered run by run, so the run flags repeat over them
+        positions = np.flatnonzero(missing)[np.repeat(filled, ends - starts)]
+        known = np.flatnonzero(~missing)
+        if step:
+            values[positions] = values[known[np.searchsorted(known, positions) - 1]]
+        else:
+            values[positions] = np.interp(positions, known, values[known])
+    return starts, ends, filled
+
+def coalesce_gaps(gaps):
+    """Joins gap records of the same column that continue across chunk boundaries."""
+    if gaps.empty:
+        return gaps
+    gaps = gaps.sort_values(['column', 'start'], kind='stable').reset_index(drop=True)
+    new_run = (
+        (gaps['column'] != gaps['column'].shift())
+        | (gaps['start'] != gaps['end'].shift())
+    )
+    run_id = new_run.cumsum()
+    merged = gaps.groupby(run_id).agg(
+        column=('column', 'first'),
+        start=('start', 'first'),
+        end=('end', 'last'),
+        slots=('slots', 'sum'),
+        filled=('filled', 'all')
+    )
+    return merged.reset_index(drop=True)
+
+def iter_aligned(sources, slot=SLOT, tolerance=None, max_gap=MAX_GAP_SLOTS, chunk_days=CHUNK_DAYS):
+    """
+    sources: frames indexed by UTC (see read_weather / solar_to_utc).
+    Yields (chunk frame on the UTC slot grid, gap records of the chunk).
+    The grid spans the union of the sources; rows a source does not cover
+    show up as unfilled gaps.
+    """
+    slot = pd.Timedelta(slot)
+    tolerance = pd.Timedelta(tolerance) if tolerance is not None else slot / 2
+    sources = [src for src in sources if len(src)]
+    if not sources:
+        return
+
+    slot_ns = slot.value
+    first = min(_utc_ns(src.index)[0] for src in sources) // slot_ns
+    last = -(-max(_utc_ns(src.index)[-1] for src in sources) // slot_ns)
+    n_slots = int(last - first + 1)
+    chunk_slots = max(1, int(pd.Timedelta(days=chunk_days) / slot))
+    margin = max_gap + 1
+
+    times = [_utc_ns(src.index) for src in sources]
+    columns = [col for src in sources for col in src.columns]
+
+    for core_start in range(0, n_slots, chunk_slots):
+        core_end = min(core_start + chunk_slots, n_slots)
+        window_start = max(core_start - margin, 0)
+        window_end = min(core_end + margin, n_slots)
+        grid_ns = (first + np.arange(window_start, window_end, dtype=np.int64)) * slot_ns
+        grid = pd.DataFrame({'timestamp': pd.to_datetime(grid_ns, unit='ns', utc=True)})
+
+        with stage('align_merge', rows=len(grid)):
+            parts = []
+            for src, src_ns in zip(sources, times):
+                lo = np.searchsorted(src_ns, grid_ns[0] - tolerance.value, side='left')
+                hi = np.searchsorted(src_ns, grid_ns[-1] + tolerance.value, side='right')
+                right = src.iloc[lo:hi].astype(np.float64)
+                right.index = pd.DatetimeIndex(right.index).as_unit('ns')
+                merged = pd.merge_asof(grid, right.rename_axis('timestamp').reset_index(), on='timestamp',
+                                       direction='nearest', tolerance=tolerance)
+                parts.append(merged[list(src.columns)].to_numpy(dtype=np.float64))
+            values = np.column_stack(parts) if parts else np.empty((len(grid), 0))
+
+        # Bounded gap filling; only runs inside the chunk core are reported
+        gaps = []
+        core = slice(core_start - window_start, core_end - window_start)
+        with stage('gap_fill', rows=len(grid)):
+            for j, column in enumerate(columns):
+                column_values = np.ascontiguousarray(values[:, j])
+                starts, ends, filled = fill_gaps(column_values, max_gap, step=column in STEP_COLUMNS)
+                values[:, j] = column_values
+                starts = np.maximum(starts, core.start)
+                ends = np.minimum(ends, core.stop)
+                for s, e, f in zip(starts, ends, filled):
+                    if s < e:
+                        gaps.append({'column': column, 'start': grid_ns[s], 'end': grid_ns[e - 1] + slot_ns,
+                                     'slots': int(e - s), 'filled': bool(f)})
+
+        index = pd.DatetimeIndex(grid['timestamp'].iloc[core], name='timestamp')
+        yield pd.DataFrame(values[core], index=index, columns=columns), gaps
+
+def gap_report(gaps):
+    """Gap records from iter_aligned -> frame with UTC start/end, slot count and fill status."""
+    report = pd.DataFrame(gaps, columns=['column', 'start', 'end', 'slots', 'filled'])
+    report = coalesce_gaps(report)
+    for col in ('start', 'end'):
+        report[col] = pd.to_datetime(report[col].astype(np.int64), unit='ns', utc=True)
+    return report
+
+def align(sources, slot=SLOT, tolerance=None, max_gap=MAX_GAP_SLOTS, chunk_days=CHUNK_DAYS):
+    """Whole-range convenience wrapper around iter_aligned: (aligned frame, gap report)."""
+    frames = []
+    gaps = []
+    for frame, chunk_gaps in iter_aligned(sources, slot, tolerance, max_gap, chunk_days):
+        frames.append(frame)
+        gaps.extend(chunk_gaps)
+    aligned = pd.concat(frames) if frames else pd.DataFrame(columns=[c for s in sources for c in s.columns])
+    return aligned, gap_report(gaps)
+
+def print_gap_report(report, limit=20):
+    """Summary of unfilled/filled gaps per column and the longest unfilled gaps."""
+    if report.empty:
+        print("No gaps found.")
+        return
+    per_column = report.groupby(['column', 'filled'])['slots'].sum().unstack(fill_value=0)
+    print("Gap slots per column (filled / left empty):")
+    for column, row in per_column.iterrows():
+        print(f"  {column:<14} {int(row.get(True, 0)):>6} / {int(row.get(False, 0)):>6}")
+    open_gaps = report[~report['filled']].sort_values('slots', ascending=False).head(limit)
+    if len(open_gaps):
+        print(f"Longest unfilled gaps (UTC, max {limit}):")
+        for row in open_gaps.itertuples(index=False):
+            print(f"  {row.column:<14} {row.start:%Y-%m-%d %H:%M} -> {row.end:%Y-%m-%d %H:%M} ({row.slots} slots)")
@@ -0,0 +1,191 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import multiprocessing
+
+# Aşama bazında izleme (tracing).
+# Her adlandırılmış aşama için duvar saati süresi, CPU süresi, işlenen satır
+# sayısı ve bellek (RSS) değişimi kaydedilir; çalışma sonunda Chrome trace
+# biçiminde (chrome://tracing veya https://ui.perfetto.dev ile açılır) JSON'a
+# yazılır ve terminale kısa bir özet basılır.
+#
+# Açmak için:  SOLAR_TRACE=1 python solar_wizard.py          (solar_trace.json)
+#              SOLAR_TRACE=izler/run.json python ...          (belirtilen dosya)
+#              python prepare_data.py --trace                 (argparse betikleri)
+# Kapalıyken stage() paylaşılan boş bir bağlam döndürür; ölçüm yapılmaz.
+
+TRACE_ENV = 'SOLAR_TRACE'
+DEFAULT_TRACE_FILE = 'solar_trace.json'
+
+class _NullStage:
+    """İzleme kapalıyken kullanılan, hiçbir şey yapmayan bağlam."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+def _rss_bytes():
+    """Sürecin o anki bellek kullanımı (bayt); ölçülemezse None."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss
+        except ImportError:
+            return None
+
+class _Stage:
+    __slots__ = ('tracer', 'name', 'rows', 'args', '_start_ns', '_cpu', '_rss')
+
+    def __init__(self, tracer, name, rows, args):
+        self.tracer = tracer
+        self.name = name
+        self.rows = rows
+        self.args = args
+
+    def __enter__(self):
+        self._rss = _rss_bytes()
+        self._cpu = time.process_time()
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end_ns = time.perf_counter_ns()
+        cpu = time.process_time() - self._cpu
+        rss = _rss_bytes()
+        mem_delta = rss - self._rss if rss is not None and self._rss is not None else None
+        self.tracer._record(self, self._start_ns, end_ns, cpu, mem_delta, failed=exc[0] is not None)
+        return False
+
+class Tracer:
+    def __init__(self, path=DEFAULT_TRACE_FILE):
+        self.path = path
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def stage(self, name, rows=None, **args):
+        return _Stage(self, name, rows, args)
+
+    def _record(self, stage, start_ns, end_ns, cpu_s, mem_delta, failed):
+        args = dict(stage.args)
+        args['cpu_ms'] = round(cpu_s * 1000, 3)
+        if stage.rows is not None:
+            args['rows'] = int(stage.rows)
+        if mem_delta is not None:
+            args['mem_delta_mb'] = round(mem_delta / 1024 / 1024, 3)
+        if failed:
+            args['error'] = True
+
+        event = {
+            'name': stage.name,
+            'cat': 'stage',
+            'ph': 'X',
+            'ts': (start_ns - self._origin_ns) / 1000,   # mikro saniye
+            'dur': (end_ns - start_ns) / 1000,
+            'pid': self._pid,
+            'tid': threading.get_ident(),
+            'args': args
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        """Aşama adına göre toplamlar: çağrı, duvar (ms), CPU (ms), satır, bellek (MB)."""
+        totals = {}
+        for event in self.events:
+            row = totals.setdefault(event['name'], {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'rows': 0, 'mem_delta_mb': 0.0})
+            row['calls'] += 1
+            row['wall_ms'] += event['dur'] / 1000
+            row['cpu_ms'] += event['args']['cpu_ms']
+            row['rows'] += event['args'].get('rows', 0)
+            row['mem_delta_mb'] += event['args'].get('mem_delta_mb', 0.0)
+        return totals
+
+    def print_summary(self, file=None):
+        file = file or sys.stderr
+        totals = self.summary()
+        if not totals:
+            return
+        print(f"\n--- İZLEME ÖZETİ ({self.path}) ---", file=file)
+        print(f"{'Aşama':<24} | {'Çağrı':>6} | {'Duvar (ms)':>11} | {'CPU (ms)':>10} | {'Satır':>10} | {'Bellek (MB)':>11}", file=file)
+        print("-" * 88, file=file)
+        for name, row in sorted(totals.items(), key=lambda item: -item[1]['wall_ms']):
+            print(f"{name:<24} | {row['calls']:>6} | {row['wall_ms']:>11.2f} | {row['cpu_ms']:>10.2f} | "
+                  f"{row['rows']:>10} | {row['mem_delta_mb']:>+11.2f}", file=file)
+
+    def export(self, path=None):
+        """Olayları Chrome trace biçiminde yazar."""
+        path = path or self.path
+        with self._lock:
+            events = list(self.events)
+        trace = {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'argv': sys.argv,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False)
+        return path
+
+_tracer = None
+
+def _finish():
+    if _tracer is None or not _tracer.events:
+        return
+    try:
+        _tracer.export()
+        _tracer.print_summary()
+    except OSError as e:
+        print(f"Uyarı: İzleme dosyası yazılamadı: {e}", file=sys.stderr)
+
+def enable(path=None):
+    """İzlemeyi açar; sonuçlar süreç bittiğinde yazılır."""
+    global _tracer
+    if _tracer is None:
+        path = path or DEFAULT_TRACE_FILE
+        # Alt süreçler (ör. paralel eğitim) kendi dosyalarına yazar
+        if multiprocessing.parent_process() is not None:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{os.getpid()}{ext or '.json'}"
+        _tracer = Tracer(path)
+        atexit.register(_finish)
+    return _tracer
+
+def is_enabled():
+    return _tracer is not None
+
+def stage(name, rows=None, **args):
+    """
+    Ölçülen aşama bağlamı:
+        with stage('model_predict', rows=len(X)):
+            ...
+    Satır sayısı sonradan da verilebilir: `with stage('x') as s: ... s.rows = n`.
+    """
+    if _tracer is None:
+        return _NULL_STAGE
+    return _tracer.stage(name, rows, **args)
+
+# Ortam değişkeniyle açma: SOLAR_TRACE=1 veya SOLAR_TRACE=dosya.json
+_env = os.environ.get(TRACE_ENV, '').strip()
+if _env and _env != '0':
+    enable(None if _env == '1' else _env)